@@ -0,0 +1,113 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+# Micro-benchmark for serving large cached items. Reports time and
+# peak memory allocated for reading an item as a whole with
+# SQLiteStorage.get_cached_item(), for streaming it with
+# SQLiteStorage.get_cached_item_stream(), and for reading only its
+# metadata with SQLiteStorage.get_cached_item_metadata().
+#
+# Run from the Luna directory:
+#
+#	python benchmarks/bench_assets.py
+
+import course
+import os
+import time
+import tracemalloc
+
+SIZES = (1, 8, 32)
+"""Asset sizes in MiB.
+"""
+
+def measure(label, function):
+	"""Call function once, and print wall time and peak allocation.
+	"""
+
+	tracemalloc.start()
+
+	start = time.perf_counter()
+
+	function()
+
+	seconds = time.perf_counter() - start
+
+	size, peak = tracemalloc.get_traced_memory()
+
+	tracemalloc.stop()
+
+	print("{:<28} {:>10.1f} ms {:>12.1f} KiB peak".format(label, seconds * 1e3, peak / 1024))
+
+	return
+
+def drain(chunks):
+	"""Consume chunks one by one, like a server sending them.
+	"""
+
+	for chunk in chunks:
+
+		pass
+
+	return
+
+def main():
+	"""Main function, for IDE convenience.
+	"""
+
+	course.quiet()
+
+	course.enter_workdir()
+
+	course_ids = {}
+
+	for size in SIZES:
+
+		course_ids[size] = course.create_course(os.path.join("courses", "course{}.sqlite".format(size)),
+												groups = 1,
+												steps_per_group = 1,
+												title = "Kurs {}".format(size),
+												asset_size = size * 1024 * 1024)
+
+	from luna_lms.storage import SQLiteStorage
+
+	storage = SQLiteStorage()
+
+	storage.start(watch = False)
+
+	for size in SIZES:
+
+		course_id = course_ids[size]
+
+		measure("{} MiB, whole".format(size),
+				lambda: storage.get_cached_item(course_id, "media/asset.bin")["data"])
+
+		measure("{} MiB, streamed".format(size),
+				lambda: drain(storage.get_cached_item_stream(course_id, "media/asset.bin")["chunks"]))
+
+		measure("{} MiB, metadata".format(size),
+				lambda: storage.get_cached_item_metadata(course_id, "media/asset.bin"))
+
+	return
+
+if __name__ == "__main__":
+
+	main()
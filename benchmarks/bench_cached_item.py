@@ -0,0 +1,91 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+# Micro-benchmark for SQLiteStorage.get_cached_item(), reading small
+# items from the cache of a course. Reports lookups per second for a
+# single path, and for cycling through many different paths.
+#
+# Run from the Luna directory:
+#
+#	python benchmarks/bench_cached_item.py
+
+import course
+import os
+import time
+
+LOOKUPS = 20000
+
+MEDIA_ITEMS = 500
+
+def measure(label, storage, course_id, paths):
+	"""Look up LOOKUPS items, cycling through paths, and print the throughput.
+	"""
+
+	# Warm up
+	#
+	for path in paths:
+
+		storage.get_cached_item(course_id, path)
+
+	start = time.perf_counter()
+
+	for number in range(LOOKUPS):
+
+		storage.get_cached_item(course_id, paths[number % len(paths)])
+
+	seconds = time.perf_counter() - start
+
+	print("{:<28} {:>10.0f} lookups/s {:>8.1f} µs each".format(label, LOOKUPS / seconds, seconds / LOOKUPS * 1e6))
+
+	return
+
+def main():
+	"""Main function, for IDE convenience.
+	"""
+
+	course.quiet()
+
+	course.enter_workdir()
+
+	course_id = course.create_course(os.path.join("courses", "course.sqlite"),
+										groups = 2,
+										steps_per_group = 5,
+										media_items = MEDIA_ITEMS)
+
+	from luna_lms.storage import SQLiteStorage
+
+	storage = SQLiteStorage()
+
+	storage.start(watch = False)
+
+	measure("one path", storage, course_id, ["cover.svg"])
+
+	measure("{} paths".format(MEDIA_ITEMS),
+			storage,
+			course_id,
+			["media/item{}.svg".format(number) for number in range(MEDIA_ITEMS)])
+
+	return
+
+if __name__ == "__main__":
+
+	main()
@@ -0,0 +1,155 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+# Import-time benchmark for luna_lms.webapp, based on python -X importtime.
+# Reports the total import time, the time spent in luna_lms modules
+# themselves, and the slowest imported packages, taking the best of
+# several fresh interpreters. A first, discarded run writes the bytecode
+# caches, since deployed workers start from those.
+#
+# Exits with status 1 if the time spent in luna_lms modules exceeds
+# LUNA_BUDGET, or if importing starts a subprocess, so that it can be
+# used as a regression check.
+#
+# Run from the Luna directory:
+#
+#	python benchmarks/bench_import.py
+
+import os
+import subprocess
+import sys
+
+RUNS = 5
+
+MODULE = "luna_lms.webapp"
+
+LUNA_BUDGET = 20
+"""The maximum time in milliseconds spent in luna_lms modules themselves.
+"""
+
+# Fails if the import starts a subprocess, even if the import catches
+# the error
+#
+GUARD = '''
+import subprocess
+import sys
+
+started = []
+
+class Forbidden(subprocess.Popen):
+
+	def __init__(self, *args, **kwargs):
+
+		started.append(args)
+
+		raise RuntimeError("subprocess started at import time")
+
+subprocess.Popen = Forbidden
+
+import {}
+
+if started:
+
+	sys.exit("subprocess started at import time: {{}}".format(started))
+'''.format(MODULE)
+
+def import_times():
+	"""Import MODULE in a fresh interpreter, and return a dict mapping module names to tuples (self, cumulative) in microseconds.
+	"""
+
+	# The benchmark lives in 'benchmarks', luna_lms one level up
+	#
+	directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+	environment = dict(os.environ)
+
+	environment.pop("PYTHONDONTWRITEBYTECODE", None)
+
+	result = subprocess.run([sys.executable, "-X", "importtime", "-c", GUARD],
+							capture_output = True,
+							text = True,
+							cwd = directory,
+							env = environment)
+
+	if result.returncode != 0:
+
+		print(result.stderr.splitlines()[-1])
+
+		sys.exit(1)
+
+	times = {}
+
+	for line in result.stderr.splitlines():
+
+		if not line.startswith("import time:") or line.endswith("imported package"):
+
+			continue
+
+		own, cumulative, name = line[len("import time:"):].split("|")
+
+		times[name.strip()] = (int(own), int(cumulative))
+
+	return times
+
+def main():
+	"""Main function, for IDE convenience.
+	"""
+
+	import_times()
+
+	runs = [import_times() for number in range(RUNS)]
+
+	best = dict([(name, (min([run[name][0] for run in runs]), min([run[name][1] for run in runs])))
+					for name in runs[0].keys()
+					if all([name in run for run in runs])])
+
+	total = sum([own for own, cumulative in best.values()])
+
+	luna = sum([own for name, (own, cumulative) in best.items() if name.split(".")[0] == "luna_lms"])
+
+	packages = {}
+
+	for name, (own, cumulative) in best.items():
+
+		package = name.split(".")[0]
+
+		packages[package] = packages.get(package, 0) + own
+
+	print("{:<28} {:>10.1f} ms".format("import " + MODULE, total / 1000))
+
+	print("{:<28} {:>10.1f} ms (budget {} ms)".format("  luna_lms modules", luna / 1000, LUNA_BUDGET))
+
+	for package, own in sorted(packages.items(), key = lambda item: item[1], reverse = True)[:8]:
+
+		print("{:<28} {:>10.1f} ms".format("  " + package, own / 1000))
+
+	if luna > LUNA_BUDGET * 1000:
+
+		print("luna_lms modules exceed the import time budget")
+
+		sys.exit(1)
+
+	return
+
+if __name__ == "__main__":
+
+	main()
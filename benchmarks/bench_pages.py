@@ -0,0 +1,139 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+# Micro-benchmark for rendering the course view and the course listing,
+# bypassing the page cache. Reports CPU time and peak memory allocated
+# per rendered page.
+#
+# Run from the Luna directory:
+#
+#	python benchmarks/bench_pages.py
+
+import course
+import os
+import time
+import tracemalloc
+
+ROUNDS = 200
+
+def measure(label, function):
+	"""Call function ROUNDS times, and print CPU time and peak allocation per call.
+	"""
+
+	# Warm up
+	#
+	function()
+
+	start = time.process_time()
+
+	for i in range(ROUNDS):
+
+		function()
+
+	cpu = (time.process_time() - start) / ROUNDS
+
+	tracemalloc.start()
+
+	function()
+
+	size, peak = tracemalloc.get_traced_memory()
+
+	tracemalloc.stop()
+
+	print("{:<24} {:>10.1f} µs CPU {:>10.1f} KiB peak".format(label, cpu * 1e6, peak / 1024))
+
+	return
+
+def as_text(page):
+	"""Return a rendered page as a string, joining streamed chunks.
+	"""
+
+	if page.__class__ == bytes:
+
+		return page.decode("utf-8")
+
+	if page.__class__ == str:
+
+		return page
+
+	return b"".join([chunk if chunk.__class__ == bytes else chunk.encode("utf-8") for chunk in page]).decode("utf-8")
+
+def drain(chunks):
+	"""Consume streamed chunks one by one, like a server sending them.
+	"""
+
+	for chunk in chunks:
+
+		pass
+
+	return
+
+def first_chunk(chunks):
+	"""Return the first streamed chunk, i.e. what a client receives first.
+	"""
+
+	return next(iter(chunks))
+
+def main():
+	"""Main function, for IDE convenience.
+	"""
+
+	course.quiet()
+
+	course.enter_workdir()
+
+	for number in range(20):
+
+		course.create_course(os.path.join("courses", "course{}.sqlite".format(number)),
+								groups = 10,
+								steps_per_group = 20,
+								title = "Kurs {}".format(number))
+
+	from luna_lms.webapp import WebApp
+
+	webapp = WebApp()
+
+	webapp.start(watch = False)
+
+	course_id = [key for key in webapp.storage.find_courses().keys() if key.__class__ != str][0]
+
+	step = webapp.storage.get_navigation_index(course_id).identifiers[106]
+
+	measure("view (200 steps)", lambda: as_text(webapp.render_view(course_id, step, "text")))
+
+	measure("  streamed", lambda: drain(webapp.stream_view(course_id, step, "text")))
+
+	measure("  first chunk", lambda: first_chunk(webapp.stream_view(course_id, step, "text")))
+
+	measure("courses (20 courses)", lambda: as_text(webapp.courses()))
+
+	measure("  streamed", lambda: drain(webapp.courses()))
+
+	measure("  first chunk", lambda: first_chunk(webapp.courses()))
+
+	webapp.stop()
+
+	return
+
+if __name__ == "__main__":
+
+	main()
@@ -0,0 +1,181 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+# Helpers to set up a synthetic course for the benchmarks.
+
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import uuid
+
+# Make luna_lms importable when running a benchmark from the Luna directory
+#
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from luna_lms import LOGGER
+
+SCHEMA = '''
+CREATE TABLE "cache" (
+	"key"	INTEGER,
+	"path"	TEXT NOT NULL UNIQUE,
+	"data"	BLOB,
+	"format"	TEXT NOT NULL,
+	"description"	TEXT,
+	"hash"	TEXT,
+	"modified"	TEXT,
+	"gzip"	BLOB,
+	PRIMARY KEY("key")
+);
+CREATE TABLE "course" (
+	"identifier"	TEXT NOT NULL,
+	"title"	TEXT NOT NULL,
+	"description"	TEXT NOT NULL,
+	"relation"	TEXT,
+	"created"	TEXT NOT NULL,
+	"modified"	TEXT NOT NULL,
+	"dateAccepted"	TEXT,
+	"issued"	TEXT,
+	"contributor"	TEXT NOT NULL,
+	"requires"	TEXT NOT NULL,
+	FOREIGN KEY("relation") REFERENCES "cache"("path") ON UPDATE CASCADE ON DELETE RESTRICT
+);
+CREATE TABLE "variants" (
+	"key"	INTEGER,
+	"identifier"	TEXT NOT NULL UNIQUE,
+	"filename"	TEXT NOT NULL,
+	"isPartOf"	TEXT,
+	"data"	BLOB,
+	"format"	TEXT NOT NULL,
+	"hash"	TEXT,
+	PRIMARY KEY("key")
+);
+CREATE TABLE "contents" (
+	"key"	INTEGER,
+	"identifier"	TEXT UNIQUE,
+	"title"	TEXT NOT NULL,
+	PRIMARY KEY("key")
+);
+CREATE TABLE "steps" (
+	"key"	INTEGER,
+	"title"	TEXT NOT NULL,
+	"identifier"	TEXT UNIQUE,
+	"content_id"	TEXT,
+	"successor"	TEXT,
+	"parent"	TEXT,
+	PRIMARY KEY("key"),
+	FOREIGN KEY("content_id") REFERENCES "contents"("identifier") ON UPDATE CASCADE ON DELETE RESTRICT,
+	FOREIGN KEY("parent") REFERENCES "steps"("identifier") ON UPDATE CASCADE ON DELETE RESTRICT,
+	FOREIGN KEY("successor") REFERENCES "steps"("identifier") ON UPDATE CASCADE ON DELETE SET NULL
+);
+CREATE TABLE "mapping" (
+	"content_id"	TEXT,
+	"variant_id"	TEXT,
+	FOREIGN KEY("variant_id") REFERENCES "variants"("identifier") ON UPDATE CASCADE ON DELETE CASCADE,
+	FOREIGN KEY("content_id") REFERENCES "contents"("identifier") ON UPDATE CASCADE ON DELETE CASCADE
+);
+'''
+"""The course database schema, as documented in dokumentation/programmierung.md .
+"""
+
+def quiet():
+	"""Silence the luna_lms logger, which would otherwise dominate the measurements.
+	"""
+
+	LOGGER.setLevel(logging.WARNING)
+
+	return
+
+def enter_workdir():
+	"""Change into a new temporary directory, and return its path.
+	"""
+
+	path = tempfile.mkdtemp(prefix = "luna-bench-")
+
+	os.chdir(path)
+
+	os.mkdir("courses")
+
+	return path
+
+def create_course(path, groups = 10, steps_per_group = 20, title = "Benchmark", asset_size = 4096, media_items = 0):
+	"""Create a course database at path with groups of steps, each step having a HTML variant.
+
+	The cache holds cover.svg, media/asset.bin with asset_size random
+	bytes, and media_items small images media/item<number>.svg .
+
+	Return the course identifier as an UUID.
+	"""
+
+	identifier = uuid.uuid4()
+
+	connection = sqlite3.connect(path)
+
+	connection.executescript(SCHEMA)
+
+	connection.execute('INSERT INTO cache (path, data, format, description) VALUES (?, ?, ?, ?)',
+						("cover.svg", b"<svg></svg>", "image/svg+xml", "Cover"))
+
+	connection.execute('INSERT INTO cache (path, data, format, description) VALUES (?, ?, ?, ?)',
+						("media/asset.bin", os.urandom(asset_size), "application/octet-stream", "Asset"))
+
+	connection.executemany('INSERT INTO cache (path, data, format, description) VALUES (?, ?, ?, ?)',
+							[("media/item{}.svg".format(number), b"<svg></svg>", "image/svg+xml", "Item {}".format(number))
+								for number in range(media_items)])
+
+	connection.execute('''INSERT INTO course (identifier, title, description, relation, created, modified, contributor, requires)
+							VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+						(str(identifier), title, "A synthetic course", "cover.svg", "2023-08-23", "2023-08-23", "Bench", "Luna LMS 0.2.0"))
+
+	steps = []
+
+	for group in range(groups):
+
+		group_id = "g{:05d}".format(group)
+
+		next_group = "g{:05d}".format(group + 1) if group + 1 < groups else None
+
+		steps.append((group_id, "Gruppe {}".format(group), None, next_group, None))
+
+		for step in range(steps_per_group):
+
+			step_id = "s{:03d}{:02d}".format(group, step)
+
+			next_step = "s{:03d}{:02d}".format(group, step + 1) if step + 1 < steps_per_group else None
+
+			steps.append((step_id, "Lern-Inhalt {}.{}".format(group, step), step_id, next_step, group_id))
+
+			connection.execute('INSERT INTO contents (identifier, title) VALUES (?, ?)', (step_id, step_id))
+
+			connection.execute('INSERT INTO variants (identifier, filename, data, format) VALUES (?, ?, ?, ?)',
+								("v" + step_id[1:], "text.html", "<p>Text of step {}</p>".format(step_id) * 20, "text/html"))
+
+			connection.execute('INSERT INTO mapping (content_id, variant_id) VALUES (?, ?)', (step_id, "v" + step_id[1:]))
+
+	connection.executemany('INSERT INTO steps (identifier, title, content_id, successor, parent) VALUES (?, ?, ?, ?, ?)', steps)
+
+	connection.commit()
+
+	connection.close()
+
+	return identifier
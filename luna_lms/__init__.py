@@ -56,6 +56,10 @@ LOGGER.addHandler(STDERR_HANDLER)
 
 gettext.install('luna_lms')
 
+LANGUAGE = "de"
+"""The language of the luna_lms user interface, as an IETF language tag.
+"""
+
 WRITE_LOCK = threading.Lock()
 """A lock to enforce only one thread can write data.
 """
@@ -0,0 +1,558 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from luna_lms import LOGGER
+from luna_lms.compression import is_compressible, gzip_chunks
+import cherrypy
+from cherrypy.process.plugins import Monitor
+import hashlib
+import mimetypes
+import os
+import re
+import time
+import urllib.parse
+import uuid
+
+
+ASSET_HASH_LENGTH = 16
+"""The number of hex digits of the SHA-256 hash used in asset URLs.
+"""
+
+ASSET_URL = "/a/[0-9a-f]{{{}}}/.+".format(ASSET_HASH_LENGTH)
+"""A regular expression matching content-addressed URLs as returned by asset_url() .
+"""
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+"""The Cache-Control header for content-addressed assets, which never change under their URL.
+"""
+
+STATIC_POLL_INTERVAL = 5
+"""The interval in seconds at which AssetManifest checks the directory 'static' for changed files.
+"""
+
+ASSET_REFERENCE = r'''/(?:static|courses/([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}))/([^"'()\s?#]+)'''
+"""A regular expression matching references to files in 'static' and to cached items of courses.
+
+Group 1 is the course identifier, or None for 'static', group 2 the
+path. Only matches directly after a quote or an opening parenthesis,
+that is in attribute values and CSS url(), are references. This is
+checked for each match, since a lookbehind in the expression keeps the
+regular expression engine from searching for the leading '/' quickly.
+"""
+
+REFERENCE_OPENERS = ("\"", "'", "(", b"\"", b"'", b"(")
+"""The characters after which a match of ASSET_REFERENCE is a reference.
+"""
+
+CSS_TOKEN = r'''("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(/\*.*?\*/)|(\s+)|([^"'/\s{};,>:]+|[{};,>:/])'''
+"""A regular expression splitting CSS into strings, comments, whitespace and other tokens, in groups 1 to 4.
+
+Each of { } ; , > : / is a token of its own.
+"""
+
+CSS_IMPORT = r'''@import\s[^;]*;'''
+"""A regular expression matching CSS @import rules.
+"""
+
+def asset_url(digest, path):
+	"""Return the content-addressed URL for path with the SHA-256 hex digest digest.
+	"""
+
+	return "/a/{}/{}".format(digest[:ASSET_HASH_LENGTH], urllib.parse.quote(path))
+
+def minify_css(css):
+	"""Return css with comments removed and whitespace reduced, leaving strings untouched.
+
+	Whitespace is dropped next to { } ; , > and after : , and collapsed
+	to a single space elsewhere, since it separates selectors and values.
+	"""
+
+	result = []
+
+	space = False
+
+	for string, comment, whitespace, text in re.findall(CSS_TOKEN, css, re.DOTALL):
+
+		if comment or whitespace:
+
+			space = True
+
+			continue
+
+		token = string or text
+
+		if space and result and result[-1] not in "{};,>:" and token not in "{};,>":
+
+			result.append(" ")
+
+		if token == "}" and result and result[-1] == ";":
+
+			result.pop()
+
+		space = False
+
+		result.append(token)
+
+	return "".join(result)
+
+def bundle_css(stylesheets):
+	"""Return the list of CSS texts stylesheets as a single minified stylesheet.
+
+	@import rules are only valid at the start of a stylesheet, so they
+	are moved there, in order.
+	"""
+
+	# A byte order mark is only valid at the very start
+	#
+	css = "\n".join([stylesheet.lstrip("\ufeff") for stylesheet in stylesheets])
+
+	imports = re.findall(CSS_IMPORT, css)
+
+	return minify_css("\n".join(imports + [re.sub(CSS_IMPORT, "", css)]))
+
+
+class AssetManifest:
+	"""A map of the files in the directory 'static' and of the cached items of all courses to content-addressed URLs.
+
+	A URL has the form /a/<hash prefix>/<path>, so it changes whenever
+	the content changes, and can be cached by browsers for good.
+
+	AssetManifest.storage
+		The Storage instance providing the hashes of cached items.
+
+	AssetManifest.enabled
+		If False, the manifest is empty and rewrite() returns its input
+		unchanged.
+
+	AssetManifest.static
+		A dict mapping paths relative to 'static' to a tuple
+		(url, size, mtime, digest, gzip), where gzip is the file
+		compressed with gzip, or None if it is not worth compressing.
+
+	AssetManifest.static_sources
+		A dict mapping the URLs of files in 'static' to their paths
+		relative to 'static'.
+
+	AssetManifest.courses
+		A dict mapping UUID ids of courses to a tuple (revision, urls,
+		sources), where urls maps the paths of cached items to URLs, and
+		sources maps URLs back to paths.
+
+	AssetManifest.generated
+		A dict mapping names of generated assets to a dict with the keys
+		"path", "format", "data", "gzip", "hash", "url" and "modified",
+		see add_generated().
+
+	AssetManifest.revision
+		A counter that changes whenever a file in 'static' changes.
+
+	AssetManifest.digest
+		A SHA-256 hex digest over the paths and digests of all files in
+		'static'. Unlike the revision, it is the same in all processes
+		serving the same files.
+
+	AssetManifest.modified
+		The modification time of the newest file in 'static', in seconds
+		since the epoch, or 0 if there are none.
+	"""
+
+	def __init__(self, storage, enabled = True):
+		"""Initialise AssetManifest. The files in 'static' are hashed by start().
+		"""
+
+		self.storage = storage
+
+		self.enabled = enabled
+
+		self.static = {}
+
+		self.static_sources = {}
+
+		self.courses = {}
+
+		self.generated = {}
+
+		# Maps names of generated assets to tuples (format, source)
+		#
+		self.generators = {}
+
+		self.revision = 0
+
+		self.digest = ""
+
+		self.modified = 0
+
+		self.pattern = re.compile(ASSET_REFERENCE)
+
+		self.url_pattern = re.compile(ASSET_URL)
+
+		self.bytes_pattern = re.compile(ASSET_REFERENCE.encode("utf-8"))
+
+		self.started = False
+
+		self.watcher = None
+
+		return
+
+	def start(self, watch = True):
+		"""Hash the files in 'static', and watch the directory for changes if watch is True.
+
+		Nothing is done if content-addressed URLs are disabled. The
+		watcher is a plugin of cherrypy.engine . Calling start() again has
+		no effect until stop() is called.
+		"""
+
+		if not self.enabled:
+
+			LOGGER.info("Content-addressed asset URLs are disabled")
+
+			return
+
+		if self.started:
+
+			LOGGER.debug("AssetManifest has already been started")
+
+			return
+
+		self.started = True
+
+		self.scan_static()
+
+		if not watch:
+
+			return
+
+		LOGGER.debug("Adding watcher for directory 'static', polling every {} seconds".format(STATIC_POLL_INTERVAL))
+
+		self.watcher = Monitor(cherrypy.engine,
+								self.scan_static,
+								frequency = STATIC_POLL_INTERVAL,
+								name = "StaticWatcher")
+
+		self.watcher.subscribe()
+
+		return
+
+	def stop(self):
+		"""Stop watching the directory 'static'. The manifest is kept.
+
+		AssetManifest can be started again with start().
+		"""
+
+		if self.watcher is not None:
+
+			# Stops the polling thread if the engine is running
+			#
+			self.watcher.stop()
+
+			self.watcher.unsubscribe()
+
+			self.watcher = None
+
+		self.started = False
+
+		return
+
+	def scan_static(self):
+		"""Update AssetManifest.static from the directory 'static', hashing only files that are new or have changed.
+		"""
+
+		static = {}
+
+		for directory, subdirectories, filenames in os.walk("static"):
+
+			for filename in filenames:
+
+				path = os.path.join(directory, filename)
+
+				name = os.path.relpath(path, "static").replace(os.sep, "/")
+
+				try:
+					stat = os.stat(path)
+
+				except FileNotFoundError:
+
+					continue
+
+				known = self.static.get(name)
+
+				if known is not None and known[1:3] == (stat.st_size, stat.st_mtime_ns):
+
+					static[name] = known
+
+					continue
+
+				digest = hashlib.sha256()
+
+				compressed = None
+
+				with open(path, mode = "rb") as f:
+
+					if is_compressible(mimetypes.guess_type(name)[0]):
+
+						# Text files in 'static' are small, and are
+						# compressed once here instead of per request.
+						#
+						data = f.read()
+
+						digest.update(data)
+
+						compressed = gzip_chunks([data])
+
+					else:
+						for chunk in iter(lambda: f.read(65536), b""):
+
+							digest.update(chunk)
+
+				static[name] = (asset_url(digest.hexdigest(), name), stat.st_size, stat.st_mtime_ns, digest.hexdigest(), compressed)
+
+		if static != self.static:
+
+			LOGGER.info("Directory 'static' has changed, {} files in asset manifest".format(len(static)))
+
+			self.static_sources = dict([(entry[0], name) for name, entry in static.items()])
+
+			self.static = static
+
+			self.revision += 1
+
+			manifest = hashlib.sha256()
+
+			for name in sorted(static.keys()):
+
+				manifest.update("{} {}\n".format(name, static[name][3]).encode("utf-8"))
+
+			self.digest = manifest.hexdigest()
+
+			self.modified = max([entry[2] for entry in static.values()] or [0]) / 1e9
+
+			# Generated assets may refer to or include files in 'static'
+			#
+			for name in list(self.generators.keys()):
+
+				self._generate(name)
+
+		return
+
+	def add_generated(self, name, format, source):
+		"""Add an asset generated from text, available as /static/<name> and under its content-addressed URL.
+
+		format is the MIME type, and source a callable without arguments
+		returning the text. It is called again whenever a file in
+		'static' changes. References in the text are rewritten, and the
+		data is compressed once with gzip, so that it can be sent as is.
+		"gzip" is None if compressing does not pay off.
+		"""
+
+		self.generators[name] = (format, source)
+
+		self._generate(name)
+
+		return
+
+	def _generate(self, name):
+		"""Build the generated asset name from its source, and store it in AssetManifest.generated .
+		"""
+
+		format, source = self.generators[name]
+
+		data = self.rewrite(source()).encode("utf-8")
+
+		digest = hashlib.sha256(data).hexdigest()
+
+		asset = {"path": name,
+					"format": format,
+					"data": data,
+					"gzip": gzip_chunks([data]),
+					"hash": digest,
+					"url": asset_url(digest, name),
+					"modified": time.time()}
+
+		LOGGER.info("Generated asset {} with {} bytes, {} bytes compressed".format(asset["url"], len(data), len(asset["gzip"] or data)))
+
+		generated = dict(self.generated)
+
+		generated[name] = asset
+
+		self.generated = generated
+
+		return
+
+	def find_generated(self, url):
+		"""Return the generated asset with the content-addressed URL url as a dict, or None.
+		"""
+
+		for asset in list(self.generated.values()):
+
+			if asset["url"] == url:
+
+				return asset
+
+		return None
+
+	def course_urls(self, course):
+		"""Return a dict mapping the paths of the cached items of the course to their URLs.
+
+		The dict is built once per course revision, and must not be
+		modified by the caller.
+		"""
+
+		revision = self.storage.get_revision(course)
+
+		entry = self.courses.get(course)
+
+		if entry is not None and entry[0] == revision:
+
+			return entry[1]
+
+		LOGGER.debug("Building asset URLs for course {} at revision {}".format(course, revision))
+
+		urls = dict([(path, asset_url(digest, path)) for path, digest in self.storage.get_cached_hashes(course).items()])
+
+		sources = dict([(url, path) for path, url in urls.items()])
+
+		self.courses[course] = (revision, urls, sources)
+
+		return urls
+
+	def lookup(self, url):
+		"""Return the source of a content-addressed URL.
+
+		The result is a tuple (None, path) for a file in 'static', a
+		tuple (course, path) for a cached item, or None if the URL is
+		unknown or outdated.
+
+		An unknown URL only makes those courses look up their cached
+		items again that have changed since they were last looked up,
+		so it costs no more than a revision check per course.
+		"""
+
+		if url in self.static_sources:
+
+			return (None, self.static_sources[url])
+
+		if self.url_pattern.fullmatch(url) is None:
+
+			return None
+
+		for refresh in (False, True):
+
+			if refresh:
+
+				# The URL may belong to a course that has not been
+				# rendered since it changed.
+				#
+				for course in list(self.storage.find_courses().keys()):
+
+					if course.__class__ is not uuid.UUID:
+
+						continue
+
+					entry = self.courses.get(course)
+
+					if entry is None or entry[0] != self.storage.get_revision(course):
+
+						self.course_urls(course)
+
+			for course, (revision, urls, sources) in list(self.courses.items()):
+
+				if url in sources and revision == self.storage.get_revision(course):
+
+					return (course, sources[url])
+
+		return None
+
+	def _replace(self, match):
+		"""Return the URL for a match of ASSET_REFERENCE, or the match itself if there is none.
+		"""
+
+		position = match.start()
+
+		if position == 0 or match.string[position - 1:position] not in REFERENCE_OPENERS:
+
+			return match.group(0)
+
+		course, path = match.groups()
+
+		is_bytes = match.string.__class__ is bytes
+
+		if is_bytes:
+
+			course = course and course.decode("utf-8")
+
+			path = path.decode("utf-8")
+
+		path = urllib.parse.unquote(path)
+
+		url = None
+
+		if course is None:
+
+			entry = self.static.get(path)
+
+			if path in self.generated:
+
+				url = self.generated[path]["url"]
+
+			elif entry is not None:
+
+				url = entry[0]
+
+		else:
+			url = self.course_urls(uuid.UUID(course)).get(path)
+
+		if url is None:
+
+			return match.group(0)
+
+		if is_bytes:
+
+			return url.encode("utf-8")
+
+		return url
+
+	def rewrite(self, text):
+		"""Return text, a string or bytes, with all references to known assets replaced by their URLs.
+		"""
+
+		if not self.enabled:
+
+			return text
+
+		if text.__class__ is bytes:
+
+			return self.bytes_pattern.sub(self._replace, text)
+
+		return self.pattern.sub(self._replace, text)
+
+	def rewrite_chunks(self, chunks):
+		"""Yield the chunks of bytes, with all references to known assets replaced by their URLs.
+
+		No reference may span two chunks. Template.stream() only splits
+		at callable slots, so this holds for the page templates.
+		"""
+
+		for chunk in chunks:
+
+			yield self.rewrite(chunk)
+
+		return
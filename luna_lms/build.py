@@ -0,0 +1,348 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from luna_lms import LOGGER
+from luna_lms import VERSION
+from luna_lms import MODI
+from luna_lms.webapp import WebApp
+import cherrypy
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import urllib.parse
+import uuid
+
+MODES = (MODI.TEXT, MODI.TEXT_ZUSATZ, MODI.BILD, MODI.TEXT_BILD)
+"""The presentation modes every step is rendered in.
+"""
+
+MANIFEST_FILENAME = ".luna-build.json"
+"""The name of the file in the course output directory that records what has been built, for incremental rebuilds.
+"""
+
+REDIRECT_HTML = '''<!DOCTYPE html>
+<html>
+<head>
+	<meta charset="utf-8"/>
+	<meta http-equiv="refresh" content="0; url={0}">
+	<link rel="canonical" href="{0}">
+</head>
+<body>
+	<a href="{0}">{0}</a>
+</body>
+</html>
+'''
+"""A page that forwards the browser, replacing HTTP redirects in a static export.
+"""
+
+def write_file(output_directory, relative_path, data):
+	"""Write data to relative_path below output_directory, creating directories as necessary.
+	"""
+
+	write_chunks(output_directory, relative_path, [data])
+
+	return
+
+def write_chunks(output_directory, relative_path, chunks):
+	"""Write the bytes yielded by the iterator chunks to relative_path below output_directory, creating directories as necessary.
+	"""
+
+	path = os.path.join(output_directory, *relative_path.split("/"))
+
+	os.makedirs(os.path.dirname(path), exist_ok = True)
+
+	with open(path, mode="wb") as f:
+
+		for chunk in chunks:
+
+			f.write(chunk)
+
+	return
+
+def copy_static(output_directory):
+	"""Copy the files in the directory 'static' to output_directory, skipping unchanged files.
+
+	Return the number of files copied.
+	"""
+
+	count = 0
+
+	for directory, subdirectories, filenames in os.walk("static"):
+
+		target_directory = os.path.join(output_directory, directory)
+
+		os.makedirs(target_directory, exist_ok = True)
+
+		for filename in filenames:
+
+			source = os.path.join(directory, filename)
+
+			target = os.path.join(target_directory, filename)
+
+			source_stat = os.stat(source)
+
+			if os.path.exists(target):
+
+				target_stat = os.stat(target)
+
+				if target_stat.st_size == source_stat.st_size and target_stat.st_mtime_ns == source_stat.st_mtime_ns:
+
+					continue
+
+			shutil.copy2(source, target)
+
+			count += 1
+
+	return count
+
+def build_course(webapp, course_id, output_directory, full = False):
+	"""Render every step of a course in every mode, and export the pages and the course's cache to output_directory.
+
+	Unless full is True, pages whose inputs have not changed since the
+	last build are kept, and only changed cache items are rewritten.
+
+	Return a dict counting rendered, kept and removed pages and written assets.
+	"""
+
+	LOGGER.info("Building course {} into '{}'".format(course_id, output_directory))
+
+	storage = webapp.storage
+
+	stats = {"rendered": 0, "kept": 0, "removed": 0, "assets": 0}
+
+	view_prefix = "courses/view/{}".format(course_id)
+
+	manifest_path = os.path.join(output_directory, *view_prefix.split("/"), MANIFEST_FILENAME)
+
+	manifest = {"version": "", "pages": {}, "assets": {}}
+
+	if not full and os.path.exists(manifest_path):
+
+		with open(manifest_path, mode="rt", encoding="utf8") as f:
+
+			LOGGER.debug("Attempting to parse " + manifest_path)
+
+			manifest = json.loads(f.read())
+
+	if manifest["version"] != VERSION:
+
+		LOGGER.info("Last build is from Luna LMS version '{}', rendering all pages".format(manifest["version"]))
+
+		manifest["pages"] = {}
+
+	navigation = storage.get_navigation_index(course_id)
+
+	structure, step_hashes = storage.get_step_fingerprints(course_id)
+
+	pages = {}
+
+	# The course address forwards to the first step
+	#
+	first_url = "/{}/{}".format(view_prefix, navigation.first())
+
+	write_file(output_directory, view_prefix + "/index.html", REDIRECT_HTML.format(first_url).encode("utf-8"))
+
+	for identifier in navigation.identifiers:
+
+		# A page shows the step itself, the navigation, and links to its
+		# neighbours. The previous step is only shown if it has content.
+		#
+		previous_id = navigation.previous(identifier)
+
+		for modus in MODES:
+
+			fingerprint = hashlib.sha256(repr((VERSION,
+												structure,
+												step_hashes.get(identifier),
+												step_hashes.get(previous_id),
+												modus)).encode("utf-8")).hexdigest()
+
+			relative_paths = ["{}/{}/{}/index.html".format(view_prefix, identifier, modus)]
+
+			# The text mode is the default, served without a mode in the URL
+			#
+			if modus == MODI.TEXT:
+
+				relative_paths.append("{}/{}/index.html".format(view_prefix, identifier))
+
+			for relative_path in relative_paths:
+
+				pages[relative_path] = fingerprint
+
+			if all([manifest["pages"].get(relative_path) == fingerprint
+					and os.path.exists(os.path.join(output_directory, relative_path))
+					for relative_path in relative_paths]):
+
+				stats["kept"] += 1
+
+				continue
+
+			LOGGER.debug("Rendering step {} in mode '{}'".format(identifier, modus))
+
+			try:
+				data = webapp.render_view(course_id, identifier, modus)
+
+			except cherrypy.HTTPRedirect as redirect:
+
+				target = urllib.parse.urlsplit(redirect.urls[0]).path
+
+				data = REDIRECT_HTML.format(target).encode("utf-8")
+
+			except cherrypy.NotFound:
+
+				LOGGER.warning("Step {} could not be rendered, skipping".format(identifier))
+
+				continue
+
+			for relative_path in relative_paths:
+
+				write_file(output_directory, relative_path, data)
+
+			stats["rendered"] += 1
+
+	# Export the cache, rewriting only items whose content has changed.
+	# The stored hashes tell which ones, so unchanged items are not
+	# read at all.
+
+	assets = {}
+
+	hashes = storage.get_cached_hashes(course_id)
+
+	for path in storage.get_cached_paths(course_id):
+
+		relative_path = "courses/{}/{}".format(course_id, path)
+
+		digest = hashes.get(path)
+
+		data = None
+
+		# Items without a stored hash are read and hashed here
+		#
+		if digest is None:
+
+			data = storage.get_cached_item(course_id, path)["data"]
+
+			digest = hashlib.sha256(data).hexdigest()
+
+		assets[relative_path] = digest
+
+		if manifest["assets"].get(relative_path) == digest and os.path.exists(os.path.join(output_directory, relative_path)):
+
+			continue
+
+		if data is None:
+
+			write_chunks(output_directory, relative_path, storage.get_cached_item_stream(course_id, path)["chunks"])
+
+		else:
+			write_file(output_directory, relative_path, data)
+
+		stats["assets"] += 1
+
+	# Remove files of steps and cache items that no longer exist
+
+	for relative_path in list(manifest["pages"].keys()) + list(manifest["assets"].keys()):
+
+		if relative_path not in pages and relative_path not in assets:
+
+			path = os.path.join(output_directory, *relative_path.split("/"))
+
+			if os.path.exists(path):
+
+				LOGGER.info("Removing stale file {}".format(path))
+
+				os.remove(path)
+
+				stats["removed"] += 1
+
+	manifest = {"version": VERSION, "pages": pages, "assets": assets}
+
+	write_file(output_directory,
+				view_prefix + "/" + MANIFEST_FILENAME,
+				json.dumps(manifest, indent = "\t").encode("utf-8"))
+
+	LOGGER.info("Course {} built: {}".format(course_id, stats))
+
+	return stats
+
+def main():
+	"""Main function, for IDE convenience.
+	"""
+
+	parser = argparse.ArgumentParser(prog = "python -m luna_lms.build",
+										description = "Einen Kurs als statische HTML-Dateien exportieren")
+
+	parser.add_argument("course", help = "UUID oder Titel des Kurses")
+
+	parser.add_argument("--output",
+						default = "build",
+						help = "Ziel-Verzeichnis (Standard: build)")
+
+	parser.add_argument("--full",
+						action = "store_true",
+						help = "alle Seiten neu erzeugen, auch wenn sie sich nicht geändert haben")
+
+	args = parser.parse_args()
+
+	# The export keeps plain paths to 'static' and to the course cache,
+	# which copy_static() and build_course() write.
+	#
+	webapp = WebApp(asset_urls = False)
+
+	webapp.start(watch = False)
+
+	courses = webapp.storage.find_courses()
+
+	course_id = None
+
+	try:
+		course_id = uuid.UUID(args.course)
+
+	except ValueError:
+
+		course_id = courses.get(args.course)
+
+	if course_id not in courses:
+
+		LOGGER.critical("Course '{}' not found".format(args.course))
+
+		webapp.stop()
+
+		return 1
+
+	copy_static(args.output)
+
+	for name, asset in webapp.assets.generated.items():
+
+		write_file(args.output, "static/" + name, asset["data"])
+
+	build_course(webapp, course_id, args.output, args.full)
+
+	webapp.stop()
+
+	return 0
+
+if __name__ == "__main__":
+
+	raise SystemExit(main())
@@ -0,0 +1,109 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import zlib
+
+
+GZIP_LEVEL = 9
+"""The compression level for data that is compressed once and sent many times.
+"""
+
+STREAM_GZIP_LEVEL = 6
+"""The compression level for pages compressed while they are sent.
+"""
+
+COMPRESSIBLE_FORMATS = ("text/",
+						"image/svg+xml",
+						"application/javascript",
+						"application/json",
+						"application/manifest+json",
+						"application/xml",
+						"application/xhtml+xml")
+"""Prefixes of MIME types worth compressing. Images, audio and video are compressed already.
+"""
+
+MINIMUM_SAVINGS = 0.1
+"""The fraction of the size gzip must save for a compressed variant to be kept.
+"""
+
+def is_compressible(format):
+	"""Return True if data of the MIME type format is worth compressing.
+	"""
+
+	return bool(format) and format.lower().startswith(COMPRESSIBLE_FORMATS)
+
+def gzip_compressor(level = GZIP_LEVEL):
+	"""Return a zlib compression object producing the gzip format.
+	"""
+
+	# wbits 16 + 15 selects the gzip header and trailer with the
+	# largest window.
+	#
+	return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+def gzip_chunks(chunks, level = GZIP_LEVEL):
+	"""Return the iterable of bytes chunks compressed with gzip, or None if that saves less than MINIMUM_SAVINGS.
+	"""
+
+	compressor = gzip_compressor(level)
+
+	compressed = []
+
+	size = 0
+
+	for chunk in chunks:
+
+		size += len(chunk)
+
+		compressed.append(compressor.compress(chunk))
+
+	compressed.append(compressor.flush())
+
+	result = b"".join(compressed)
+
+	if len(result) > size * (1 - MINIMUM_SAVINGS):
+
+		return None
+
+	return result
+
+def gzip_stream(chunks, level = STREAM_GZIP_LEVEL):
+	"""Yield the iterable of bytes chunks compressed with gzip.
+
+	The compressor is flushed after each chunk, so that every chunk
+	reaches the client as soon as it is available, at the cost of a few
+	bytes per flush.
+	"""
+
+	compressor = gzip_compressor(level)
+
+	for chunk in chunks:
+
+		data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+		if data:
+
+			yield data
+
+	yield compressor.flush()
+
+	return
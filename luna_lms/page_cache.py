@@ -0,0 +1,171 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from luna_lms import LOGGER
+import collections
+import threading
+
+
+class PageCache:
+	"""A least-recently-used cache for rendered pages, limited by size in bytes.
+
+	Keys are tuples whose first element is the course identifier, for
+	example (course_id, learning_content_id, modus, language, encoding).
+	Each entry remembers the course revision it was rendered from. When a
+	page of a course is looked up with a new revision, all pages of the
+	course are discarded at once, so that stale pages do not take up
+	space until they are evicted.
+
+	PageCache.max_size
+		The maximum total size of all cached pages in bytes.
+
+	PageCache.size
+		The current total size of all cached pages in bytes.
+
+	PageCache.revisions
+		A dict mapping course identifiers to the revision of the last
+		lookup.
+
+	PageCache.hits, PageCache.misses
+		Counters for lookups.
+	"""
+
+	def __init__(self, max_size):
+		"""Initialise PageCache with a maximum size in bytes.
+		"""
+
+		self.max_size = max_size
+
+		self.size = 0
+
+		self.hits = 0
+
+		self.misses = 0
+
+		# Maps keys to tuples (revision, data). The most recently used
+		# entry is at the end.
+		#
+		self.entries = collections.OrderedDict()
+
+		self.revisions = {}
+
+		self.lock = threading.Lock()
+
+		return
+
+	def get(self, key, revision):
+		"""Return the cached bytes for key if they were rendered from revision, else None.
+		"""
+
+		with self.lock:
+
+			if self.revisions.get(key[0], revision) != revision:
+
+				LOGGER.debug("Course {} has a new revision {}, dropping its pages".format(key[0], revision))
+
+				self._remove_course(key[0])
+
+			self.revisions[key[0]] = revision
+
+			entry = self.entries.get(key)
+
+			if entry is None:
+
+				self.misses += 1
+
+				return None
+
+			if entry[0] != revision:
+
+				LOGGER.debug("Dropping stale page {} (revision {}, current revision {})".format(key, entry[0], revision))
+
+				self._remove(key)
+
+				self.misses += 1
+
+				return None
+
+			self.entries.move_to_end(key)
+
+			self.hits += 1
+
+			return entry[1]
+
+	def put(self, key, revision, data):
+		"""Store the bytes data for key, rendered from revision, evicting the least recently used pages as necessary.
+		"""
+
+		if len(data) > self.max_size:
+
+			LOGGER.debug("Page {} with {} bytes exceeds the cache size, not caching".format(key, len(data)))
+
+			return
+
+		with self.lock:
+
+			if key in self.entries:
+
+				self._remove(key)
+
+			self.entries[key] = (revision, data)
+
+			self.size += len(data)
+
+			while self.size > self.max_size:
+
+				evicted_key, (evicted_revision, evicted_data) = self.entries.popitem(last = False)
+
+				self.size -= len(evicted_data)
+
+				LOGGER.debug("Evicted page {} from cache".format(evicted_key))
+
+		return
+
+	def invalidate(self, course):
+		"""Remove all pages of a course from the cache.
+		"""
+
+		with self.lock:
+
+			self._remove_course(course)
+
+		return
+
+	def _remove_course(self, course):
+		"""Remove all pages of a course. The lock must be held by the caller.
+		"""
+
+		for key in [key for key in self.entries.keys() if key[0] == course]:
+
+			self._remove(key)
+
+		return
+
+	def _remove(self, key):
+		"""Remove the entry for key. The lock must be held by the caller.
+		"""
+
+		revision, data = self.entries.pop(key)
+
+		self.size -= len(data)
+
+		return
@@ -0,0 +1,235 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from luna_lms import LOGGER
+import cherrypy
+from cherrypy.process.plugins import Monitor
+import os
+import threading
+
+
+PAGES_POLL_INTERVAL = 5
+"""The interval in seconds at which PageSources checks the directories 'pages' and 'static' for changed files.
+"""
+
+def parse_page(lines):
+	"""Split the lines of a page in 'pages' into a tuple (heading, content).
+
+	heading is the text of the first line starting with <h1, or None if
+	there is none, and content the list of all other lines.
+	"""
+
+	heading = None
+
+	content = []
+
+	for line in lines:
+
+		if line.strip().startswith('<h1'):
+
+			# NOTE: Yes, one should always use a full-blown SGML parser.
+			# We play dirty here for that single line.
+			# This will fail in a lot of valid cases, but do the
+			# right thing in most.
+			#
+			heading = line.split('>')[1].split('</')[0]
+
+		else:
+			content.append(line)
+
+	return (heading, content)
+
+
+class PageSources:
+	"""The parsed pages in the directory 'pages', and the choice of the logo in 'static', kept in memory.
+
+	Requests look up pages here instead of in the file system. Pages are
+	read by start(). A watcher checks the modification times of the
+	files every PAGES_POLL_INTERVAL seconds, and parses changed pages
+	again.
+
+	PageSources.pages
+		A dict mapping page names, the file names without ".html", to a
+		tuple (heading, content) as returned by parse_page() .
+
+	PageSources.logo_file
+		The file name of the logo in the directory 'static', preferring
+		a custom logo.svg over logo.default.svg .
+	"""
+
+	def __init__(self):
+		"""Initialise PageSources. No pages are read before start() is called.
+		"""
+
+		self.pages = {}
+
+		self.logo_file = "logo.default.svg"
+
+		# Maps page names to the modification time of their file
+		#
+		self.mtimes = {}
+
+		self.lock = threading.Lock()
+
+		self.started = False
+
+		self.watcher = None
+
+		return
+
+	def start(self, watch = True):
+		"""Read all pages, and watch the directories for changes if watch is True.
+
+		The watcher is a plugin of cherrypy.engine . Calling start() again
+		has no effect until stop() is called.
+		"""
+
+		if self.started:
+
+			LOGGER.debug("PageSources has already been started")
+
+			return
+
+		self.started = True
+
+		self.scan()
+
+		if not watch:
+
+			return
+
+		LOGGER.debug("Adding watcher for directory 'pages', polling every {} seconds".format(PAGES_POLL_INTERVAL))
+
+		self.watcher = Monitor(cherrypy.engine,
+								self.scan,
+								frequency = PAGES_POLL_INTERVAL,
+								name = "PagesWatcher")
+
+		self.watcher.subscribe()
+
+		return
+
+	def stop(self):
+		"""Stop watching the directories. The pages read so far are kept.
+
+		PageSources can be started again with start().
+		"""
+
+		if self.watcher is not None:
+
+			# Stops the polling thread if the engine is running
+			#
+			self.watcher.stop()
+
+			self.watcher.unsubscribe()
+
+			self.watcher = None
+
+		self.started = False
+
+		return
+
+	def scan(self):
+		"""Update PageSources.pages and PageSources.logo_file, parsing only pages that are new or have changed.
+		"""
+
+		with self.lock:
+
+			mtimes = {}
+
+			try:
+				with os.scandir("pages") as entries:
+
+					for entry in entries:
+
+						if entry.is_file() and entry.name.endswith(".html"):
+
+							mtimes[entry.name[:-len(".html")]] = entry.stat().st_mtime_ns
+
+			except FileNotFoundError:
+
+				LOGGER.warning("Directory 'pages' does not exist")
+
+			if mtimes != self.mtimes:
+
+				pages = {}
+
+				for name, mtime in mtimes.items():
+
+					if name in self.pages and self.mtimes.get(name) == mtime:
+
+						pages[name] = self.pages[name]
+
+						continue
+
+					LOGGER.debug("Reading page '{}'".format(name))
+
+					try:
+						with open(os.path.join("pages", name + ".html"), "rt") as f:
+
+							pages[name] = parse_page(f.readlines())
+
+					except (FileNotFoundError, UnicodeDecodeError) as error:
+
+						LOGGER.warning("Could not read page '{}': {}".format(name, error))
+
+				LOGGER.info("Directory 'pages' has changed, {} pages available".format(len(pages)))
+
+				self.pages = pages
+
+				self.mtimes = mtimes
+
+			logo_file = "logo.default.svg"
+
+			if os.path.exists(os.path.join("static", "logo.svg")):
+
+				logo_file = "logo.svg"
+
+			if logo_file != self.logo_file:
+
+				LOGGER.info("Using logo 'static/{}'".format(logo_file))
+
+				self.logo_file = logo_file
+
+		return
+
+	def find(self, name):
+		"""Return the name of the page to show for name, preferring a custom page over a default one, or None if there is neither.
+		"""
+
+		if name in self.pages:
+
+			return name
+
+		if name + ".default" in self.pages:
+
+			return name + ".default"
+
+		return None
+
+	def get(self, name):
+		"""Return the page name as a tuple (heading, content), or None if it does not exist.
+
+		The content list must not be modified by the caller.
+		"""
+
+		return self.pages.get(name)
@@ -0,0 +1,267 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from luna_lms import LOGGER
+import sqlite3
+import threading
+
+
+CACHED_STATEMENTS = 256
+"""The number of parsed statements sqlite3 keeps per connection.
+
+This covers every statement in luna_lms.storage.queries with room to
+spare, so each one is parsed once per connection.
+"""
+
+class ConnectionPool:
+	"""The connections to the sqlite database of one course.
+
+	Each thread gets its own read connection, opened on first use, so
+	that readers in different threads do not share a connection handle.
+	Read connections are set to PRAGMA query_only. All writes go through
+	a single writer connection, guarded by a lock. The database is
+	switched to WAL mode, so readers are not blocked by the writer.
+
+	ConnectionPool.path
+		The path of the sqlite file.
+
+	ConnectionPool.pragmas
+		A dict mapping names of sqlite PRAGMAs to values, applied to every
+		connection when it is opened. "journal_mode" is a property of the
+		database file, and is only applied by the writer.
+
+	ConnectionPool.writer
+		The sqlite3.Connection for writing. By convention,
+		ConnectionPool.write_lock must be acquired to use it.
+
+	ConnectionPool.write_lock
+		A threading.Lock serialising writes.
+
+	ConnectionPool.readers
+		A list of all read connections opened so far, in any thread.
+
+	ConnectionPool.monitor
+		A read connection for data_version(), opened on first use, or
+		None.
+	"""
+
+	def __init__(self, path, pragmas = None):
+		"""Initialise ConnectionPool by opening the writer connection to the sqlite file at path.
+
+		pragmas is an optional dict of PRAGMA names and values, see
+		ConnectionPool.pragmas . By default, only WAL mode is set.
+		"""
+
+		LOGGER.debug("Opening connection pool for {}".format(path))
+
+		self.path = path
+
+		if pragmas is None:
+
+			pragmas = {"journal_mode": "WAL"}
+
+		self.pragmas = pragmas
+
+		# The writer is used by whichever thread holds the lock, so it
+		# must not be bound to the thread that opened it.
+		#
+		self.writer = sqlite3.connect(path,
+										check_same_thread = False,
+										cached_statements = CACHED_STATEMENTS)
+
+		self.writer.execute("PRAGMA foreign_keys = ON")
+
+		if "journal_mode" in pragmas:
+
+			try:
+				journal_mode = self.writer.execute("PRAGMA journal_mode = {}".format(pragmas["journal_mode"])).fetchone()[0]
+
+				if journal_mode != pragmas["journal_mode"].lower():
+
+					LOGGER.warning("Could not switch {} to journal mode {}, journal mode is '{}'".format(path, pragmas["journal_mode"], journal_mode))
+
+			except sqlite3.OperationalError as error:
+
+				LOGGER.warning("Could not switch {} to journal mode {}: {}".format(path, pragmas["journal_mode"], error))
+
+		self._configure(self.writer)
+
+		self.write_lock = threading.Lock()
+
+		self.readers = []
+
+		# Guards ConnectionPool.readers, which is appended to from all
+		# threads.
+		#
+		self.readers_lock = threading.Lock()
+
+		self.local = threading.local()
+
+		self.monitor = None
+
+		# Guards ConnectionPool.monitor, which is shared by all threads
+		#
+		self.monitor_lock = threading.Lock()
+
+		self.closed = False
+
+		return
+
+	def read(self):
+		"""Return the read connection of the current thread, opening it if necessary.
+		"""
+
+		connection = getattr(self.local, "connection", None)
+
+		if connection is None:
+
+			if self.closed:
+
+				raise sqlite3.ProgrammingError("Connection pool for {} has been closed".format(self.path))
+
+			LOGGER.debug("Opening read connection to {} in thread {}".format(self.path, threading.current_thread().name))
+
+			# The connection is only used by this thread, but close() may
+			# be called from another one.
+			#
+			connection = sqlite3.connect(self.path,
+											check_same_thread = False,
+											cached_statements = CACHED_STATEMENTS)
+
+			connection.execute("PRAGMA foreign_keys = ON")
+
+			connection.execute("PRAGMA query_only = ON")
+
+			self._configure(connection)
+
+			with self.readers_lock:
+
+				self.readers.append(connection)
+
+			self.local.connection = connection
+
+		return connection
+
+	def data_version(self):
+		"""Return the data version of the database, an integer that changes whenever another connection commits a change.
+
+		This includes the writer of this pool, and connections in other
+		processes. The check only reads the shared memory of the WAL, so
+		it is cheap enough to be done for every request.
+		"""
+
+		with self.monitor_lock:
+
+			if self.monitor is None:
+
+				if self.closed:
+
+					raise sqlite3.ProgrammingError("Connection pool for {} has been closed".format(self.path))
+
+				self.monitor = sqlite3.connect(self.path,
+												check_same_thread = False,
+												cached_statements = CACHED_STATEMENTS)
+
+				self.monitor.execute("PRAGMA query_only = ON")
+
+				self._configure(self.monitor)
+
+			return self.monitor.execute("PRAGMA data_version").fetchone()[0]
+
+	def _configure(self, connection):
+		"""Apply ConnectionPool.pragmas, except the journal mode, to connection.
+		"""
+
+		for name, value in self.pragmas.items():
+
+			if name != "journal_mode":
+
+				connection.execute("PRAGMA {} = {}".format(name, value))
+
+		return
+
+	def diagnostics(self):
+		"""Return a dict of the settings in effect for the read connection of the current thread.
+
+		The values are read back from sqlite, so they show what has
+		actually been applied, e.g. when mmap_size is capped at
+		compile time.
+		"""
+
+		connection = self.read()
+
+		result = {}
+
+		for name in ("journal_mode",
+						"synchronous",
+						"cache_size",
+						"mmap_size",
+						"temp_store",
+						"busy_timeout",
+						"page_size",
+						"page_count",
+						"query_only"):
+
+			result[name] = connection.execute("PRAGMA {}".format(name)).fetchone()[0]
+
+		with self.readers_lock:
+
+			result["read_connections"] = len(self.readers)
+
+		return result
+
+	def close(self):
+		"""Commit and close the writer connection, and close all read connections.
+		"""
+
+		LOGGER.debug("Acquiring write lock for {}".format(self.path))
+
+		with self.write_lock:
+
+			self.closed = True
+
+			# close() does not implicitly commit, so we commit
+			# just to be sure.
+			#
+			self.writer.commit()
+
+			self.writer.close()
+
+		with self.readers_lock:
+
+			LOGGER.debug("Closing {} read connections to {}".format(len(self.readers), self.path))
+
+			for connection in self.readers:
+
+				connection.close()
+
+			self.readers = []
+
+		with self.monitor_lock:
+
+			if self.monitor is not None:
+
+				self.monitor.close()
+
+				self.monitor = None
+
+		return
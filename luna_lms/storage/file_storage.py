@@ -22,12 +22,303 @@
 
 from luna_lms import LOGGER
 from luna_lms import ADDITIONAL_CONFIG
+from luna_lms import IMAGE_TYPES
 from luna_lms.storage.storage import Storage
-import sys
+import cherrypy
+from cherrypy.process.plugins import Monitor
+import contextlib
+import json
 import os
+import shutil
+import sys
+import threading
+import uuid
+
+# fcntl is only available on Unix. Elsewhere, writes are only locked
+# within the process.
+#
+try:
+	import fcntl
+
+except ImportError:
+
+	fcntl = None
+
+
+KURSE_POLL_INTERVAL = 5
+"""The interval in seconds at which FileStorage checks the directory 'Kurse' for changed files.
+"""
+
+def directory_mtimes(path, mtimes):
+	"""Add the modification times in nanoseconds of the directory path and of everything below it to the dict mtimes, mapping paths to times, and return mtimes.
+	"""
+
+	mtimes[path] = os.stat(path).st_mtime_ns
+
+	with os.scandir(path) as entries:
+
+		for entry in entries:
+
+			if entry.is_dir():
+
+				directory_mtimes(entry.path, mtimes)
+
+			else:
+				mtimes[entry.path] = entry.stat().st_mtime_ns
+
+	return mtimes
+
+@contextlib.contextmanager
+def replacing_file(path, binary = False):
+	"""Open a temporary file next to path for writing, and move it to path when the block is left without an exception.
+
+	Readers see either the old file or the complete new one, never a
+	partially written file. On an exception, the temporary file is
+	removed and path is left unchanged.
+	"""
+
+	directory, name = os.path.split(path)
+
+	temporary_path = os.path.join(directory, ".{}.{}-{}.tmp".format(name, os.getpid(), threading.get_ident()))
+
+	try:
+		if binary:
+
+			f = open(temporary_path, mode="xb")
+
+		else:
+			f = open(temporary_path, mode="xt", encoding="utf8")
+
+		with f:
+
+			yield f
+
+			f.flush()
+
+			os.fsync(f.fileno())
+
+		os.replace(temporary_path, path)
+
+	except BaseException:
+
+		if os.path.exists(temporary_path):
+
+			os.remove(temporary_path)
+
+		raise
+
+	return
+
+class WriteLock:
+	"""A lock held by one thread in one process at a time.
+
+	WriteLock combines a threading.Lock with an advisory fcntl lock on a
+	lock file, so that worker processes sharing the directory 'Kurse'
+	wait for each other. Use it as a context manager.
+
+	WriteLock.path
+		The path of the lock file. It is created on first use, and
+		removed by remove() when the course or learning content it
+		protects is deleted.
+	"""
+
+	def __init__(self, path):
+		"""Initialise WriteLock for the lock file at path.
+		"""
+
+		self.path = path
+
+		self.lock = threading.Lock()
+
+		self.file = None
+
+		return
+
+	def __enter__(self):
+		"""Acquire the thread lock, then the lock on the lock file.
+		"""
+
+		self.lock.acquire()
+
+		if fcntl is None:
+
+			return self
+
+		try:
+			while True:
+
+				self.file = open(self.path, mode="ab")
+
+				fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+
+				# The lock file may have been removed while waiting, and
+				# another process may hold a lock on a new one.
+				#
+				try:
+					if os.stat(self.path).st_ino == os.fstat(self.file.fileno()).st_ino:
+
+						break
+
+				except FileNotFoundError:
+
+					pass
+
+				self.file.close()
+
+				self.file = None
+
+		except BaseException:
+
+			if self.file is not None:
+
+				self.file.close()
+
+				self.file = None
+
+			self.lock.release()
+
+			raise
+
+		return self
+
+	def __exit__(self, exception_type, exception, traceback):
+		"""Release the lock on the lock file, then the thread lock.
+		"""
+
+		if self.file is not None:
+
+			# Closing the file releases the fcntl lock
+			#
+			self.file.close()
+
+			self.file = None
+
+		self.lock.release()
+
+		return False
+
+	def remove(self):
+		"""Remove the lock file. Call this while holding the lock, so that processes waiting for it notice, and lock a new file.
+		"""
+
+		try:
+			os.remove(self.path)
+
+		except FileNotFoundError:
+
+			pass
+
+		return
+
+def read_json_file(path):
+	"""Return the content of the JSON file at path, or None if it can not be read.
+	"""
+
+	LOGGER.debug("Attempting to parse " + path)
+
+	try:
+		with open(path, mode="rt", encoding="utf8") as f:
+
+			return json.loads(f.read())
+
+	except (OSError, ValueError) as error:
+
+		LOGGER.warning("Could not read {}: {}".format(path, error))
+
+	return None
+
+def index_directory(path, depth):
+	"""Read all meta and HTML files in the directory path, and return them as a dict.
+
+	Temporary files of replacing_file() are ignored.
+
+	The dict has the keys "meta", mapping file names without ".meta" to
+	the parsed meta files, "html", mapping names of HTML files to their
+	content, and "directories", mapping names of subdirectories to their
+	index, or to None below depth. Names are sorted.
+	"""
+
+	index = {"meta": {}, "html": {}, "directories": {}}
+
+	for name in sorted(os.listdir(path)):
+
+		file_path = os.path.join(path, name)
+
+		if os.path.isdir(file_path):
+
+			index["directories"][name] = None
+
+			if depth > 0:
+
+				index["directories"][name] = index_directory(file_path, depth - 1)
+
+		elif name.endswith(".meta"):
+
+			meta_data = read_json_file(file_path)
+
+			if meta_data is not None:
+
+				index["meta"][name[:-len(".meta")]] = meta_data
+
+		elif name.endswith(".html"):
+
+			try:
+				with open(file_path, mode="rt", encoding="utf8") as f:
+
+					index["html"][name] = f.read()
+
+			except (OSError, UnicodeDecodeError) as error:
+
+				LOGGER.warning("Could not read {}: {}".format(file_path, error))
+
+	return index
+
+def index_course(title):
+	"""Read the course JSON file and all meta and HTML files of the learning contents of the course title, and return them as a dict.
+
+	The dict has the keys "data", the parsed course JSON file or None,
+	and "learning_contents", mapping learning content identifiers to
+	their index as returned by index_directory() .
+	"""
+
+	LOGGER.debug("Indexing course '{}'".format(title))
+
+	course = {"data": read_json_file(os.path.join("Kurse", title, title + ".json")),
+				"learning_contents": {}}
+
+	path = os.path.join("Kurse", title, "Lern-Inhalte")
+
+	if os.path.isdir(path):
+
+		for name in sorted(os.listdir(path)):
+
+			if os.path.isdir(os.path.join(path, name)):
+
+				course["learning_contents"][name] = index_directory(os.path.join(path, name), 1)
+
+	return course
+
 
 class FileStorage(Storage):
 	"""This class stores data in a folder hierarchy on disk.
+
+	Course JSON files, meta files and HTML files are read once into an
+	index in memory, and all read methods answer from there. A watcher
+	compares the modification times of all files in 'Kurse' every
+	KURSE_POLL_INTERVAL seconds, and reads changed courses again. The
+	write methods update the index right away.
+
+	Writes lock the course, or the learning content they change, so
+	that authors working on different courses do not wait for each
+	other. The locks are WriteLock instances, so they also hold across
+	worker processes. Files are written with replacing_file() .
+
+	FileStorage.index
+		A dict mapping course titles to their index as returned by
+		index_course() .
+
+	FileStorage.courses
+		A dict mapping course titles to their IDs, and IDs to titles.
 	"""
 
 	def __init__(self):
@@ -36,6 +327,33 @@ class FileStorage(Storage):
 
 		LOGGER.info("Initialising FileStorage in working directory {}".format(sys.path[0]))
 
+		self.index = {}
+
+		self.courses = {}
+
+		# The titles of all directories in 'Kurse', including those
+		# without a course JSON file
+		#
+		self.titles = []
+
+		# Maps course titles to a dict mapping the paths of all files in
+		# the course directory to their modification time
+		#
+		self.mtimes = {}
+
+		self.index_lock = threading.Lock()
+
+		# Maps tuples (course_title,) and (course_title,
+		# learning_content_id) to WriteLock instances, see write_lock()
+		#
+		self.write_locks = {}
+
+		self.write_locks_lock = threading.Lock()
+
+		self.started = False
+
+		self.watcher = None
+
 		# Note: This exposes the whole courses directory world-readable,
 		# once the file URLs are known. Directories are not listed.
 		#
@@ -64,101 +382,338 @@ class FileStorage(Storage):
 
 		return
 
-	def find_courses(self):
-		"""Search for courses, and return a dict mapping their titles to their IDs, and IDs to titles.
+	def start(self, watch = True):
+		"""Read all courses in the directory 'Kurse' into the index, and watch the directory for changes if watch is True.
+
+		Calling start() again has no effect until stop() is called.
 		"""
 
-		# TODO: This is a very expensive operation. Titles and IDs should be cached somehow.
+		if self.started:
 
-		result = {}
+			LOGGER.debug("FileStorage has already been started")
 
-		# Yes, Unix-style paths are okay for glob
-		#
-		for path in glob.glob("Kurse/*"):
+			return
 
-			title = path.replace("Kurse/", "")
+		self.started = True
 
-			json_path = os.path.join("Kurse", title, title + ".json")
+		self.scan_courses()
 
-			if os.path.exists(json_path):
+		if not watch:
 
-				with open(json_path, mode="rt", encoding="utf8") as f:
+			return
 
-					LOGGER.debug("Attempting to parse " + json_path)
+		LOGGER.debug("Adding watcher for directory 'Kurse', polling every {} seconds".format(KURSE_POLL_INTERVAL))
 
-					# We're using type UUID, not string, here, since,
-					# in theory, one could use an UUID as a title,
-					# which would confuse the dict.
-					# Doing it that way, it's always mapping of
-					# UUID -> string, and string -> UUID.
-					#
-					identifier = uuid.UUID(json.loads(f.read())["identifier"])
+		self.watcher = Monitor(cherrypy.engine,
+								self.scan_courses,
+								frequency = KURSE_POLL_INTERVAL,
+								name = "KurseWatcher")
 
-					result[title] = identifier
-					result[identifier] = title
+		self.watcher.subscribe()
 
-		return result
+		return
 
-	def get_image(self, course_title, learning_content_id):
-		"""Return the URI to the first image found in the learning content, or an empty string.
+	def stop(self):
+		"""Stop watching the directory 'Kurse', and empty the index.
+
+		The storage can be started again with start().
 		"""
 
-		LOGGER.debug("get_image(course_title = '{}', learning_content_id = '{}')".format(course_title, learning_content_id))
+		if self.watcher is not None:
 
-		image_path = ""
+			self.watcher.stop()
 
-		# We do not trust file suffixes, and use the MIME type
-		# as stored in the meta file.
+			self.watcher.unsubscribe()
 
-		meta_paths = glob.glob("Kurse/"
-								+ course_title
-								+ "/Lern-Inhalte/"
-								+ learning_content_id
-								+ "/*.meta")
+			self.watcher = None
 
-		while len(meta_paths) and not image_path:
+		self.started = False
 
-			current_path = meta_paths.pop()
+		with self.index_lock:
 
-			with open(current_path, mode="rt", encoding="utf8") as f:
+			self.index = {}
 
-				LOGGER.debug("Attempting to parse " + current_path)
+			self.courses = {}
 
-				meta_data = json.loads(f.read())
+			self.titles = []
 
-				# TODO: Don't inconsistently check for required fields. Either they are there, or we are in trouble, and should fail and report.
-				#
-				if "format" in meta_data and meta_data["format"] in IMAGE_TYPES:
+			self.mtimes = {}
+
+		return
+
+	def scan_courses(self):
+		"""Check the modification times of all files in the directory 'Kurse', and read courses that are new or have changed into the index.
+
+		Unchanged courses are not read again.
+		"""
+
+		with self.index_lock:
+
+			try:
+				titles = sorted([name for name in os.listdir("Kurse")
+									if os.path.isdir(os.path.join("Kurse", name))])
+
+			except FileNotFoundError:
+
+				titles = []
+
+			index = {}
+
+			mtimes = {}
 
-					# Fix for URI usage
+			courses = {}
+
+			for title in titles:
+
+				try:
+					mtimes[title], index[title] = self._index_changed(title)
+
+				except FileNotFoundError:
+
+					# Removed while scanning, or a broken link
 					#
-					image_path = current_path.replace("Kurse/", "/static/").replace(".meta", "")
+					mtimes.pop(title, None)
 
-		return image_path
+					continue
 
-	def get_html(self, course_title, learning_content_id):
-		"""Return the content of the first HTML file found in the learning content, or an empty string.
+				if index[title]["data"] is None:
+
+					continue
+
+				# We're using type UUID, not string, here, since,
+				# in theory, one could use an UUID as a title,
+				# which would confuse the dict.
+				# Doing it that way, it's always mapping of
+				# UUID -> string, and string -> UUID.
+				#
+				identifier = uuid.UUID(index[title]["data"]["identifier"])
+
+				courses[title] = identifier
+				courses[identifier] = title
+
+			if titles != self.titles:
+
+				LOGGER.info("Directory 'Kurse' has changed, {} courses available".format(len(titles)))
+
+			self.titles = titles
+
+			self.mtimes = mtimes
+
+			self.index = index
+
+			self.courses = courses
+
+		return
+
+	def scan_course(self, title):
+		"""Check the modification times of the files of the course title, and read the course into the index again if it is new or has changed.
+
+		The course is removed from the index if its directory is gone.
+		Writes call this after acquiring their lock, instead of checking
+		all of 'Kurse' with scan_courses() .
 		"""
 
-		LOGGER.debug("get_html(course_title = '{}', learning_content_id = '{}')".format(course_title, learning_content_id))
+		with self.index_lock:
 
-		html = ""
+			# Readers use the dicts without locking, so they are
+			# replaced, not changed.
+			#
+			index = dict(self.index)
+
+			mtimes = dict(self.mtimes)
+
+			courses = dict(self.courses)
+
+			titles = [existing for existing in self.titles if existing != title]
+
+			identifier = courses.pop(title, None)
+
+			if identifier is not None:
+
+				courses.pop(identifier, None)
+
+			try:
+				if not os.path.isdir(os.path.join("Kurse", title)):
+
+					raise FileNotFoundError(title)
+
+				mtimes[title], index[title] = self._index_changed(title)
+
+				titles = sorted(titles + [title])
+
+				if index[title]["data"] is not None:
+
+					identifier = uuid.UUID(index[title]["data"]["identifier"])
+
+					courses[title] = identifier
+					courses[identifier] = title
+
+			except FileNotFoundError:
+
+				index.pop(title, None)
+
+				mtimes.pop(title, None)
+
+			self.titles = titles
+
+			self.mtimes = mtimes
+
+			self.index = index
+
+			self.courses = courses
+
+		return
+
+	def _index_changed(self, title):
+		"""Return a tuple (mtimes, index) for the course title, reading the course again only if the modification times of its files have changed.
+
+		Raises FileNotFoundError if the course directory is removed
+		meanwhile. Call with FileStorage.index_lock held.
+		"""
+
+		mtimes = directory_mtimes(os.path.join("Kurse", title), {})
+
+		if title in self.index and self.mtimes.get(title) == mtimes:
+
+			return (mtimes, self.index[title])
+
+		return (mtimes, index_course(title))
+
+	def write_lock(self, course_title, learning_content_id = None):
+		"""Return the WriteLock for writes to the course, or to one of its learning contents if learning_content_id is given.
+
+		A write that changes the course JSON file locks the course. A
+		write that only changes files of a learning content locks the
+		learning content. A write that needs both acquires the course
+		lock first. Deleting the course also removes the files of all
+		learning contents, so it holds all of their locks as well.
+
+		The lock files are hidden files in the directory 'Kurse', and are
+		removed along with their course or learning content. Other
+		processes may have changed the course before the lock was
+		acquired, so writes that consult the index rescan the course
+		with scan_course() first.
+		"""
+
+		key = (course_title,)
+
+		if learning_content_id is not None:
+
+			key = (course_title, learning_content_id)
+
+		with self.write_locks_lock:
+
+			if key not in self.write_locks:
+
+				self.write_locks[key] = WriteLock(os.path.join("Kurse", "." + ".".join(key) + ".lock"))
+
+			return self.write_locks[key]
+
+	def _remove_locks(self, keys):
+		"""Remove the WriteLock instances and lock files for keys as used by write_lock(), of a deleted course or learning content.
+
+		The locks must be held by the caller.
+		"""
+
+		with self.write_locks_lock:
+
+			for key in keys:
+
+				lock = self.write_locks.pop(key, None)
+
+				if lock is not None:
+
+					lock.remove()
+
+		return
+
+	def _learning_content(self, course_title, learning_content_id):
+		"""Return the index of the learning content as returned by index_directory(), or None if it does not exist.
+		"""
 
-		# Yes, Unix-style paths are okay for glob.
+		if course_title not in self.index.keys():
+
+			self.scan_courses()
+
+			if course_title not in self.index.keys():
+
+				LOGGER.error("Course '{}' not found in available courses".format(course_title))
+
+				return None
+
+		learning_content = self.index[course_title]["learning_contents"].get(learning_content_id)
+
+		if learning_content is None:
+
+			LOGGER.error("Learning content {} not found in course '{}'".format(learning_content_id, course_title))
+
+		return learning_content
+
+	def _course_data(self, course_title):
+		"""Return the parsed course JSON file of the course, or None if it does not exist.
+		"""
+
+		if course_title not in self.index.keys():
+
+			self.scan_courses()
+
+		course = self.index.get(course_title)
+
+		if course is None or course["data"] is None:
+
+			LOGGER.error("Course '{}' not found in available courses".format(course_title))
+
+			return None
+
+		return course["data"]
+
+	def find_courses(self):
+		"""Return a dict mapping the titles of available courses to their IDs, and IDs to titles.
+
+		This is a lookup in FileStorage.courses . The dict must not be
+		modified by the caller.
+		"""
+
+		return self.courses
+
+	def get_image(self, course_title, learning_content_id):
+		"""Return the URI to the first image found in the learning content, or an empty string.
+		"""
+
+		LOGGER.debug("get_image(course_title = '{}', learning_content_id = '{}')".format(course_title, learning_content_id))
+
+		learning_content = self._learning_content(course_title, learning_content_id)
+
+		if learning_content is None:
+
+			return ""
+
+		# We do not trust file suffixes, and use the MIME type
+		# as stored in the meta file.
 		#
-		html_paths = glob.glob("Kurse/"
-								+ course_title
-								+ "/Lern-Inhalte/"
-								+ learning_content_id
-								+ "/*.html")
+		for name, meta_data in learning_content["meta"].items():
 
-		if len(html_paths):
+			# TODO: Don't inconsistently check for required fields. Either they are there, or we are in trouble, and should fail and report.
+			#
+			if meta_data.get("format") in IMAGE_TYPES:
 
-			with open(html_paths[0], mode="rt", encoding="utf8") as f:
+				return "/static/{}/Lern-Inhalte/{}/{}".format(course_title, learning_content_id, name)
 
-				html = f.read()
+		return ""
 
-		return html
+	def get_html(self, course_title, learning_content_id):
+		"""Return the content of the first HTML file found in the learning content, or an empty string.
+		"""
+
+		LOGGER.debug("get_html(course_title = '{}', learning_content_id = '{}')".format(course_title, learning_content_id))
+
+		learning_content = self._learning_content(course_title, learning_content_id)
+
+		if learning_content is None or not learning_content["html"]:
+
+			return ""
+
+		return next(iter(learning_content["html"].values()))
 
 	def get_directory(self, course_title, learning_content_id):
 		"""Return a tuple (directory_name, html) with the name of the first directory found in the learning content, and the content of the first HTML file found in there.
@@ -167,38 +722,19 @@ class FileStorage(Storage):
 
 		LOGGER.debug("get_directory(course_title = '{}', learning_content_id = '{}')".format(course_title, learning_content_id))
 
-		directory_name = ""
+		learning_content = self._learning_content(course_title, learning_content_id)
 
-		directories = [os.path.split(path)[1] for path in glob.glob("Kurse/"
-																	+ course_title
-																	+ "/Lern-Inhalte/"
-																	+ learning_content_id
-																	+ "/*")
-						if os.path.isdir(path)]
+		if learning_content is None or not learning_content["directories"]:
 
-		if len(directories):
+			return ("", "")
 
-			directory_name = directories[0]
+		directory_name, directory = next(iter(learning_content["directories"].items()))
 
 		html = ""
 
-		if directory_name:
-
-			# Yes, Unix-style paths are okay for glob.
-			#
-			html_paths = glob.glob("Kurse/"
-									+ course_title
-									+ "/Lern-Inhalte/"
-									+ learning_content_id
-									+ "/"
-									+ directory_name
-									+ "/*.html")
-
-			if len(html_paths):
-
-				with open(html_paths[0], mode="rt", encoding="utf8") as f:
+		if directory["html"]:
 
-					html = f.read()
+			html = next(iter(directory["html"].values()))
 
 		return (directory_name, html)
 
@@ -206,96 +742,74 @@ class FileStorage(Storage):
 		"""Return a list of titles of existing courses.
 		"""
 
-		return [os.path.split(path)[1] for path in glob.glob("Kurse/*")
-				if os.path.isdir(path)]
+		return list(self.titles)
 
 	def get_learning_contents(self, course_title):
 		"""Return a list of learning contents identifiers for a course in arbitrary order.
 		"""
 
-		# Yes, Unix-style paths are okay for glob.
-		#
-		return [os.path.split(path)[1] for path in glob.glob("Kurse/"
-																+ course_title
-																+ "/Lern-Inhalte/*")
-				if os.path.isdir(path)]
+		if course_title not in self.index.keys():
+
+			self.scan_courses()
+
+		if course_title not in self.index.keys():
+
+			return []
+
+		return list(self.index[course_title]["learning_contents"].keys())
 
 	def get_learning_contents_ordered(self, course_title):
 		"""Return a list of learning contents identifiers for a course in order.
 		"""
 
-		json_path = os.path.join("Kurse",
-									course_title,
-									course_title + ".json")
+		data = self._course_data(course_title)
 
-		with open(json_path, mode="rt", encoding="utf8") as f:
+		if data is None:
 
-			LOGGER.debug("Attempting to parse " + json_path)
+			return []
 
-			return json.loads(f.read())["Lern-Inhalte"]
+		return list(data["Lern-Inhalte"])
 
 	def get_learning_contents_titles(self, course_title):
 		"""Return a dictionary mapping learning contents identifiers to their titles.
 		"""
 
-		kurs = {}
-
-		json_path = os.path.join("Kurse",
-									course_title,
-									course_title + ".json")
-
-		with open(json_path, mode="rt", encoding="utf8") as f:
-
-			LOGGER.debug("Attempting to parse " + json_path)
+		lerninhalte = {}
 
-			kurs = json.loads(f.read())
+		data = self._course_data(course_title)
 
-		# TODO: This is super expensive and must be replaced.
-		#
-		lerninhalte = {}
+		if data is None:
 
-		for existing_id in kurs["Lern-Inhalte"]:
+			return lerninhalte
 
-			json_path = os.path.join(os.path.join("Kurse",
-											course_title,
-											"Lern-Inhalte",
-											existing_id,
-											existing_id + ".meta"))
+		learning_contents = self.index[course_title]["learning_contents"]
 
-			if os.path.exists(json_path):
+		for existing_id in data["Lern-Inhalte"]:
 
-				with open(json_path, mode="rt", encoding="utf8") as f:
+			if existing_id in learning_contents and existing_id in learning_contents[existing_id]["meta"]:
 
-					LOGGER.debug("Attempting to parse " + json_path)
+				lerninhalte[existing_id] = learning_contents[existing_id]["meta"][existing_id]["title"]
 
-					lerninhalte[existing_id] = json.loads(f.read())["title"]
-			
 		return lerninhalte
 
 	def get_variants(self, course_title, learning_content_id):
 		"""Return a list of all variants for a learning content in a course.
 		"""
 
+		learning_content = self._learning_content(course_title, learning_content_id)
+
+		if learning_content is None:
+
+			return []
+
 		# First, consider all files variants that have an extension
 		# and a meta file.
 		#
-		# Yes, Unix-style paths are okay for glob.
-		#
-		variantn = [os.path.splitext(os.path.split(path)[1])[0] for path in glob.glob("Kurse/"
-															+ course_title
-															+ "/Lern-Inhalte/"
-															+ learning_content_id
-															+ "/*.meta")
-							if "." in os.path.splitext(os.path.split(path)[1])[0]]
+		variantn = [name for name in learning_content["meta"].keys() if "." in name]
 
 		# Add variants that are a directory
-
-		variantn.extend([os.path.split(path)[1] for path in glob.glob("Kurse/"
-															+ course_title
-															+ "/Lern-Inhalte/"
-															+ learning_content_id
-													   		+ "/*")
-								if os.path.isdir(path)])
+		#
+		variantn.extend(learning_content["directories"].keys())
 
 		return variantn
 
@@ -303,34 +817,19 @@ class FileStorage(Storage):
 		"""Return a list of identifiers of all variants for a learning content in a course.
 		"""
 
-		existing_ids = []
+		learning_content = self._learning_content(course_title, learning_content_id)
 
-		# TODO: This is super expensive and must be replaced.
+		if learning_content is None:
 
-		# Yes, Unix-style paths are okay for glob.
-		#
-		meta_paths = glob.glob("Kurse/"
-								+ course_title
-								+ "/Lern-Inhalte/"
-								+ learning_content_id
-								+ "/*.meta")
+			return []
+
+		existing_ids = [meta_data["identifier"] for meta_data in learning_content["meta"].values()]
 
 		# Also catch meta files in directories
 		#
-		meta_paths.extend(glob.glob("Kurse/"
-								+ course_title
-								+ "/Lern-Inhalte/"
-								+ learning_content_id
-								+ "/*"
-								+ "/*.meta"))
-
-		for path in meta_paths:
+		for directory in learning_content["directories"].values():
 
-			with open(path, mode="rt", encoding="utf8") as f:
-
-					LOGGER.debug("Attempting to parse " + path)
-
-					existing_ids.append(json.loads(f.read())["identifier"])
+			existing_ids.extend([meta_data["identifier"] for meta_data in directory["meta"].values()])
 
 		return existing_ids
 
@@ -338,7 +837,7 @@ class FileStorage(Storage):
 		"""Return the metadata of the variant as a dict.
 
 		Example:
-		
+
 		{
 			"identifier": "aa2835f3-c3e4-495a-bea8-3e283979e6e6",
 			"format": "text/html",
@@ -346,34 +845,17 @@ class FileStorage(Storage):
 		}
 		"""
 
-		meta_data = {}
+		learning_content = self._learning_content(course_title, learning_content_id)
 
-		meta_path = os.path.join("Kurse",
-									course_title,
-									"Lern-Inhalte",
-									learning_content_id,
-									variant + ".meta")
+		if learning_content is None:
 
-		if os.path.isdir(os.path.join("Kurse",
-									course_title,
-									"Lern-Inhalte",
-									learning_content_id,
-									variant)):
+			return {}
 
-			meta_path = os.path.join("Kurse",
-									course_title,
-									"Lern-Inhalte",
-									learning_content_id,
-									variant,
-									variant + ".meta")
-
-		with open(meta_path, mode="rt", encoding="utf8") as f:
+		if variant in learning_content["directories"]:
 
-			LOGGER.debug("Attempting to parse " + meta_path)
+			return dict(learning_content["directories"][variant]["meta"].get(variant, {}))
 
-			meta_data = json.loads(f.read())
-
-		return meta_data
+		return dict(learning_content["meta"].get(variant, {}))
 
 	def delete_variant(self, course_title, learning_content_id, variant_id):
 		"""Attempt to delete the variant identified by variant_id.
@@ -382,104 +864,67 @@ class FileStorage(Storage):
 
 		message = ""
 
-		# First, consider all files variants that have an extension
-		# and a meta file.
-		#
-		# Yes, Unix-style paths are okay for glob.
-		#
-		variantn = [os.path.splitext(os.path.split(path)[1])[0] for path in glob.glob("Kurse/"
-													+ course_title
-													+ "/Lern-Inhalte/"
-													+ learning_content_id
-													+ "/*.meta")
-							if "." in os.path.splitext(os.path.split(path)[1])[0]]
-
-		for variant in variantn:
-
-			# Get metadata from meta file
-
-			meta_data = {}
-
-			meta_path = os.path.join("Kurse",
-										course_title,
-										"Lern-Inhalte",
-										learning_content_id,
-										variant + ".meta")
+		with self.write_lock(course_title, learning_content_id):
 
-			with open(meta_path, mode="rt", encoding="utf8") as f:
+			self.scan_course(course_title)
 
-				LOGGER.debug("Attempting to parse " + meta_path)
+			learning_content = self._learning_content(course_title, learning_content_id)
 
-				meta_data = json.loads(f.read())
+			if learning_content is None:
 
-			if meta_data["identifier"] == variant_id:
+				return message
 
-				path = os.path.join("Kurse",
-										course_title,
-										"Lern-Inhalte",
-										learning_content_id,
-										variant)
+			# First, consider all files variants that have an extension
+			# and a meta file.
+			#
+			for variant, meta_data in learning_content["meta"].items():
 
-				LOGGER.info("Removing file {}".format(path))
+				if "." in variant and meta_data["identifier"] == variant_id:
 
-				os.remove(path)
+					path = os.path.join("Kurse",
+											course_title,
+											"Lern-Inhalte",
+											learning_content_id,
+											variant)
 
-				message = _("Datei {} gelöscht.").format(path)
+					LOGGER.info("Removing file {}".format(path))
 
-				path += ".meta"
+					os.remove(path)
 
-				LOGGER.info("Removing meta file {}".format(path))
+					message = _("Datei {} gelöscht.").format(path)
 
-				os.remove(path)
+					path += ".meta"
 
-				message += '<br>'
-				message += _("Datei {} gelöscht.").format(path)
+					LOGGER.info("Removing meta file {}".format(path))
 
-		# Use message as an indicator whether we found something to delete
-		#
-		if not message:
+					os.remove(path)
 
-			# Check variants that are a directory
+					message += '<br>'
+					message += _("Datei {} gelöscht.").format(path)
 
-			variantn = [os.path.split(path)[1] for path in glob.glob("Kurse/"
-														+ course_title
-														+ "/Lern-Inhalte/"
-														+ learning_content_id
-														+ "/*")
-								  if os.path.isdir(path)]
+			# Use message as an indicator whether we found something to delete
+			#
+			if not message:
 
-			for variant in variantn:
+				# Check variants that are a directory
 
-				# Get metadata from meta file
+				for variant, directory in learning_content["directories"].items():
 
-				meta_data = {}
+					if directory["meta"].get(variant, {}).get("identifier") == variant_id:
 
-				meta_path = os.path.join("Kurse",
+						path = os.path.join("Kurse",
 												course_title,
 												"Lern-Inhalte",
 												learning_content_id,
-												variant,
-												variant + ".meta")
+												variant)
 
-				with open(meta_path, mode="rt", encoding="utf8") as f:
+						LOGGER.info("Removing directory {} and all of its contents".format(path))
 
-					LOGGER.debug("Attempting to parse " + meta_path)
+						shutil.rmtree(path)
 
-					meta_data = json.loads(f.read())
+						message = _("Verzeichnis der Variante {} gelöscht.").format(path)
 
-				if meta_data["identifier"] == variant_id:
-
-					path = os.path.join("Kurse",
-											course_title,
-											"Lern-Inhalte",
-											learning_content_id,
-											variant)
-
-					LOGGER.info("Removing directory {} and all of its contents".format(path))
-
-					shutil.rmtree(path)
-
-					message = _("Verzeichnis der Variante {} gelöscht.").format(path)
+			self.scan_course(course_title)
 
 		return message
 
@@ -490,9 +935,49 @@ class FileStorage(Storage):
 
 		path = os.path.join("Kurse", course_title)
 
-		LOGGER.info("Removing directory {} and all of its contents".format(path))
+		with contextlib.ExitStack() as locks:
+
+			locks.enter_context(self.write_lock(course_title))
+
+			# New learning contents are only added under the course lock,
+			# so this list is complete until it is released.
+			#
+			try:
+				learning_content_ids = set(os.listdir(os.path.join(path, "Lern-Inhalte")))
 
-		shutil.rmtree(path)
+			except FileNotFoundError:
+
+				learning_content_ids = set()
+
+			# Lock files may be left from writes to learning contents
+			# that did not exist, and are removed as well.
+			#
+			prefix = "." + course_title + "."
+
+			for name in os.listdir("Kurse"):
+
+				if name.startswith(prefix) and name.endswith(".lock"):
+
+					try:
+						learning_content_ids.add(str(uuid.UUID(name[len(prefix):-len(".lock")])))
+
+					except ValueError:
+
+						continue
+
+			learning_content_ids = sorted(learning_content_ids)
+
+			for learning_content_id in learning_content_ids:
+
+				locks.enter_context(self.write_lock(course_title, learning_content_id))
+
+			LOGGER.info("Removing directory {} and all of its contents".format(path))
+
+			shutil.rmtree(path)
+
+			self.scan_course(course_title)
+
+			self._remove_locks([(course_title,)] + [(course_title, learning_content_id) for learning_content_id in learning_content_ids])
 
 		return _("Kurs {} gelöscht.").format(path)
 
@@ -506,42 +991,38 @@ class FileStorage(Storage):
 								"Lern-Inhalte",
 								learning_content_id)
 
-		LOGGER.info("Removing directory {} and all of its contents".format(path))
+		json_path = os.path.join("Kurse",
+									course_title,
+									course_title + ".json")
 
-		shutil.rmtree(path)
+		with self.write_lock(course_title), self.write_lock(course_title, learning_content_id):
 
-		# The learning content is still referenced in the course, so remove it there
+			LOGGER.info("Removing directory {} and all of its contents".format(path))
 
-		kurs = {}
+			shutil.rmtree(path)
 
-		json_path = os.path.join("Kurse",
-									course_title,
-									course_title + ".json")
+			# The learning content is still referenced in the course, so remove it there
 
-		with open(json_path, mode="rt", encoding="utf8") as f:
+			kurs = {}
 
-			LOGGER.debug("Attempting to parse " + json_path)
+			with open(json_path, mode="rt", encoding="utf8") as f:
 
-			kurs = json.loads(f.read())
+				LOGGER.debug("Attempting to parse " + json_path)
 
-		LOGGER.info("Removing learning content {} from course '{}'".format(learning_content_id, course_title))
+				kurs = json.loads(f.read())
 
-		kurs["Lern-Inhalte"].remove(str(learning_content_id))
+			LOGGER.info("Removing learning content {} from course '{}'".format(learning_content_id, course_title))
 
-		# Note that this is still not thread or multi process safe, as
-		# it ignores the current state of the file on disk or in
-		# parallel threads / processes.
-		#
-		with WRITE_LOCK:
+			kurs["Lern-Inhalte"].remove(str(learning_content_id))
 
-			with open(os.path.join("Kurse",
-									course_title,
-									course_title + ".json"),
-						mode="wt",
-						encoding="utf8") as f:
+			with replacing_file(json_path) as f:
 
 				f.write(json.dumps(kurs, indent = "\t"))
 
+			self.scan_course(course_title)
+
+			self._remove_locks([(course_title, learning_content_id)])
+
 		return _("Lern-Inhalt {} und Verzeichnis {} gelöscht.").format(learning_content_id, path)
 
 	def write_course(self, title):
@@ -555,33 +1036,27 @@ class FileStorage(Storage):
 
 			LOGGER.warning("Directory 'Kurse' does not exist, creating")
 
-			os.mkdir("Kurse")
+			os.makedirs("Kurse", exist_ok = True)
 
 			LOGGER.info("Copying static CSS to directory 'Kurse'")
 
 			shutil.copyfile("w3.css", os.path.join("Kurse", "w3.css"))
 
-		if os.path.isdir(os.path.join("Kurse", title)):
+		with self.write_lock(title):
 
-			LOGGER.warning("course already exists.")
-			message = _("Diesen Kurs gibt es schon.")
+			if os.path.isdir(os.path.join("Kurse", title)):
 
-		else:
-			LOGGER.info("Creating directory structure and files for course '{}'".format(title))
+				LOGGER.warning("course already exists.")
+				message = _("Diesen Kurs gibt es schon.")
 
-			os.mkdir(os.path.join("Kurse", title))
-			os.mkdir(os.path.join("Kurse", title, "Lern-Inhalte"))
-			os.mkdir(os.path.join("Kurse", title, "Lern-Pfade"))
+			else:
+				LOGGER.info("Creating directory structure and files for course '{}'".format(title))
 
-			# Note that this is still not thread or multi process safe, as
-			# it ignores the current state of the file on disk or in
-			# parallel threads / processes.
-			#
-			with WRITE_LOCK:
+				os.mkdir(os.path.join("Kurse", title))
+				os.mkdir(os.path.join("Kurse", title, "Lern-Inhalte"))
+				os.mkdir(os.path.join("Kurse", title, "Lern-Pfade"))
 
-				with open(os.path.join("Kurse", title, title + ".json"),
-							mode="wt",
-							encoding="utf8") as f:
+				with replacing_file(os.path.join("Kurse", title, title + ".json")) as f:
 
 					# Note that {{ and }} are escapes for
 					# literal { and } in format strings.
@@ -596,9 +1071,11 @@ class FileStorage(Storage):
 }}
 """.format(str(uuid.uuid4()), title))
 
-			LOGGER.info("Directory structure created.")
-			message = _("Kurs angelegt.")
-		
+				LOGGER.info("Directory structure created.")
+				message = _("Kurs angelegt.")
+
+				self.scan_course(title)
+
 		return message
 
 	def write_learning_content(self, course_title, learning_content_title):
@@ -608,41 +1085,41 @@ class FileStorage(Storage):
 
 		message = ""
 
-		new_id = uuid.uuid4()
+		json_path = os.path.join("Kurse",
+									course_title,
+									course_title + ".json")
 
-		# UUIDs are almost guaranteed to be never identical, but, you
-		# know ... almost.
-		#
-		while new_id in [uuid.UUID(existing_id) for existing_id in self.get_learning_contents(course_title)]:
+		with self.write_lock(course_title):
+
+			self.scan_course(course_title)
 
 			new_id = uuid.uuid4()
 
-		# NOTE: While courses are stored by title, learning contents
-		# are stored by identifier. So, technically, we dont have
-		# to check for duplicates. Which allows for learning contents with
-		# the same title. Which will probably confuse users. Let's see
-		# if they complain.
-		#
-		LOGGER.info("Creating directory structure and files for learning content '{}' with id {}".format(learning_content_title, new_id))
+			# UUIDs are almost guaranteed to be never identical, but, you
+			# know ... almost.
+			#
+			while new_id in [uuid.UUID(existing_id) for existing_id in self.get_learning_contents(course_title)]:
 
-		# Note that this is still not thread or multi process safe, as
-		# it ignores the current state of the file on disk or in
-		# parallel threads / processes.
-		#
-		with WRITE_LOCK:
+				new_id = uuid.uuid4()
+
+			# NOTE: While courses are stored by title, learning contents
+			# are stored by identifier. So, technically, we dont have
+			# to check for duplicates. Which allows for learning contents with
+			# the same title. Which will probably confuse users. Let's see
+			# if they complain.
+			#
+			LOGGER.info("Creating directory structure and files for learning content '{}' with id {}".format(learning_content_title, new_id))
 
 			os.mkdir(os.path.join("Kurse",
 									course_title,
 									"Lern-Inhalte",
 									str(new_id)))
 
-			with open(os.path.join("Kurse",
-									course_title,
-									"Lern-Inhalte",
-									str(new_id),
-									str(new_id) + ".meta"),
-						mode="wt",
-						encoding="utf8") as f:
+			with replacing_file(os.path.join("Kurse",
+												course_title,
+												"Lern-Inhalte",
+												str(new_id),
+												str(new_id) + ".meta")) as f:
 
 				# Note that {{ and }} are escapes for
 				# literal { and } in format strings.
@@ -656,10 +1133,6 @@ class FileStorage(Storage):
 
 			kurs = {}
 
-			json_path = os.path.join("Kurse",
-										course_title,
-										course_title + ".json")
-
 			with open(json_path, mode="rt", encoding="utf8") as f:
 
 				LOGGER.debug("Attempting to parse " + json_path)
@@ -668,10 +1141,12 @@ class FileStorage(Storage):
 
 			kurs["Lern-Inhalte"].append(str(new_id))
 
-			with open(json_path, mode="wt", encoding="utf8") as f:
+			with replacing_file(json_path) as f:
 
 				f.write(json.dumps(kurs, indent = "\t"))
 
+			self.scan_course(course_title)
+
 		LOGGER.info("Directory structure created, and id added to course.")
 		message = _("Lern-Inhalt angelegt und zum Kurs hinzugefügt.")
 
@@ -682,11 +1157,6 @@ class FileStorage(Storage):
 		   Return a message indicating success or failure.
 		"""
 
-		# All learning contents in the list must exist.
-		# Apart from that, we accept any order.
-
-		existing_lerninhalte = self.get_learning_contents(course_title)
-
 		# Right now, lerninhalte is a string representation of a list,
 		# so convert it to an actual list.
 		#
@@ -696,73 +1166,77 @@ class FileStorage(Storage):
 		#
 		learning_contents_list = json.loads(learning_contents_list.replace("'", '"'))
 
-		for requested_lerninhalt in learning_contents_list:
+		json_path = os.path.join("Kurse",
+									course_title,
+									course_title + ".json")
 
-			if requested_lerninhalt not in existing_lerninhalte:
+		with self.write_lock(course_title):
 
-				error = _("Umsortierung nicht möglich: Den Lern-Inhalt '{}' gibt es nicht mehr.").format(requested_lerninhalt)
+			self.scan_course(course_title)
 
-				LOGGER.error(error)
+			# All learning contents in the list must exist.
+			# Apart from that, we accept any order.
 
-				raise cherrypy.HTTPError(500, error)
+			existing_lerninhalte = self.get_learning_contents(course_title)
 
-		kurs = {}
+			for requested_lerninhalt in learning_contents_list:
 
-		json_path = os.path.join("Kurse",
-									course_title,
-									course_title + ".json")
+				if requested_lerninhalt not in existing_lerninhalte:
 
-		with open(json_path, mode="rt", encoding="utf8") as f:
+					error = _("Umsortierung nicht möglich: Den Lern-Inhalt '{}' gibt es nicht mehr.").format(requested_lerninhalt)
 
-			LOGGER.debug("Attempting to parse " + json_path)
+					LOGGER.error(error)
 
-			kurs = json.loads(f.read())
+					raise cherrypy.HTTPError(500, error)
 
-		kurs["Lern-Inhalte"] = learning_contents_list
+			kurs = {}
 
-		# Note that this is still not thread or multi process safe, as
-		# it ignores the current state of the file on disk or in
-		# parallel threads / processes.
-		#
-		with WRITE_LOCK:
+			with open(json_path, mode="rt", encoding="utf8") as f:
 
-			with open(os.path.join("Kurse",
-									course_title,
-									course_title + ".json"),
-						mode="wt",
-						encoding="utf8") as f:
+				LOGGER.debug("Attempting to parse " + json_path)
+
+				kurs = json.loads(f.read())
+
+			kurs["Lern-Inhalte"] = learning_contents_list
+
+			with replacing_file(json_path) as f:
 
 				f.write(json.dumps(kurs, indent = "\t"))
 
+			self.scan_course(course_title)
+
 		return _("Lern-Inhalte umsortiert.")
 
 	def write_variant(self, course_id, learning_content_id, content, filename):
 		"""Write a variant consisting of a single or multiple files, and create the according meta files.
 
-		   Return the MIME type of the last file written.
+		   Return the MIME type of the last file written, or an empty
+		   string if the learning content does not exist.
 		"""
 
 		LOGGER.info("Creating variant with filename(s) '{}'".format(filename))
 
 		course_title = self.find_courses()[uuid.UUID(course_id)]
 
-		# Note that this is still not thread or multi process safe, as
-		# it ignores the current state of the file on disk or in
-		# parallel threads / processes.
-		#
-		with WRITE_LOCK:
+		with self.write_lock(course_title, learning_content_id):
+
+			self.scan_course(course_title)
+
+			# The course may have been deleted while waiting for the lock
+			#
+			if self._learning_content(course_title, learning_content_id) is None:
+
+				return ""
 
 			if content.__class__ == str:
 
 				# Verbatim HTML sent via form.
 
-				with open(os.path.join("Kurse",
-										course_title,
-										"Lern-Inhalte",
-										learning_content_id,
-										filename),
-							mode="wt",
-							encoding="utf8") as f:
+				with replacing_file(os.path.join("Kurse",
+													course_title,
+													"Lern-Inhalte",
+													learning_content_id,
+													filename)) as f:
 
 					f.write(content)
 
@@ -785,9 +1259,9 @@ class FileStorage(Storage):
 
 				for upload in content:
 
-					with open(os.path.join(directory_path,
-											os.path.basename(upload.filename)),
-								mode="wb") as f:
+					with replacing_file(os.path.join(directory_path,
+														os.path.basename(upload.filename)),
+										binary = True) as f:
 
 						# Taken from https://docs.cherrypy.dev/en/latest/_modules/cherrypy/tutorial/tut09_files.html#FileDemo.upload
 						#
@@ -803,12 +1277,12 @@ class FileStorage(Storage):
 
 				# Uploaded single file.
 
-				with open(os.path.join("Kurse",
-										course_title,
-										"Lern-Inhalte",
-										learning_content_id,
-										filename),
-							mode="wb") as f:
+				with replacing_file(os.path.join("Kurse",
+													course_title,
+													"Lern-Inhalte",
+													learning_content_id,
+													filename),
+									binary = True) as f:
 
 					# Taken from https://docs.cherrypy.dev/en/latest/_modules/cherrypy/tutorial/tut09_files.html#FileDemo.upload
 					#
@@ -820,37 +1294,33 @@ class FileStorage(Storage):
 
 						data = content.file.read(8192)
 
-		# Now create the meta file(s).
+			# Now create the meta file(s).
 
-		existing_ids = self.get_variants_ids(course_title, learning_content_id)
+			existing_ids = self.get_variants_ids(course_title, learning_content_id)
 
-		if filename.__class__ == list:
+			if filename.__class__ == list:
 
-			# Handle files from directory upload
-
-			new_id = uuid.uuid4()
-
-			# UUIDs are almost guaranteed to be never identical, but, you
-			# know ... almost.
-			#
-			while new_id in existing_ids:
+				# Handle files from directory upload
 
 				new_id = uuid.uuid4()
 
-			existing_ids.append(new_id)
+				# UUIDs are almost guaranteed to be never identical, but, you
+				# know ... almost.
+				#
+				while new_id in existing_ids:
+
+					new_id = uuid.uuid4()
 
-			directory = os.path.split(filename[0])[0]
+				existing_ids.append(new_id)
 
-			with WRITE_LOCK:
+				directory = os.path.split(filename[0])[0]
 
-				with open(os.path.join("Kurse",
-										course_title,
-										"Lern-Inhalte",
-										learning_content_id,
-										directory,
-										directory + ".meta"),
-							mode="wt",
-							encoding="utf8") as f:
+				with replacing_file(os.path.join("Kurse",
+													course_title,
+													"Lern-Inhalte",
+													learning_content_id,
+													directory,
+													directory + ".meta")) as f:
 
 					# Note that {{ and }} are escapes for
 					# literal { and } in format strings.
@@ -862,30 +1332,26 @@ class FileStorage(Storage):
 }}
 """.format(new_id))
 
-			# Now for the files.
-
-			for upload in content:
-
-				new_id = uuid.uuid4()
+				# Now for the files.
 
-				while new_id in existing_ids:
+				for upload in content:
 
 					new_id = uuid.uuid4()
 
-				existing_ids.append(new_id)
+					while new_id in existing_ids:
 
-				file_format = upload.content_type
+						new_id = uuid.uuid4()
 
-				with WRITE_LOCK:
+					existing_ids.append(new_id)
 
-					with open(os.path.join("Kurse",
-											course_title,
-											"Lern-Inhalte",
-											learning_content_id,
-											os.path.split(filename[0])[0],
-											os.path.basename(upload.filename) + ".meta"),
-								mode="wt",
-								encoding="utf8") as f:
+					file_format = upload.content_type
+
+					with replacing_file(os.path.join("Kurse",
+														course_title,
+														"Lern-Inhalte",
+														learning_content_id,
+														os.path.split(filename[0])[0],
+														os.path.basename(upload.filename) + ".meta")) as f:
 
 						# Note that {{ and }} are escapes for
 						# literal { and } in format strings.
@@ -897,31 +1363,27 @@ class FileStorage(Storage):
 }}
 """.format(new_id, file_format))
 
-		else:
-
-			# Handle single file
-
-			new_id = uuid.uuid4()
+			else:
 
-			while new_id in existing_ids:
+				# Handle single file
 
 				new_id = uuid.uuid4()
 
-			file_format = "text/html"
+				while new_id in existing_ids:
 
-			if content.__class__ != str:
+					new_id = uuid.uuid4()
 
-				file_format = content.content_type
+				file_format = "text/html"
 
-			with WRITE_LOCK:
+				if content.__class__ != str:
 
-				with open(os.path.join("Kurse",
-										course_title,
-										"Lern-Inhalte",
-										learning_content_id,
-										filename + ".meta"),
-							mode="wt",
-							encoding="utf8") as f:
+					file_format = content.content_type
+
+				with replacing_file(os.path.join("Kurse",
+													course_title,
+													"Lern-Inhalte",
+													learning_content_id,
+													filename + ".meta")) as f:
 
 					# Note that {{ and }} are escapes for
 					# literal { and } in format strings.
@@ -933,6 +1395,8 @@ class FileStorage(Storage):
 }}
 """.format(new_id, file_format))
 
+			self.scan_course(course_title)
+
 		LOGGER.info("File(s) written.")
 
 		return file_format
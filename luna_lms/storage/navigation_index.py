@@ -0,0 +1,177 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import collections
+
+
+class NavigationIndex:
+	"""A flattened view of the nested steps of a course, for fast navigation.
+
+	It is computed once from the nested OrderedDict returned by
+	Storage.get_learning_contents_ordered(), and answers the questions of
+	a page render in O(1) or O(depth).
+
+	NavigationIndex.tree
+		The nested OrderedDict of IdTitle keys the index was built from.
+
+	NavigationIndex.identifiers
+		A list of all step identifiers, in reading order.
+
+	NavigationIndex.positions
+		A dict mapping step identifiers to their position in
+		NavigationIndex.identifiers .
+
+	NavigationIndex.ancestors
+		A dict mapping step identifiers to a tuple of the identifiers of
+		their enclosing groups, outermost first.
+
+	NavigationIndex.titles
+		A dict mapping step identifiers to their titles.
+
+	NavigationIndex.members
+		A dict mapping identifiers of groups to a frozenset of the
+		identifiers of all steps in their subtree, at any level.
+	"""
+
+	def __init__(self, tree = None):
+		"""Initialise NavigationIndex from a nested OrderedDict of IdTitle keys.
+		"""
+
+		if tree is None:
+
+			tree = collections.OrderedDict()
+
+		self.tree = tree
+
+		self.identifiers = []
+
+		self.positions = {}
+
+		self.ancestors = {}
+
+		self.titles = {}
+
+		self.members = {}
+
+		# Walk the tree depth-first without recursion. The stack holds
+		# iterators over the children of the groups we are in, along
+		# with the chain of their identifiers.
+		#
+		stack = [(iter(tree.items()), ())]
+
+		while stack:
+
+			children, chain = stack[-1]
+
+			try:
+				key, subtree = next(children)
+
+			except StopIteration:
+
+				stack.pop()
+
+				continue
+
+			self.positions[key.identifier] = len(self.identifiers)
+
+			self.identifiers.append(key.identifier)
+
+			self.ancestors[key.identifier] = chain
+
+			self.titles[key.identifier] = key.title
+
+			if subtree:
+
+				stack.append((iter(subtree.items()), chain + (key.identifier,)))
+
+		# Collect the members of each group. Each step is added to all of
+		# its ancestors, so this is O(n * depth).
+		#
+		members = {}
+
+		for identifier in self.identifiers:
+
+			for group in self.ancestors[identifier]:
+
+				members.setdefault(group, set()).add(identifier)
+
+		self.members = dict([(group, frozenset(steps)) for group, steps in members.items()])
+
+		return
+
+	def __contains__(self, identifier):
+		"""Return whether identifier is a step of the course.
+		"""
+
+		return identifier in self.positions
+
+	def __len__(self):
+		"""Return the number of steps in the course.
+		"""
+
+		return len(self.identifiers)
+
+	def first(self):
+		"""Return the identifier of the first step, or None for an empty course.
+		"""
+
+		if self.identifiers:
+
+			return self.identifiers[0]
+
+		return None
+
+	def previous(self, identifier, distance = 1):
+		"""Return the identifier of the step distance steps before the given one, or None.
+		"""
+
+		position = self.positions[identifier] - distance
+
+		if position >= 0:
+
+			return self.identifiers[position]
+
+		return None
+
+	def next(self, identifier, distance = 1):
+		"""Return the identifier of the step distance steps after the given one, or None.
+		"""
+
+		position = self.positions[identifier] + distance
+
+		if position < len(self.identifiers):
+
+			return self.identifiers[position]
+
+		return None
+
+	def hierarchy(self, identifier):
+		"""Return a list of titles of the enclosing groups of the step, outermost first, followed by its own title.
+		"""
+
+		return [self.titles[group] for group in self.ancestors[identifier]] + [self.titles[identifier]]
+
+	def contains(self, group, identifier):
+		"""Return whether the step identified by identifier is part of the subtree of group, at any level.
+		"""
+
+		return identifier in self.members.get(group, ())
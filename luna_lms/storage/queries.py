@@ -0,0 +1,569 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+# The SQL statements used by SQLiteStorage. Values are always passed as
+# named parameters, never formatted into the statement, so that each
+# statement text is constant. sqlite3 then parses it once per
+# connection, and reuses it from the statement cache.
+
+COURSE_IDENTIFICATION = 'SELECT identifier,title,requires FROM course'
+"""Identifier, title and required Luna version of the course in a database.
+"""
+
+COURSE_METADATA_KEYS = ("title",
+						"description",
+						"relation",
+						"created",
+						"modified",
+						"dateAccepted",
+						"issued",
+						"contributor",
+						"requires")
+"""The columns returned by COURSE_METADATA, in order.
+"""
+
+COURSE_METADATA = 'SELECT {} FROM course'.format(",".join(COURSE_METADATA_KEYS))
+"""The metadata of the course in a database.
+"""
+
+COURSE_TITLE = 'SELECT title FROM course'
+"""The title of the course in a database.
+"""
+
+COURSE_CATALOG_ENTRY = '''SELECT course.title,
+								course.description,
+								course.relation,
+								(SELECT cache.description FROM cache WHERE cache.path = course.relation)
+							FROM course'''
+"""The title, description, cover image path and cover image description of the course in a database, without reading cached data.
+"""
+
+STEPS = 'SELECT identifier,title,successor,parent FROM steps'
+"""All steps of a course, in table order.
+"""
+
+STEPS_BY_IDENTIFIER = 'SELECT identifier,title,successor,parent FROM steps ORDER BY identifier'
+"""All steps of a course, ordered by identifier.
+"""
+
+STEP_HTML = '''SELECT variants.data
+				FROM variants, mapping, steps
+				WHERE steps.identifier = :step
+					AND steps.content_id = mapping.content_id
+					AND mapping.variant_id = variants.identifier
+					AND variants.format = 'text/html'
+					AND variants.isPartOf IS NULL
+				LIMIT 1'''
+"""The data of the first HTML variant of a step, not counting files in a directory variant.
+
+Parameters: step.
+"""
+
+STEP_VARIANTS = '''SELECT steps.identifier,
+						steps.content_id,
+						variants.identifier,
+						variants.filename,
+						variants.isPartOf,
+						variants.format,
+						variants.hash
+					FROM steps
+					LEFT JOIN mapping ON steps.content_id = mapping.content_id
+					LEFT JOIN variants ON mapping.variant_id = variants.identifier
+					ORDER BY steps.identifier, variants.identifier'''
+"""All steps with all of their variants and the hashes of their data, one row per variant, ordered by step.
+"""
+
+STEP_VARIANTS_WITHOUT_HASH = '''SELECT steps.identifier,
+									steps.content_id,
+									variants.identifier,
+									variants.filename,
+									variants.isPartOf,
+									variants.format,
+									NULL
+								FROM steps
+								LEFT JOIN mapping ON steps.content_id = mapping.content_id
+								LEFT JOIN variants ON mapping.variant_id = variants.identifier
+								ORDER BY steps.identifier, variants.identifier'''
+"""Like STEP_VARIANTS, for a variants table without the column hash.
+"""
+
+CACHED_ITEM_KEYS = ("path",
+					"data",
+					"format",
+					"description")
+"""The columns returned by CACHED_ITEM, in order.
+"""
+
+CACHED_ITEM = 'SELECT {} FROM cache WHERE path = :path'.format(",".join(CACHED_ITEM_KEYS))
+"""An item from the cache of a course.
+
+Parameters: path.
+"""
+
+CACHED_PATHS = 'SELECT path FROM cache ORDER BY path'
+"""The paths of all items in the cache of a course.
+"""
+
+CACHED_HASHES = 'SELECT path,hash FROM cache WHERE hash IS NOT NULL'
+"""The paths and hashes of all items in the cache of a course that have a hash.
+"""
+
+CACHED_ITEM_INFO = '''SELECT key,
+							path,
+							format,
+							description,
+							typeof(data),
+							CASE typeof(data) WHEN 'blob' THEN length(data) END,
+							hash,
+							CAST(strftime('%s', modified) AS INTEGER),
+							length(gzip)
+						FROM cache
+						WHERE path = :path'''
+"""The row id, path, format, description, storage class, size, hash, modification time and compressed size of an item in the cache of a course, without reading the data.
+
+The size is only given for blob data, which sqlite can measure without
+reading it. The modification time is in seconds since the epoch. The
+compressed size is NULL if there is no compressed variant.
+
+Parameters: path.
+"""
+
+CACHED_ITEM_INFO_WITHOUT_VALIDATORS = '''SELECT key,
+											path,
+											format,
+											description,
+											typeof(data),
+											CASE typeof(data) WHEN 'blob' THEN length(data) END,
+											NULL,
+											NULL,
+											NULL
+										FROM cache
+										WHERE path = :path'''
+"""Like CACHED_ITEM_INFO, for a cache table without the columns hash, modified and gzip.
+
+Parameters: path.
+"""
+
+CACHED_ITEM_METADATA = '''SELECT path,
+								format,
+								description,
+								CASE typeof(data) WHEN 'blob' THEN length(data) ELSE length(CAST(data AS BLOB)) END,
+								hash,
+								CAST(strftime('%s', modified) AS INTEGER),
+								length(gzip)
+							FROM cache
+							WHERE path = :path'''
+"""The path, format, description, size in bytes, hash, modification time and compressed size of an item in the cache of a course.
+
+The data is only measured, and never returned. sqlite measures blobs
+without reading them. Text is converted to measure its size in bytes,
+which reads it inside sqlite.
+
+Parameters: path.
+"""
+
+CACHED_ITEM_METADATA_WITHOUT_VALIDATORS = '''SELECT path,
+												format,
+												description,
+												CASE typeof(data) WHEN 'blob' THEN length(data) ELSE length(CAST(data AS BLOB)) END,
+												NULL,
+												NULL,
+												NULL
+											FROM cache
+											WHERE path = :path'''
+"""Like CACHED_ITEM_METADATA, for a cache table without the columns hash, modified and gzip.
+
+Parameters: path.
+"""
+
+CACHED_ITEM_DATA = 'SELECT data FROM cache WHERE key = :key'
+"""The data of an item in the cache of a course, by row id.
+
+Parameters: key.
+"""
+
+CACHED_ITEM_GZIP = 'SELECT gzip FROM cache WHERE key = :key'
+"""The compressed variant of an item in the cache of a course, by row id.
+
+Parameters: key.
+"""
+
+CACHED_ITEM_RANGE = 'SELECT substr(data, :start, :length) FROM cache WHERE key = :key'
+"""A part of the blob data of an item in the cache of a course, by row id. start counts from 1.
+
+Parameters: key, start, length.
+"""
+
+CACHE_COLUMNS = "SELECT name FROM pragma_table_info('cache')"
+"""The names of the columns of the cache table.
+"""
+
+ADD_CACHE_HASH = 'ALTER TABLE cache ADD COLUMN hash TEXT'
+"""Add the column hash to the cache table of an older database.
+"""
+
+ADD_CACHE_MODIFIED = 'ALTER TABLE cache ADD COLUMN modified TEXT'
+"""Add the column modified to the cache table of an older database.
+"""
+
+ADD_CACHE_GZIP = 'ALTER TABLE cache ADD COLUMN gzip BLOB'
+"""Add the column gzip to the cache table of an older database.
+"""
+
+CLEAR_CACHE_HASHES = 'UPDATE cache SET hash = NULL'
+"""Mark all items in the cache of a course for hashing and compressing again.
+"""
+
+DROP_OLD_CACHE_TRIGGER = 'DROP TRIGGER IF EXISTS cache_updated'
+"""Remove the trigger replaced by CACHE_UPDATE_TRIGGER, which did not clear the column gzip.
+"""
+
+CACHE_INSERT_TRIGGER = '''CREATE TRIGGER IF NOT EXISTS cache_inserted
+							AFTER INSERT ON cache
+							WHEN NEW.modified IS NULL
+							BEGIN
+								UPDATE cache SET modified = datetime('now') WHERE key = NEW.key;
+							END'''
+"""Record the time an item is added to the cache, unless the writer has set it.
+"""
+
+CACHE_UPDATE_TRIGGER = '''CREATE TRIGGER IF NOT EXISTS cache_data_changed
+							AFTER UPDATE OF data ON cache
+							WHEN NEW.hash IS OLD.hash
+							BEGIN
+								UPDATE cache SET hash = NULL, gzip = NULL, modified = datetime('now') WHERE key = NEW.key;
+							END'''
+"""Clear the hash and the compressed variant, and record the time when the data of an item changes, unless the writer has updated the hash along with it.
+
+Items without a hash are hashed again by SQLiteStorage.
+"""
+
+UNHASHED_CACHE_ITEMS = 'SELECT key,format,typeof(data),length(data) FROM cache WHERE hash IS NULL'
+"""The row id, format, storage class and size of all items in the cache of a course which have no hash.
+"""
+
+SET_CACHED_ITEM_HASH = '''UPDATE cache
+							SET hash = :hash,
+								gzip = :gzip,
+								modified = coalesce(modified, datetime('now'))
+							WHERE key = :key'''
+"""Store the hash and the compressed variant of an item in the cache of a course, by row id, and set its modification time if there is none.
+
+Parameters: key, hash, gzip.
+"""
+
+REVISION_TABLE = '''CREATE TABLE IF NOT EXISTS "revision" (
+						"token"	TEXT NOT NULL,
+						"revision"	INTEGER NOT NULL,
+						"modified"	INTEGER NOT NULL
+					)'''
+"""Add the table revision to an older course database. It holds a single row.
+"""
+
+INSERT_REVISION = '''INSERT INTO revision (token, revision, modified)
+						SELECT :token, 0, CAST(strftime('%s', 'now') AS INTEGER)
+						WHERE NOT EXISTS (SELECT 1 FROM revision)'''
+"""Add the row of the revision table, unless there is one.
+
+Parameters: token.
+"""
+
+REVISION_TABLES = ("course",
+					"contents",
+					"steps",
+					"variants",
+					"mapping",
+					"cache")
+"""The tables of a course database whose changes bump the revision.
+"""
+
+REVISION_TRIGGER = '''CREATE TRIGGER IF NOT EXISTS {0}_{1}_revision
+						AFTER {1} ON "{0}"
+						BEGIN
+							UPDATE revision SET revision = revision + 1, modified = CAST(strftime('%s', 'now') AS INTEGER);
+						END'''
+"""Format string for a trigger which counts up the revision and records the time of every INSERT, UPDATE or DELETE on a table.
+
+Fields: table, event.
+"""
+
+COURSE_REVISION = 'SELECT token,revision,modified FROM revision'
+"""The token of the database, its revision and the time of the last change in seconds since the epoch.
+"""
+
+STEP_CONTENT = 'SELECT content_id FROM steps WHERE identifier = :step'
+"""The identifier of the learning content of a step, NULL for a group.
+
+Parameters: step.
+"""
+
+VARIANT_COLUMNS = "SELECT name FROM pragma_table_info('variants')"
+"""The names of the columns of the variants table.
+"""
+
+ADD_VARIANT_HASH = 'ALTER TABLE variants ADD COLUMN hash TEXT'
+"""Add the column hash to the variants table of an older database.
+"""
+
+VARIANT_IDENTIFIER_EXISTS = 'SELECT 1 FROM variants WHERE identifier = :identifier'
+"""A row if a variant with the identifier exists.
+
+Parameters: identifier.
+"""
+
+INSERT_VARIANT = '''INSERT INTO variants (identifier, filename, isPartOf, data, format, hash)
+					VALUES (:identifier, :filename, :isPartOf, :data, :format, :hash)'''
+"""Add a variant with its data given in full.
+
+Parameters: identifier, filename, isPartOf, data, format, hash.
+"""
+
+INSERT_VARIANT_ZEROBLOB = '''INSERT INTO variants (identifier, filename, isPartOf, data, format)
+								VALUES (:identifier, :filename, :isPartOf, zeroblob(:size), :format)'''
+"""Add a variant with size zero bytes as data, to be overwritten through incremental blob I/O.
+
+Parameters: identifier, filename, isPartOf, size, format.
+"""
+
+SET_VARIANT_HASH = 'UPDATE variants SET hash = :hash WHERE key = :key'
+"""Store the hash of the data of a variant, by row id.
+
+Parameters: key, hash.
+"""
+
+INSERT_MAPPING = 'INSERT INTO mapping (content_id, variant_id) VALUES (:content, :variant)'
+"""Assign a variant to a learning content.
+
+Parameters: content, variant.
+"""
+
+COURSE_SCHEMA = ('''CREATE TABLE "cache" (
+						"key"	INTEGER,
+						"path"	TEXT NOT NULL UNIQUE,
+						"data"	BLOB,
+						"format"	TEXT NOT NULL,
+						"description"	TEXT,
+						"hash"	TEXT,
+						"modified"	TEXT,
+						"gzip"	BLOB,
+						PRIMARY KEY("key")
+					)''',
+					'''CREATE TABLE "course" (
+						"identifier"	TEXT NOT NULL,
+						"title"	TEXT NOT NULL,
+						"description"	TEXT NOT NULL,
+						"relation"	TEXT,
+						"created"	TEXT NOT NULL,
+						"modified"	TEXT NOT NULL,
+						"dateAccepted"	TEXT,
+						"issued"	TEXT,
+						"contributor"	TEXT NOT NULL,
+						"requires"	TEXT NOT NULL,
+						FOREIGN KEY("relation") REFERENCES "cache"("path") ON UPDATE CASCADE ON DELETE RESTRICT
+					)''',
+					'''CREATE TABLE "variants" (
+						"key"	INTEGER,
+						"identifier"	TEXT NOT NULL UNIQUE,
+						"filename"	TEXT NOT NULL,
+						"isPartOf"	TEXT,
+						"data"	BLOB,
+						"format"	TEXT NOT NULL,
+						"hash"	TEXT,
+						PRIMARY KEY("key")
+					)''',
+					'''CREATE TABLE "contents" (
+						"key"	INTEGER,
+						"identifier"	TEXT UNIQUE,
+						"title"	TEXT NOT NULL,
+						PRIMARY KEY("key")
+					)''',
+					'''CREATE TABLE "steps" (
+						"key"	INTEGER,
+						"title"	TEXT NOT NULL,
+						"identifier"	TEXT UNIQUE,
+						"content_id"	TEXT,
+						"successor"	TEXT,
+						"parent"	TEXT,
+						PRIMARY KEY("key"),
+						FOREIGN KEY("content_id") REFERENCES "contents"("identifier") ON UPDATE CASCADE ON DELETE RESTRICT,
+						FOREIGN KEY("parent") REFERENCES "steps"("identifier") ON UPDATE CASCADE ON DELETE RESTRICT,
+						FOREIGN KEY("successor") REFERENCES "steps"("identifier") ON UPDATE CASCADE ON DELETE SET NULL
+					)''',
+					'''CREATE TABLE "mapping" (
+						"content_id"	TEXT,
+						"variant_id"	TEXT,
+						FOREIGN KEY("variant_id") REFERENCES "variants"("identifier") ON UPDATE CASCADE ON DELETE CASCADE,
+						FOREIGN KEY("content_id") REFERENCES "contents"("identifier") ON UPDATE CASCADE ON DELETE CASCADE
+					)''')
+"""The statements creating the tables of an empty course database, as described in dokumentation/programmierung.md .
+"""
+
+INSERT_COURSE = '''INSERT INTO course (identifier, title, description, created, modified, contributor, requires)
+					VALUES (:identifier, :title, '', :date, :date, '', :requires)'''
+"""Add the metadata of a new course.
+
+Parameters: identifier, title, date, requires.
+"""
+
+STEPS_INDEX = 'CREATE INDEX IF NOT EXISTS steps_successor ON steps (parent, successor)'
+"""An index to find the predecessor and the last step within a group without scanning all steps.
+"""
+
+STEP = 'SELECT identifier,content_id,successor,parent FROM steps WHERE identifier = :step'
+"""A single step with the identifier of its learning content, its successor and its parent.
+
+Parameters: step.
+"""
+
+STEP_IDENTIFIERS = 'SELECT identifier FROM steps'
+"""The identifiers of all steps of a course, in table order.
+"""
+
+STEP_TITLES = 'SELECT identifier,title FROM steps'
+"""The identifiers and titles of all steps of a course, in table order.
+"""
+
+GROUP_STEPS = 'SELECT identifier,successor FROM steps WHERE parent IS :parent'
+"""The identifiers and successors of all steps in a group, NULL for the top level.
+
+Parameters: parent.
+"""
+
+LAST_STEP = '''SELECT identifier FROM steps
+				WHERE parent IS :parent
+					AND successor IS NULL
+					AND identifier != :step
+				LIMIT 1'''
+"""The last step in a group, NULL for the top level, other than step.
+
+Parameters: parent, step.
+"""
+
+HAS_CHILDREN = 'SELECT 1 FROM steps WHERE parent = :step LIMIT 1'
+"""A row if the step is a group with at least one step in it.
+
+Parameters: step.
+"""
+
+STEP_IDENTIFIER_EXISTS = 'SELECT 1 FROM steps WHERE identifier = :identifier'
+"""A row if a step with the identifier exists.
+
+Parameters: identifier.
+"""
+
+CONTENT_IDENTIFIER_EXISTS = 'SELECT 1 FROM contents WHERE identifier = :identifier'
+"""A row if a learning content with the identifier exists.
+
+Parameters: identifier.
+"""
+
+INSERT_CONTENT = 'INSERT INTO contents (identifier, title) VALUES (:identifier, :title)'
+"""Add a learning content.
+
+Parameters: identifier, title.
+"""
+
+INSERT_STEP = '''INSERT INTO steps (title, identifier, content_id, successor, parent)
+					VALUES (:title, :identifier, :content, NULL, :parent)'''
+"""Add a step as the last one of a group, NULL for the top level. The former last step must be linked to it with SET_SUCCESSOR.
+
+Parameters: title, identifier, content, parent.
+"""
+
+SET_SUCCESSOR = 'UPDATE steps SET successor = :successor WHERE identifier = :step'
+"""Set the successor of a step.
+
+Parameters: step, successor.
+"""
+
+RELINK_PREDECESSOR = '''UPDATE steps SET successor = :successor
+						WHERE parent IS :parent
+							AND successor = :step'''
+"""Let the predecessor of step in the group parent, if there is one, point to successor instead.
+
+Parameters: step, parent, successor.
+"""
+
+PLACE_STEP = 'UPDATE steps SET successor = :successor, parent = :parent WHERE identifier = :step'
+"""Set the successor and the parent of a step.
+
+Parameters: step, successor, parent.
+"""
+
+DELETE_STEP = 'DELETE FROM steps WHERE identifier = :step'
+"""Remove a step.
+
+Parameters: step.
+"""
+
+CONTENT_IN_USE = 'SELECT 1 FROM steps WHERE content_id = :content LIMIT 1'
+"""A row if any step refers to the learning content.
+
+Parameters: content.
+"""
+
+DELETE_CONTENT = 'DELETE FROM contents WHERE identifier = :content'
+"""Remove a learning content.
+
+Parameters: content.
+"""
+
+STEP_VARIANT_FILES = '''SELECT variants.identifier,
+							variants.filename,
+							variants.isPartOf,
+							variants.format
+						FROM steps, mapping, variants
+						WHERE steps.identifier = :step
+							AND mapping.content_id = steps.content_id
+							AND mapping.variant_id = variants.identifier
+						ORDER BY variants.key'''
+"""The identifier, filename, directory and format of all variants of the learning content of a step, in the order they were added.
+
+Parameters: step.
+"""
+
+VARIANT_DATA = 'SELECT data FROM variants WHERE identifier = :identifier'
+"""The data of a variant.
+
+Parameters: identifier.
+"""
+
+DELETE_MAPPING = 'DELETE FROM mapping WHERE content_id = :content AND variant_id = :variant'
+"""Remove a variant from a learning content.
+
+Parameters: content, variant.
+"""
+
+DELETE_CONTENT_MAPPING = 'DELETE FROM mapping WHERE content_id = :content'
+"""Remove all variants from a learning content.
+
+Parameters: content.
+"""
+
+DELETE_UNMAPPED_VARIANT = '''DELETE FROM variants
+							WHERE identifier = :variant
+								AND NOT EXISTS (SELECT 1 FROM mapping WHERE variant_id = :variant)'''
+"""Remove a variant if it does not belong to any learning content any more.
+
+Parameters: variant.
+"""
@@ -20,597 +20,2493 @@ Florian Berger <florian.berger@posteo.de>
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-from luna_lms import VERSION, LOGGER
+from luna_lms import VERSION, LOGGER, IMAGE_TYPES
 from luna_lms.storage.storage import Storage
+from luna_lms.storage.navigation_index import NavigationIndex
+from luna_lms.storage.connection_pool import ConnectionPool
+from luna_lms.storage import queries
+from luna_lms.compression import is_compressible, gzip_chunks
 import sys
+import base64
+import json
 import os.path
 import cherrypy
-from cherrypy.process.plugins import SignalHandler
+from cherrypy.process.plugins import SignalHandler, Monitor
 import glob
+import random
 import sqlite3
+import string
 import threading
+import time
 import uuid
 import collections
+import hashlib
 
 
 IdTitle = collections.namedtuple('IdTitle', ['identifier', 'title'])
 
+COURSES_POLL_INTERVAL = 5
+"""The interval in seconds at which SQLiteStorage checks the directory 'courses' for added, removed or changed course files.
+"""
+
+SQLITE_PROFILES = {"default": {"journal_mode": "WAL",
+								"synchronous": "NORMAL",
+								"temp_store": "MEMORY",
+								"cache_size": -16384,
+								"mmap_size": 256 * 1024 * 1024,
+								"busy_timeout": 5000},
+					"low_memory": {"journal_mode": "WAL",
+									"synchronous": "NORMAL",
+									"temp_store": "DEFAULT",
+									"cache_size": -2000,
+									"mmap_size": 0,
+									"busy_timeout": 5000},
+					"durable": {"journal_mode": "WAL",
+								"synchronous": "FULL",
+								"temp_store": "MEMORY",
+								"cache_size": -16384,
+								"mmap_size": 256 * 1024 * 1024,
+								"busy_timeout": 5000}}
+"""Tuning profiles for the course databases, mapping profile names to dicts of sqlite PRAGMAs.
+
+"default" memory-maps up to 256 MiB of each database, so that large
+blobs in variants.data and cache.data are read without copying them
+through the page cache, and keeps up to 16 MiB of pages cached per
+connection. synchronous = NORMAL is safe against application crashes
+in WAL mode, but the last transactions may be lost on power failure.
+All profiles let a connection wait up to 5 seconds for a lock held by
+another process, instead of failing right away.
+
+"low_memory" uses the sqlite defaults for cache and temporary storage,
+and no memory mapping.
+
+"durable" is like "default", but syncs every transaction to disk.
+"""
+
+SQLITE_PROFILE = "default"
+"""The name of the entry in SQLITE_PROFILES used when none is given to SQLiteStorage.
+"""
+
+ASSET_CHUNK_SIZE = 64 * 1024
+"""The size in bytes of the chunks in which cached items are read and sent.
+"""
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+"""The size in bytes of the chunks in which uploaded files are written into a course database.
+"""
+
+IDENTIFIER_CHARACTERS = (string.ascii_lowercase + string.digits,
+							string.ascii_lowercase + string.digits,
+							string.digits,
+							string.digits,
+							string.ascii_lowercase + string.digits,
+							string.ascii_lowercase + string.digits)
+"""The characters allowed at each position of an identifier of a variant, learning content or step.
+"""
+
+
+def load_steps(cursor):
+	"""Load all steps of a course with a single table scan, and return them as a nested OrderedDict of IdTitle keys.
+
+	The order of the steps within each group is resolved from the successor
+	chains in memory, so building the tree is linear in the number of
+	steps.
+	"""
+
+	LOGGER.debug("load_steps(cursor = {})".format(cursor.__class__))
+
+	titles = {}
+
+	successors = {}
+
+	# A dict mapping the identifier of each group, or None for the top
+	# level, to a list of identifiers of its direct children, in table
+	# order.
+	#
+	children = {}
+
+	for identifier, title, successor, parent in cursor.execute(queries.STEPS):
+
+		titles[identifier] = title
+
+		successors[identifier] = successor
+
+		children.setdefault(parent, []).append(identifier)
+
+	LOGGER.debug("Found {} steps in {} groups".format(len(titles), len(children)))
+
+	result = collections.OrderedDict()
+
+	# All nodes are created upfront, so each group can be filled
+	# independently, without recursion.
+	#
+	nodes = dict([(identifier, collections.OrderedDict()) for identifier in titles])
+
+	for parent, members in children.items():
+
+		if parent is None:
+
+			node = result
+
+		elif parent in nodes:
+
+			node = nodes[parent]
+
+		else:
+
+			LOGGER.warning("Steps {} refer to missing parent {}, skipping".format(members, parent))
+
+			continue
+
+		# The first element of a group is the one that is not a
+		# successor of any other element in the group.
+		#
+		group_successors = set([successors[identifier] for identifier in members])
+
+		first_elements = [identifier for identifier in members if identifier not in group_successors]
+
+		if not first_elements:
+
+			raise Exception("No starting element found in group {}".format(parent))
+
+		if len(first_elements) > 1:
+
+			LOGGER.warning("Group {} has several starting elements {}, using {}".format(parent, first_elements, first_elements[0]))
+
+		member_set = set(members)
+
+		current_identifier = first_elements[0]
+
+		while current_identifier is not None:
+
+			if current_identifier not in member_set:
+
+				LOGGER.warning("Successor {} is not part of group {}, stopping".format(current_identifier, parent))
+
+				break
+
+			# Guard against cycles in the successor chain
+			#
+			member_set.remove(current_identifier)
+
+			node[IdTitle(current_identifier, titles[current_identifier])] = nodes[current_identifier]
+
+			current_identifier = successors[current_identifier]
+
+		if member_set:
+
+			LOGGER.warning("Steps {} in group {} are not reachable through the successor chain".format(sorted(member_set), parent))
+
+	LOGGER.debug("All elements processed")
+
+	return result
+
+
+def read_blob(connection, key, chunk_size, start, stop, column = "data"):
+	"""Yield the bytes start to stop of the blob in column of the cache item with row id key in chunks of chunk_size bytes.
+
+	The blob is only opened once the first chunk is requested, and closed
+	when done.
+	"""
+
+	blob = connection.blobopen("cache", column, key, readonly = True)
+
+	try:
+		blob.seek(start)
+
+		remaining = stop - start
+
+		while remaining > 0:
+
+			data = blob.read(min(chunk_size, remaining))
+
+			if not data:
+
+				break
+
+			remaining -= len(data)
+
+			yield data
+
+	finally:
+		blob.close()
+
+	return
+
+def read_blob_ranges(connection, key, chunk_size, start, stop):
+	"""Yield the bytes start to stop of the blob data of the cache item with row id key in chunks of chunk_size bytes, using one substr() query per chunk.
+
+	This is the fallback for Python versions without
+	sqlite3.Connection.blobopen() .
+	"""
+
+	for offset in range(start, stop, chunk_size):
+
+		result = connection.execute(queries.CACHED_ITEM_RANGE, {"key": key,
+																"start": offset + 1,
+																"length": min(chunk_size, stop - offset)}).fetchone()
+
+		if result is None or not result[0]:
+
+			LOGGER.warning("Cache item {} ended before byte {}".format(key, stop))
+
+			break
+
+		yield result[0]
+
+	return
+
+def hash_chunks(chunks, digest):
+	"""Yield the chunks of bytes unchanged, updating the hashlib object digest with each.
+	"""
+
+	for chunk in chunks:
+
+		digest.update(chunk)
+
+		yield chunk
+
+	return
+
+def new_identifier(connection, query):
+	"""Return a random identifier like "fb48ea" for which query, taking the parameter identifier, returns no row.
+	"""
+
+	while True:
+
+		identifier = "".join([random.choice(characters) for characters in IDENTIFIER_CHARACTERS])
+
+		if connection.execute(query, {"identifier": identifier}).fetchone() is None:
+
+			return identifier
+
+def write_blob(connection, key, source, size, digest):
+	"""Copy size bytes from the file object source into the blob data of the variant with row id key, updating the hashlib object digest along the way.
+
+	The blob must have been created with size bytes, e.g. with
+	zeroblob(). Data is copied in chunks of UPLOAD_CHUNK_SIZE bytes, so
+	memory use does not depend on size. Raises ValueError if source ends
+	early.
+	"""
+
+	blob = connection.blobopen("variants", "data", key)
+
+	written = 0
+
+	try:
+		while written < size:
+
+			data = source.read(min(UPLOAD_CHUNK_SIZE, size - written))
+
+			if not data:
+
+				break
+
+			blob.write(data)
+
+			digest.update(data)
+
+			written += len(data)
+
+	finally:
+		blob.close()
+
+	if written != size:
+
+		raise ValueError("Upload ended after {} of {} bytes".format(written, size))
+
+	return
+
+def update_cache_table(pool):
+	"""Add the columns hash, modified and gzip to the cache table of an older course database, and hash all cache items which have no hash yet.
+
+	Items of a compressible format are compressed with gzip along the
+	way, and the compressed variant is stored if it is small enough to
+	be worth sending.
+
+	Worker processes run this on the same database at the same time.
+	The columns are read and added in one short transaction, and the
+	items are hashed in another, so only the process holding the
+	database lock does the work, and the others find it done.
+
+	pool is the ConnectionPool of the course. Return True if the cache
+	table has all three columns afterwards, which may not be the case
+	for databases that can not be written to.
+	"""
+
+	connection = pool.writer
+
+	with pool.write_lock:
+
+		try:
+			connection.execute("BEGIN IMMEDIATE")
+
+			columns = [row[0] for row in connection.execute(queries.CACHE_COLUMNS)]
+
+			if "hash" not in columns:
+
+				LOGGER.info("Adding column 'hash' to the cache table in {}".format(pool.path))
+
+				connection.execute(queries.ADD_CACHE_HASH)
+
+			if "modified" not in columns:
+
+				LOGGER.info("Adding column 'modified' to the cache table in {}".format(pool.path))
+
+				connection.execute(queries.ADD_CACHE_MODIFIED)
+
+			if "gzip" not in columns:
+
+				LOGGER.info("Adding column 'gzip' to the cache table in {}".format(pool.path))
+
+				connection.execute(queries.ADD_CACHE_GZIP)
+
+				# Items hashed before have no compressed variant yet
+				#
+				connection.execute(queries.CLEAR_CACHE_HASHES)
+
+			connection.execute(queries.CACHE_INSERT_TRIGGER)
+
+			connection.execute(queries.DROP_OLD_CACHE_TRIGGER)
+
+			connection.execute(queries.CACHE_UPDATE_TRIGGER)
+
+			connection.commit()
+
+			connection.execute("BEGIN IMMEDIATE")
+
+			rows = connection.execute(queries.UNHASHED_CACHE_ITEMS).fetchall()
+
+			compressed_count = 0
+
+			for key, format, storage_class, size in rows:
+
+				digest = hashlib.sha256()
+
+				if storage_class == "blob" and hasattr(connection, "blobopen"):
+
+					chunks = read_blob(connection, key, ASSET_CHUNK_SIZE, 0, size)
+
+				elif storage_class == "blob":
+
+					chunks = read_blob_ranges(connection, key, ASSET_CHUNK_SIZE, 0, size)
+
+				else:
+					data = connection.execute(queries.CACHED_ITEM_DATA, {"key": key}).fetchone()[0] or b""
+
+					if data.__class__ == str:
+
+						data = bytes(data, encoding = "utf-8")
+
+					chunks = [data]
+
+				# Hash and compress in a single pass over the data
+				#
+				chunks = hash_chunks(chunks, digest)
+
+				gzip_data = None
+
+				if is_compressible(format):
+
+					gzip_data = gzip_chunks(chunks)
+
+				else:
+					for chunk in chunks:
+
+						pass
+
+				if gzip_data is not None:
+
+					compressed_count += 1
+
+				connection.execute(queries.SET_CACHED_ITEM_HASH, {"key": key,
+																	"hash": digest.hexdigest(),
+																	"gzip": gzip_data})
+
+			connection.commit()
+
+			if rows:
+
+				LOGGER.info("Stored the hashes of {} cache items in {}, {} of them with a compressed variant".format(len(rows), pool.path, compressed_count))
+
+		except sqlite3.Error as error:
+
+			connection.rollback()
+
+			LOGGER.warning("Could not update the cache table in {}: {}".format(pool.path, error))
+
+			# Another process may have added the columns meanwhile, so
+			# report the schema as it is now.
+			#
+			try:
+				columns = [row[0] for row in connection.execute(queries.CACHE_COLUMNS)]
+
+			except sqlite3.Error:
+
+				return False
+
+			return "hash" in columns and "modified" in columns and "gzip" in columns
+
+	return True
+
+def update_revision_table(pool):
+	"""Add the table revision and the triggers counting it up to an older course database.
+
+	The revision and the time of the last change are kept in the database,
+	so all processes serving the course see the same values. Triggers
+	count them up on any change of a course table, including changes
+	made by other programs. The token is chosen at random once, so that a
+	database replaced by another one does not repeat its revisions.
+
+	pool is the ConnectionPool of the course. Return True if the table
+	exists afterwards, which may not be the case for databases that can
+	not be written to.
+	"""
+
+	connection = pool.writer
+
+	with pool.write_lock:
+
+		try:
+			connection.execute("BEGIN IMMEDIATE")
+
+			connection.execute(queries.REVISION_TABLE)
+
+			connection.execute(queries.INSERT_REVISION, {"token": uuid.uuid4().hex[:8]})
+
+			for table in queries.REVISION_TABLES:
+
+				for event in ("INSERT", "UPDATE", "DELETE"):
+
+					connection.execute(queries.REVISION_TRIGGER.format(table, event))
+
+			connection.commit()
+
+		except sqlite3.Error as error:
+
+			connection.rollback()
+
+			LOGGER.warning("Could not add the revision table to {}: {}".format(pool.path, error))
+
+			return False
+
+	return True
+
+
 
 class SQLiteStorage(Storage):
 	"""This class stores data in a sqlite database on disk.
 
 	SQLiteStorage.connections
-		A dict mapping UUID ids of a course to a tuple (sqlite3.Connection,
-		threading.Lock). By convention, the Lock must be acquired to write
-		data.
+		A dict mapping UUID ids of a course to a ConnectionPool, which
+		provides a read connection per thread and a single writer
+		connection.
+
+	SQLiteStorage.profile
+		The name of the tuning profile in SQLITE_PROFILES applied to all
+		connections.
+
+	SQLiteStorage.courses
+		The course registry. A dict mapping UUID ids of available courses
+		to their titles, and titles to UUID ids. It is built once at
+		startup, and kept up to date by the write paths and by a watcher
+		polling the directory 'courses'. Must not be modified by callers.
+
+	SQLiteStorage.course_files
+		A dict mapping UUID ids of available courses to a tuple
+		(path, mtime) of their sqlite file.
+
+	SQLiteStorage.revisions
+		A dict mapping UUID ids of courses to a revision counter. Write
+		paths and the directory watcher bump it whenever the course data
+		changes, which invalidates anything computed from an older
+		revision. get_revision() also bumps it for changes committed by
+		other processes.
+
+	SQLiteStorage.revision_times
+		A dict mapping UUID ids of courses to the time of their last
+		revision, in seconds since the epoch.
+
+	SQLiteStorage.validators
+		A dict mapping UUID ids of courses to a tuple (revision,
+		validator, modified) holding the result of get_validator() at
+		that revision.
+
+	SQLiteStorage.cache_validators
+		A set of UUID ids of courses whose cache table has the columns
+		hash and modified, see update_cache_table().
+
+	SQLiteStorage.started
+		True between calls of start() and stop() .
+
+	SQLiteStorage.navigation_indexes
+		A dict mapping UUID ids of courses to a tuple (revision,
+		NavigationIndex).
+
+	SQLiteStorage.catalog_revision
+		A counter that changes whenever any course is added, changed or
+		removed.
+
+	SQLiteStorage.catalog
+		A tuple (catalog_revision, list) holding the result of
+		get_course_catalog() .
 	"""
 
-	def __init__(self):
+	def __init__(self, profile = None):
 		"""Initialise SQLiteStorage.
+
+		profile is the name of a tuning profile in SQLITE_PROFILES, and
+		defaults to SQLITE_PROFILE .
+
+		This only sets up data structures. Call start() to open the
+		courses.
 		"""
 
-		LOGGER.info("Initialising SQLiteStorage in working directory {}".format(sys.path[0]))
+		LOGGER.info("Initialising SQLiteStorage in working directory {}".format(sys.path[0]))
+
+		if profile is None:
+
+			profile = SQLITE_PROFILE
+
+		if profile not in SQLITE_PROFILES:
+
+			LOGGER.error("Unknown sqlite profile '{}', using '{}'. Available profiles: {}".format(profile, SQLITE_PROFILE, ", ".join(SQLITE_PROFILES.keys())))
+
+			profile = SQLITE_PROFILE
+
+		LOGGER.info("Using sqlite profile '{}': {}".format(profile, SQLITE_PROFILES[profile]))
+
+		self.profile = profile
+
+		# We use persistent connections instead of persistent cursors because of
+		# https://stackoverflow.com/a/54410755 :
+		# "If you're aiming to support DB-API 2.0 compatible drivers, I suggest
+		# just use the cursor() method to create a cursor for every query
+		# execution. I would recommend to NEVER have a singleton or shared
+		# cursor."
+		#
+		self.connections = {}
+
+		self.courses = {}
+
+		self.course_files = {}
+
+		self.revisions = {}
+
+		self.revision_times = {}
+
+		self.validators = {}
+
+		# Maps UUID ids of courses to the data version of their
+		# database at the last call of get_revision(). Revisions are
+		# counted per process, the data version tells about changes
+		# from other processes.
+		#
+		self.data_versions = {}
+
+		self.cache_validators = set()
+
+		self.navigation_indexes = {}
+
+		self.catalog_revision = 0
+
+		self.catalog = (None, [])
+
+		# The modification time of the directory 'courses' at the last scan.
+		# Adding, removing or renaming files changes it.
+		#
+		self.courses_mtime = None
+
+		# Serialises scans of the directory 'courses'. Readers do not need
+		# it, since a scan replaces SQLiteStorage.courses as a whole.
+		#
+		self.registry_lock = threading.Lock()
+
+		self.started = False
+
+		# The CherryPy plugins subscribed by start(), unsubscribed by
+		# stop().
+		#
+		self.watcher = None
+
+		self.signal_handler = None
+
+		return
+
+	def start(self, watch = True):
+		"""Create the directory 'courses' if necessary, and open all courses in it.
+
+		If watch is True, also watch the directory for changes, and close
+		all connections when the application receives a signal to quit.
+		Both are plugins of cherrypy.engine . Tools and benchmarks that do
+		not run the engine may pass False.
+
+		Calling start() again has no effect until stop() is called.
+		"""
+
+		if self.started:
+
+			LOGGER.debug("SQLiteStorage has already been started")
+
+			return
+
+		self.started = True
+
+		if not os.path.isdir("courses"):
+
+			LOGGER.warning("Directory 'courses' does not exist, creating")
+
+			os.mkdir("courses")
+
+		self.scan_courses()
+
+		if not watch:
+
+			return
+
+		LOGGER.debug("Adding watcher for directory 'courses', polling every {} seconds".format(COURSES_POLL_INTERVAL))
+
+		self.watcher = Monitor(cherrypy.engine,
+								self.check_courses_directory,
+								frequency = COURSES_POLL_INTERVAL,
+								name = "CourseWatcher")
+
+		self.watcher.subscribe()
+
+		# Taken from https://stackoverflow.com/a/65974899
+		#
+		LOGGER.debug("Adding signal handler to close connections at application quit")
+
+		self.signal_handler = SignalHandler(cherrypy.engine)
+		
+		self.signal_handler.handlers['SIGTERM'] = self.close_sqlite_connections
+		self.signal_handler.handlers['SIGHUP'] = self.close_sqlite_connections
+		self.signal_handler.handlers['SIGQUIT'] = self.close_sqlite_connections
+		self.signal_handler.handlers['SIGINT'] = self.close_sqlite_connections
+
+		self.signal_handler.subscribe()
+
+		return
+
+	def stop(self):
+		"""Stop watching the directory 'courses', and close all connections.
+
+		The storage can be started again with start().
+		"""
+
+		if self.watcher is not None:
+
+			# Stops the polling thread if the engine is running
+			#
+			self.watcher.stop()
+
+			self.watcher.unsubscribe()
+
+			self.watcher = None
+
+		if self.signal_handler is not None:
+
+			self.signal_handler.unsubscribe()
+
+			self.signal_handler = None
+
+		self.started = False
+
+		for identifier in list(self.connections.keys()):
+
+			self._close_connection(identifier)
+
+		with self.registry_lock:
+
+			self.courses = {}
+
+			self.course_files = {}
+
+			self.courses_mtime = None
+
+		return
+
+	def find_courses(self):
+		"""Return a dict mapping the titles of available courses to their IDs, and IDs to titles.
+
+		This is a lookup in the course registry SQLiteStorage.courses, which
+		is kept up to date by scan_courses(). The dict must not be modified
+		by the caller.
+		"""
+
+		return self.courses
+
+	def check_courses_directory(self):
+		"""Rescan the directory 'courses' if its modification time, or the modification time of a known course file, has changed.
+
+		This is cheap enough to be called periodically, and whenever a
+		course is requested that is not in the registry.
+		"""
+
+		try:
+			mtime = os.stat("courses").st_mtime_ns
+
+		except FileNotFoundError:
+
+			LOGGER.warning("Directory 'courses' has disappeared")
+
+			mtime = None
+
+		changed = mtime != self.courses_mtime
+
+		if not changed:
+
+			for identifier, (path, file_mtime) in list(self.course_files.items()):
+
+				try:
+					if os.stat(path).st_mtime_ns != file_mtime:
+
+						changed = True
+
+						break
+
+				except FileNotFoundError:
+
+					changed = True
+
+					break
+
+		if changed:
+
+			LOGGER.info("Directory 'courses' has changed, rescanning")
+
+			self.scan_courses()
+
+		return
+
+	def scan_courses(self):
+		"""Scan the directory 'courses' and rebuild the course registry SQLiteStorage.courses .
+
+		Only files that are new or have changed since the last scan are
+		opened. Found courses with a reqired MAJOR Luna version larger than
+		the current one will be omitted.
+		"""
+
+		with self.registry_lock:
+
+			try:
+				self.courses_mtime = os.stat("courses").st_mtime_ns
+
+			except FileNotFoundError:
+
+				self.courses_mtime = None
+
+			# Yes, Unix-style paths are okay for glob
+			#
+			course_files = glob.glob("courses/*.sqlite")
+
+			if not course_files:
+
+				LOGGER.info("No sqlite course files in directory 'courses'")
+
+			known_files = dict([(path, (identifier, file_mtime))
+								for identifier, (path, file_mtime) in self.course_files.items()])
+
+			courses = {}
+
+			files = {}
+
+			for course_file in course_files:
+
+				file_mtime = os.stat(course_file).st_mtime_ns
+
+				if course_file in known_files and known_files[course_file][1] == file_mtime:
+
+					identifier = known_files[course_file][0]
+
+					courses[identifier] = self.courses[identifier]
+					courses[self.courses[identifier]] = identifier
+
+					files[identifier] = (course_file, file_mtime)
+
+					continue
+
+				pool = ConnectionPool(course_file, SQLITE_PROFILES[self.profile])
+
+				cursor = pool.read().cursor()
+
+				result = cursor.execute(queries.COURSE_IDENTIFICATION)
+
+				identifier, title, requires = result.fetchone()
+
+				# We're using type UUID, not string, here, since,
+				# in theory, one could use an UUID as a title,
+				# which would confuse the dict.
+				# Doing it that way, it's always mapping of
+				# UUID -> string, and string -> UUID.
+				#
+				identifier = uuid.UUID(identifier)
+
+				LOGGER.debug("Course found: '{}', identifier == {}".format(title, identifier))
+
+				LOGGER.debug("Checking course {} for compatibility".format(identifier))
+
+				# String is "Luna LMS MAJOR.MINOR.PATCH"
+				#
+				required_version = requires.split("Luna LMS ")[1]
+
+				if int(required_version.split(".")[0]) > int(VERSION.split(".")[0]):
+
+					msg = "Can not use found course {} ('{}'): course requires Luna LMS version {}, but the running version is {}"
+
+					LOGGER.warning(msg.format(identifier,
+												title,
+												required_version,
+												VERSION))
+
+					pool.close()
+
+					continue
+
+				# New cache items need to be hashed whenever the file has
+				# changed from outside.
+				#
+				if update_cache_table(pool):
+
+					self.cache_validators.add(identifier)
+
+				else:
+					self.cache_validators.discard(identifier)
+
+				update_revision_table(pool)
+
+				if identifier in self.connections:
+
+					LOGGER.debug("Course {} already in connections, closing temporary connection pool".format(identifier))
+
+					pool.close()
+
+				else:
+					self.connections[identifier] = pool
+
+				courses[identifier] = title
+				courses[title] = identifier
+
+				files[identifier] = (course_file, file_mtime)
+
+				# The course is new, or its file has been changed
+				# from outside.
+				#
+				self.bump_revision(identifier)
+
+			# Close connections to courses that have disappeared
+			#
+			for identifier in list(self.connections.keys()):
+
+				if identifier not in files:
+
+					LOGGER.info("Course {} is no longer available, closing connection".format(identifier))
+
+					self._close_connection(identifier)
+
+					self.bump_revision(identifier)
+
+			self.course_files = files
+
+			self.courses = courses
+
+		return
+
+	def register_course(self, identifier, title, path):
+		"""Add a course to the course registry, or update its title.
+
+		This is meant to be called by the write paths after a course file
+		has been created or changed.
+		"""
+
+		LOGGER.debug("Registering course {} ('{}') from {}".format(identifier, title, path))
+
+		with self.registry_lock:
+
+			courses = dict(self.courses)
+
+			if identifier in courses:
+
+				del courses[courses[identifier]]
+
+			courses[identifier] = title
+			courses[title] = identifier
+
+			files = dict(self.course_files)
+
+			files[identifier] = (path, os.stat(path).st_mtime_ns)
+
+			self.course_files = files
+
+			self.courses = courses
+
+		self.bump_revision(identifier)
+
+		return
+
+	def unregister_course(self, identifier):
+		"""Remove a course from the course registry, and close its connection.
+
+		This is meant to be called by the write paths before a course file
+		is deleted.
+		"""
+
+		LOGGER.debug("Unregistering course {}".format(identifier))
+
+		with self.registry_lock:
+
+			courses = dict(self.courses)
+
+			if identifier in courses:
+
+				del courses[courses.pop(identifier)]
+
+			files = dict(self.course_files)
+
+			files.pop(identifier, None)
+
+			if identifier in self.connections:
+
+				self._close_connection(identifier)
+
+			self.course_files = files
+
+			self.courses = courses
+
+		self.bump_revision(identifier)
+
+		return
+
+	def get_revision(self, course):
+		"""Return the revision of the course, an integer that changes whenever the course data changes.
+
+		Changes committed by other processes are detected through the
+		data version of the course database, and bump the revision.
+		"""
+
+		pool = self.connections.get(course)
+
+		if pool is not None:
+
+			try:
+				data_version = pool.data_version()
+
+			except sqlite3.ProgrammingError:
+
+				# Closed by a concurrent scan
+				#
+				return self.revisions.get(course, 0)
+
+			if self.data_versions.get(course, data_version) != data_version:
+
+				LOGGER.debug("Course {} has been changed by another connection".format(course))
+
+				self.bump_revision(course)
+
+			self.data_versions[course] = data_version
+
+		return self.revisions.get(course, 0)
+
+	def get_validator(self, course):
+		"""Return a tuple (validator, modified) describing the stored state of the course, with the same values in all processes.
+
+		validator is a string that changes whenever the course data
+		changes, and modified the time of the last change in seconds
+		since the epoch. They are read from the table revision once per
+		revision of the course. Databases without that table fall back to
+		the modification time of the course file. Unknown courses return
+		("", None).
+		"""
+
+		revision = self.get_revision(course)
+
+		if course in self.validators and self.validators[course][0] == revision:
+
+			return self.validators[course][1:]
+
+		pool = self.connections.get(course)
+
+		if pool is None:
+
+			return ("", None)
+
+		try:
+			row = pool.read().execute(queries.COURSE_REVISION).fetchone()
+
+		except sqlite3.Error:
+
+			row = None
+
+		if row is not None:
+
+			validator = ("{}.{}".format(row[0], row[1]), row[2])
+
+		else:
+			mtime = self.course_files.get(course, ("", 0))[1]
+
+			validator = ("m{}".format(mtime), mtime / 1e9)
+
+		self.validators[course] = (revision,) + validator
+
+		return validator
+
+	def get_revision_time(self, course):
+		"""Return the time of the last revision of the course in seconds since the epoch, or None if it is not known.
+		"""
+
+		return self.revision_times.get(course)
+
+	def bump_revision(self, course):
+		"""Increase the revision of the course, invalidating everything computed from an older revision.
+
+		This must be called by every write path after changing course data.
+		"""
+
+		# Cached data is invalidated lazily, by comparing revisions.
+		# A plain increment may race with another writer, but any race
+		# still results in a new revision number.
+		#
+		self.revisions[course] = self.revisions.get(course, 0) + 1
+
+		self.revision_times[course] = time.time()
+
+		self.catalog_revision += 1
+
+		LOGGER.debug("Course {} is now at revision {}".format(course, self.revisions[course]))
+
+		return
+
+	def get_course_catalog(self):
+		"""Return a list of summaries of all available courses, sorted by title.
+
+		Each summary is a dict with the keys "identifier", "title",
+		"description", "relation", the path of the cover image in the
+		cache, and "alt", its description. Cached data is not read.
+
+		The list is built once per SQLiteStorage.catalog_revision, and
+		must not be modified by the caller.
+
+		Example:
+
+		[
+			{
+				"identifier": UUID("e0f59465-f984-45ef-9b3d-2cf29e9edcd8"),
+				"title": "Example Title",
+				"description": "Example description.",
+				"relation": "square.svg",
+				"alt": "A violet square, balancing on a corner."
+			}
+		]
+		"""
+
+		revision, catalog = self.catalog
+
+		if revision == self.catalog_revision:
+
+			return catalog
+
+		# A change while the catalog is built leaves it outdated, so it
+		# is rebuilt on the next call.
+		#
+		revision = self.catalog_revision
+
+		LOGGER.debug("Building course catalog at revision {}".format(revision))
+
+		catalog = []
+
+		for identifier in [key for key in self.courses.keys() if key.__class__ is uuid.UUID]:
+
+			pool = self.connections.get(identifier)
+
+			if pool is None:
+
+				continue
+
+			result = pool.read().execute(queries.COURSE_CATALOG_ENTRY).fetchone()
+
+			if not result:
+
+				LOGGER.warning("Course {} has no metadata, omitting from catalog".format(identifier))
+
+				continue
+
+			title, description, relation, alt = result
+
+			catalog.append({"identifier": identifier,
+							"title": title,
+							"description": description,
+							"relation": relation,
+							"alt": alt or ""})
+
+		catalog.sort(key = lambda summary: summary["title"])
+
+		self.catalog = (revision, catalog)
+
+		return catalog
+
+	def get_course_metadata(self, course):
+		"""Return the metadata of the course as a dict.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+
+		Example:
+		
+		{
+			"identifier": "e0f59465-f984-45ef-9b3d-2cf29e9edcd8",
+			"title": "Example Title",
+			"description": "Example description.",
+			"relation": "",
+			"created": "2023-08-28",
+			"modified": "2023-08-28",
+			"dateAccepted": "",
+			"issued": "",
+			"contributor": "Jane",
+			"requires": "Luna LMS 1.0.0",
+		}
+		"""
+
+		meta_data = {}
+
+		if course.__class__ is not uuid.UUID:
+
+			LOGGER.error("Only UUIDs are currently supported as a course identifier, received class is {}".format(course.__class__))
+
+			return meta_data
+
+		if course not in self.connections.keys():
+
+			self.check_courses_directory()
+
+			if course not in self.connections.keys():
+
+				LOGGER.error("Course id {} not found in available courses".format(course))
+
+				return meta_data
+
+		cursor = self.connections[course].read().cursor()
+
+		result = cursor.execute(queries.COURSE_METADATA)
+
+		meta_data.update(zip(queries.COURSE_METADATA_KEYS, result.fetchone()))
+
+		return meta_data
+
+	def get_html(self, course, learning_content_id):
+		"""Return the content of the first HTML file found in the learning content, or an empty string.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		content = ""
+
+		if course.__class__ is not uuid.UUID:
+
+			LOGGER.error("Only UUIDs are currently supported as a course identifier, received class is {}".format(course.__class__))
+
+			return content
+
+		if course not in self.connections.keys():
+
+			self.check_courses_directory()
+
+			if course not in self.connections.keys():
+
+				LOGGER.error("Course id {} not found in available courses".format(course))
+
+				return content
+
+		cursor = self.connections[course].read().cursor()
+
+		result = cursor.execute(queries.STEP_HTML, {"step": learning_content_id})
+
+		result = result.fetchone()
+
+		if result:
+
+			content = result[0]
+
+		return content
+
+	def get_learning_contents_ordered(self, course):
+		"""Return a nested OrderedDict of learning content identifiers and titles.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		result = collections.OrderedDict()
+
+		if course.__class__ is not uuid.UUID:
+
+			LOGGER.error("Only UUIDs are currently supported as a course identifier, received class is {}".format(course.__class__))
+
+			return result
+
+		if course not in self.connections.keys():
+
+			self.check_courses_directory()
+
+			if course not in self.connections.keys():
+
+				LOGGER.error("Course id {} not found in available courses".format(course))
+
+				return result
+
+		cursor = self.connections[course].read().cursor()
+
+		result.update(load_steps(cursor))
+
+		return result
+
+	def get_navigation_index(self, course):
+		"""Return a NavigationIndex for the ordered learning contents of a course.
+
+		The index is computed once per course revision. Unknown courses
+		get an empty index, which is not kept.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		if self._pool(course) is None:
+
+			return NavigationIndex()
+
+		revision = self.get_revision(course)
+
+		if course in self.navigation_indexes and self.navigation_indexes[course][0] == revision:
+
+			return self.navigation_indexes[course][1]
+
+		LOGGER.debug("Building navigation index for course {} at revision {}".format(course, revision))
+
+		index = NavigationIndex(self.get_learning_contents_ordered(course))
+
+		self.navigation_indexes[course] = (revision, index)
+
+		return index
+
+	def _pool(self, course):
+		"""Return the ConnectionPool of the course, or None if course is not the identifier of an available course.
+		"""
+
+		if course.__class__ is not uuid.UUID:
+
+			LOGGER.error("Only UUIDs are currently supported as a course identifier, received class is {}".format(course.__class__))
+
+			return None
+
+		if course not in self.connections.keys():
+
+			self.check_courses_directory()
+
+			if course not in self.connections.keys():
+
+				LOGGER.error("Course id {} not found in available courses".format(course))
+
+				return None
+
+		return self.connections[course]
+
+	def get_course_titles(self):
+		"""Return a list of titles of existing courses.
+		"""
+
+		return [key for key in self.courses.keys() if key.__class__ == str]
+
+	def get_learning_contents(self, course):
+		"""Return a list of the identifiers of all steps of a course, in arbitrary order.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		pool = self._pool(course)
+
+		if pool is None:
+
+			return []
+
+		return [row[0] for row in pool.read().execute(queries.STEP_IDENTIFIERS)]
+
+	def get_learning_contents_titles(self, course):
+		"""Return a dictionary mapping the identifiers of all steps of a course to their titles.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		pool = self._pool(course)
+
+		if pool is None:
+
+			return {}
+
+		return dict(pool.read().execute(queries.STEP_TITLES).fetchall())
+
+	def _step_variants(self, course, learning_content_id):
+		"""Return a list of tuples (identifier, filename, isPartOf, format) of all variants of the learning content of a step.
+		"""
+
+		pool = self._pool(course)
+
+		if pool is None:
+
+			return []
+
+		return pool.read().execute(queries.STEP_VARIANT_FILES, {"step": learning_content_id}).fetchall()
+
+	def get_variants(self, course, learning_content_id):
+		"""Return a list of the file names of all variants of a step, with the files of a directory variant given as the directory name.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		variants = []
+
+		for identifier, filename, directory, file_format in self._step_variants(course, learning_content_id):
+
+			if directory is None:
+
+				variants.append(filename)
+
+			elif directory not in variants:
+
+				variants.append(directory)
+
+		return variants
+
+	def get_variants_ids(self, course, learning_content_id):
+		"""Return a list of identifiers of all variants of a step, including the files of directory variants.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		return [row[0] for row in self._step_variants(course, learning_content_id)]
+
+	def get_variant_metadata(self, course, learning_content_id, variant):
+		"""Return the metadata of the variant with the file or directory name variant as a dict, or an empty dict.
+
+		A directory variant has its name as identifier, and the format
+		"inode/directory".
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		for identifier, filename, directory, file_format in self._step_variants(course, learning_content_id):
+
+			if directory is None and filename == variant:
+
+				return {"identifier": identifier,
+						"format": file_format,
+						"type": "Variante"}
+
+			if directory == variant:
+
+				return {"identifier": directory,
+						"format": "inode/directory",
+						"type": "Variante"}
+
+		return {}
+
+	def get_image(self, course, learning_content_id):
+		"""Return the first image variant of a step as a data URI, or an empty string.
+
+		Variants are not served under a path of their own, so the image is
+		embedded into the page.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		for identifier, filename, directory, file_format in self._step_variants(course, learning_content_id):
+
+			if directory is None and file_format in IMAGE_TYPES:
+
+				data = self.connections[course].read().execute(queries.VARIANT_DATA, {"identifier": identifier}).fetchone()[0] or b""
+
+				if data.__class__ == str:
+
+					data = bytes(data, encoding = "utf-8")
+
+				return "data:{};base64,{}".format(file_format, base64.b64encode(data).decode("ascii"))
+
+		return ""
+
+	def get_directory(self, course, learning_content_id):
+		"""Return a tuple (directory_name, html) with the name of the first directory variant of a step, and the content of the first HTML file in there.
+
+		Both elements may be empty.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		directory_name = ""
+
+		for identifier, filename, directory, file_format in self._step_variants(course, learning_content_id):
+
+			if directory is None or directory_name not in ("", directory):
+
+				continue
+
+			directory_name = directory
+
+			if file_format == "text/html":
+
+				data = self.connections[course].read().execute(queries.VARIANT_DATA, {"identifier": identifier}).fetchone()[0] or ""
+
+				if data.__class__ == bytes:
+
+					data = data.decode("utf-8", errors = "replace")
+
+				return (directory_name, data)
+
+		return (directory_name, "")
+
+	def write_course(self, title):
+		"""Create a new course database courses/<title>.sqlite, and add it to the course registry.
+
+		The database is built under a temporary name, and then linked to
+		its final name, which fails if the file exists. So an existing
+		course is never overwritten, not even by another process.
+
+		Return a message indicating success or failure.
+		"""
+
+		if title in self.courses:
+
+			LOGGER.warning("Course '{}' already exists".format(title))
+
+			return _("Diesen Kurs gibt es schon.")
+
+		if not os.path.isdir("courses"):
+
+			LOGGER.warning("Directory 'courses' does not exist, creating")
+
+			os.makedirs("courses", exist_ok = True)
+
+		path = os.path.join("courses", title + ".sqlite")
+
+		# Not matched by the pattern scan_courses() looks for
+		#
+		temporary_path = os.path.join("courses", ".{}.{}-{}.tmp".format(title, os.getpid(), threading.get_ident()))
+
+		identifier = uuid.uuid4()
+
+		LOGGER.info("Creating course database {} for course '{}' with id {}".format(path, title, identifier))
+
+		try:
+			connection = sqlite3.connect(temporary_path)
+
+			try:
+				for statement in queries.COURSE_SCHEMA:
+
+					connection.execute(statement)
+
+				connection.execute(queries.STEPS_INDEX)
+
+				connection.execute(queries.INSERT_COURSE, {"identifier": str(identifier),
+															"title": title,
+															"date": time.strftime("%Y-%m-%d"),
+															"requires": "Luna LMS " + VERSION})
+
+				connection.commit()
+
+			finally:
+				connection.close()
+
+			os.link(temporary_path, path)
+
+		except FileExistsError:
+
+			LOGGER.warning("Course file {} already exists".format(path))
+
+			return _("Diesen Kurs gibt es schon.")
+
+		except (sqlite3.Error, OSError) as error:
+
+			LOGGER.error("Could not create course database {}: {}".format(path, error))
+
+			return _("Der Kurs konnte nicht angelegt werden.")
+
+		finally:
+			if os.path.exists(temporary_path):
+
+				os.remove(temporary_path)
+
+		pool = ConnectionPool(path, SQLITE_PROFILES[self.profile])
+
+		if update_cache_table(pool):
+
+			self.cache_validators.add(identifier)
+
+		update_revision_table(pool)
+
+		with self.registry_lock:
+
+			self.connections[identifier] = pool
+
+		self.register_course(identifier, title, path)
+
+		LOGGER.info("Course database created.")
+
+		return _("Kurs angelegt.")
+
+	def delete_course(self, course):
+		"""Remove the course from the course registry, and delete its database file.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+
+		Return a message in case of success.
+		"""
+
+		if self._pool(course) is None:
+
+			return ""
+
+		path = self.course_files[course][0]
+
+		title = self.courses[course]
+
+		self.unregister_course(course)
+
+		LOGGER.info("Removing course file {}".format(path))
+
+		try:
+			os.remove(path)
+
+		except FileNotFoundError:
+
+			LOGGER.warning("Course file {} has already been removed".format(path))
+
+		for suffix in ("-wal", "-shm"):
+
+			if os.path.exists(path + suffix):
+
+				os.remove(path + suffix)
+
+		return _("Kurs {} gelöscht.").format(title)
+
+	def write_learning_content(self, course, learning_content_title):
+		"""Create a new learning content, and append a step for it to the top level of the course.
+
+		This inserts a learning content and a step, and links the former
+		last step to the new one.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+
+		Return a message indicating success or failure.
+		"""
+
+		pool = self._pool(course)
+
+		if pool is None:
+
+			return ""
+
+		connection = pool.writer
+
+		with pool.write_lock:
+
+			try:
+				connection.execute("BEGIN IMMEDIATE")
+
+				connection.execute(queries.STEPS_INDEX)
+
+				content_id = new_identifier(connection, queries.CONTENT_IDENTIFIER_EXISTS)
+
+				step_id = new_identifier(connection, queries.STEP_IDENTIFIER_EXISTS)
+
+				last = connection.execute(queries.LAST_STEP, {"parent": None, "step": step_id}).fetchone()
+
+				connection.execute(queries.INSERT_CONTENT, {"identifier": content_id, "title": learning_content_title})
+
+				connection.execute(queries.INSERT_STEP, {"title": learning_content_title,
+															"identifier": step_id,
+															"content": content_id,
+															"parent": None})
+
+				if last is not None:
+
+					connection.execute(queries.SET_SUCCESSOR, {"step": last[0], "successor": step_id})
+
+				connection.commit()
+
+			except sqlite3.Error as error:
+
+				connection.rollback()
+
+				LOGGER.error("Could not add learning content '{}' to {}: {}".format(learning_content_title, pool.path, error))
+
+				return _("Der Lern-Inhalt konnte nicht angelegt werden.")
+
+		self.bump_revision(course)
+
+		LOGGER.info("Added step {} with learning content {} to course {}".format(step_id, content_id, course))
+
+		return _("Lern-Inhalt angelegt und zum Kurs hinzugefügt.")
+
+	def move_learning_content(self, course, learning_content_id, successor_id = ""):
+		"""Move a step directly before the step successor_id, into the group of that step. If successor_id is empty, move the step to the end of its group.
+
+		Only the moved step and its predecessors at the old and the new
+		place are updated.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+
+		Return a message indicating success or failure.
+		"""
+
+		if successor_id == learning_content_id:
+
+			LOGGER.error("Can not move step {} before itself".format(learning_content_id))
+
+			return _("Verschieben nicht möglich: Ein Lern-Inhalt kann nicht vor sich selbst stehen.")
+
+		pool = self._pool(course)
+
+		if pool is None:
+
+			return ""
+
+		connection = pool.writer
+
+		with pool.write_lock:
+
+			try:
+				connection.execute("BEGIN IMMEDIATE")
+
+				connection.execute(queries.STEPS_INDEX)
+
+				step = connection.execute(queries.STEP, {"step": learning_content_id}).fetchone()
+
+				target = None
+
+				if successor_id:
+
+					target = connection.execute(queries.STEP, {"step": successor_id}).fetchone()
+
+				if step is None or (successor_id and target is None):
+
+					LOGGER.error("Step {} or {} not found in course {}".format(learning_content_id, successor_id, course))
+
+					connection.rollback()
+
+					return _("Verschieben nicht möglich: Den Lern-Inhalt gibt es nicht mehr.")
+
+				identifier, content_id, old_successor, old_parent = step
+
+				parent = old_parent
+
+				if target is not None:
+
+					parent = target[3]
+
+				if (successor_id or None) == old_successor and parent == old_parent:
+
+					connection.rollback()
+
+					return _("Lern-Inhalt verschoben.")
+
+				# A group can not become a part of itself
+				#
+				ancestors = set()
+
+				ancestor = parent
+
+				while ancestor is not None and ancestor not in ancestors:
+
+					if ancestor == learning_content_id:
+
+						LOGGER.error("Can not move step {} into its own group {}".format(learning_content_id, parent))
+
+						connection.rollback()
+
+						return _("Verschieben nicht möglich: Eine Gruppe kann nicht in sich selbst liegen.")
+
+					ancestors.add(ancestor)
+
+					ancestor = connection.execute(queries.STEP, {"step": ancestor}).fetchone()[3]
+
+				connection.execute(queries.RELINK_PREDECESSOR, {"step": learning_content_id,
+																"parent": old_parent,
+																"successor": old_successor})
+
+				if successor_id:
+
+					connection.execute(queries.RELINK_PREDECESSOR, {"step": successor_id,
+																	"parent": parent,
+																	"successor": learning_content_id})
+
+				else:
+					last = connection.execute(queries.LAST_STEP, {"parent": parent, "step": learning_content_id}).fetchone()
+
+					if last is not None:
+
+						connection.execute(queries.SET_SUCCESSOR, {"step": last[0], "successor": learning_content_id})
+
+				connection.execute(queries.PLACE_STEP, {"step": learning_content_id,
+														"successor": successor_id or None,
+														"parent": parent})
+
+				connection.commit()
+
+			except sqlite3.Error as error:
+
+				connection.rollback()
+
+				LOGGER.error("Could not move step {} in {}: {}".format(learning_content_id, pool.path, error))
+
+				return _("Verschieben nicht möglich.")
+
+		self.bump_revision(course)
+
+		return _("Lern-Inhalt verschoben.")
+
+	def write_learning_contents_list(self, course, learning_contents_list):
+		"""Write a re-ordered list of the steps of one group into the course.
+
+		learning_contents_list is a list of step identifiers, or its string
+		representation as sent by a form. It must hold all steps of the
+		group. Only steps whose successor changes are updated, so swapping
+		two neighbours updates three rows.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+
+		Return a message indicating success or failure.
+		"""
+
+		if learning_contents_list.__class__ == str:
+
+			# Replace the ' quotes of a Python list representation by "
+			#
+			learning_contents_list = json.loads(learning_contents_list.replace("'", '"'))
+
+		pool = self._pool(course)
+
+		if pool is None or not learning_contents_list:
+
+			return ""
+
+		connection = pool.writer
+
+		changed = 0
+
+		with pool.write_lock:
+
+			try:
+				connection.execute("BEGIN IMMEDIATE")
+
+				first = connection.execute(queries.STEP, {"step": learning_contents_list[0]}).fetchone()
+
+				successors = {}
+
+				if first is not None:
+
+					successors = dict(connection.execute(queries.GROUP_STEPS, {"parent": first[3]}).fetchall())
+
+				if sorted(successors.keys()) != sorted(learning_contents_list):
+
+					error = _("Umsortierung nicht möglich: Die Liste passt nicht mehr zu den Lern-Inhalten der Gruppe.")
+
+					LOGGER.error(error)
+
+					connection.rollback()
+
+					return error
+
+				for position, identifier in enumerate(learning_contents_list):
+
+					successor = None
+
+					if position + 1 < len(learning_contents_list):
+
+						successor = learning_contents_list[position + 1]
+
+					if successors[identifier] != successor:
+
+						connection.execute(queries.SET_SUCCESSOR, {"step": identifier, "successor": successor})
+
+						changed += 1
+
+				connection.commit()
+
+			except sqlite3.Error as error:
+
+				connection.rollback()
+
+				LOGGER.error("Could not re-order steps in {}: {}".format(pool.path, error))
+
+				return _("Umsortierung nicht möglich.")
+
+		if changed:
+
+			self.bump_revision(course)
 
-		# We use persistent connections instead of persistent cursors because of
-		# https://stackoverflow.com/a/54410755 :
-		# "If you're aiming to support DB-API 2.0 compatible drivers, I suggest
-		# just use the cursor() method to create a cursor for every query
-		# execution. I would recommend to NEVER have a singleton or shared
-		# cursor."
-		#
-		self.connections = {}
+		LOGGER.debug("Re-ordered steps in course {}, {} rows changed".format(course, changed))
 
-		if not os.path.isdir("courses"):
+		return _("Lern-Inhalte umsortiert.")
 
-			LOGGER.warning("Directory 'courses' does not exist, creating")
+	def delete_learning_content(self, course, learning_content_id):
+		"""Delete a step, and its learning content and variants if no other step uses them.
 
-			os.mkdir("courses")
+		The predecessor of the step is linked to its successor. Groups must
+		be empty to be deleted.
 
-		# Taken from https://stackoverflow.com/a/65974899
-		#
-		LOGGER.debug("Adding signal handler to close connections at application quit")
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
 
-		signalhandler = SignalHandler(cherrypy.engine)
-		
-		signalhandler.handlers['SIGTERM'] = self.close_sqlite_connections
-		signalhandler.handlers['SIGHUP'] = self.close_sqlite_connections
-		signalhandler.handlers['SIGQUIT'] = self.close_sqlite_connections
-		signalhandler.handlers['SIGINT'] = self.close_sqlite_connections
+		Return a message in case of success.
+		"""
 
-		signalhandler.subscribe()
+		pool = self._pool(course)
 
-		return
+		if pool is None:
 
-	def find_courses(self):
-		"""Search for courses, and return a dict mapping their titles to their IDs, and IDs to titles.
+			return ""
 
-		Found courses with a reqired MAJOR Luna version larger than the current one will be omitted.
-		"""
+		connection = pool.writer
 
-		# Yes, Unix-style paths are okay for glob
-		#
-		course_files = glob.glob("courses/*.sqlite")
+		with pool.write_lock:
 
-		if not course_files:
+			try:
+				connection.execute("BEGIN IMMEDIATE")
 
-			LOGGER.info("No sqlite course files in directory 'courses'")
+				connection.execute(queries.STEPS_INDEX)
 
-			return {}
+				step = connection.execute(queries.STEP, {"step": learning_content_id}).fetchone()
 
-		course_dict = {}
+				if step is None:
 
-		for course_file in course_files:
+					LOGGER.error("Step {} not found in course {}".format(learning_content_id, course))
 
-			connection = sqlite3.connect(course_file, check_same_thread = False)
+					connection.rollback()
 
-			cursor = connection.cursor()
+					return ""
 
-			cursor.execute("PRAGMA foreign_keys = ON")
+				if connection.execute(queries.HAS_CHILDREN, {"step": learning_content_id}).fetchone() is not None:
 
-			result = cursor.execute('SELECT identifier,title FROM course')
+					connection.rollback()
 
-			identifier, title = result.fetchone()
+					return _("Die Gruppe {} enthält noch Lern-Inhalte und kann nicht gelöscht werden.").format(learning_content_id)
 
-			# We're using type UUID, not string, here, since,
-			# in theory, one could use an UUID as a title,
-			# which would confuse the dict.
-			# Doing it that way, it's always mapping of
-			# UUID -> string, and string -> UUID.
-			#
-			identifier = uuid.UUID(identifier)
+				identifier, content_id, successor, parent = step
 
-			LOGGER.debug("Course found: '{}', identifier == {}".format(title, identifier))
+				variants = [row[0] for row in connection.execute(queries.STEP_VARIANT_FILES, {"step": learning_content_id})]
 
-			if identifier in self.connections:
+				connection.execute(queries.RELINK_PREDECESSOR, {"step": learning_content_id,
+																"parent": parent,
+																"successor": successor})
 
-				LOGGER.debug("Course {} already in connections, returning and closing temporary connection".format(identifier))
+				connection.execute(queries.DELETE_STEP, {"step": learning_content_id})
 
-				course_dict[identifier] = title
-				course_dict[title] = identifier
+				if content_id is not None and connection.execute(queries.CONTENT_IN_USE, {"content": content_id}).fetchone() is None:
 
-				connection.close()
+					connection.execute(queries.DELETE_CONTENT_MAPPING, {"content": content_id})
 
-			else:
+					connection.execute(queries.DELETE_CONTENT, {"content": content_id})
 
-				self.connections[identifier] = (connection, threading.Lock())
+					for variant in variants:
 
-				LOGGER.debug("Checking course {} for compatibility".format(identifier))
+						connection.execute(queries.DELETE_UNMAPPED_VARIANT, {"variant": variant})
 
-				# String is "Luna LMS MAJOR.MINOR.PATCH"
-				#
-				required_version = self.get_course_metadata(identifier)["requires"].split("Luna LMS ")[1]
+				connection.commit()
 
-				if int(required_version.split(".")[0]) > int(VERSION.split(".")[0]):
+			except sqlite3.Error as error:
 
-					msg = "Can not use found course {} ('{}'): course requires Luna LMS version {}, but the running version is {}"
+				connection.rollback()
 
-					LOGGER.warning(msg.format(identifier,
-												title,
-												required_version,
-												VERSION))
+				LOGGER.error("Could not delete step {} from {}: {}".format(learning_content_id, pool.path, error))
 
-					del self.connections[identifier]
+				return ""
 
-				else:
-					course_dict[identifier] = title
-					course_dict[title] = identifier
+		self.bump_revision(course)
 
-		return course_dict
+		return _("Lern-Inhalt {} gelöscht.").format(learning_content_id)
 
-	def get_course_metadata(self, course):
-		"""Return the metadata of the course as a dict.
+	def delete_variant(self, course, learning_content_id, variant_id):
+		"""Remove the variant with the identifier variant_id, or all files of the directory variant variant_id, from the learning content of a step.
+
+		Variants no other learning content uses are deleted.
 
 		course can be an identifier or the course title. An identifier is
 		recommended, since titles may not be unique.
 
-		Example:
-		
-		{
-			"identifier": "e0f59465-f984-45ef-9b3d-2cf29e9edcd8",
-			"title": "Example Title",
-			"description": "Example description.",
-			"relation": "",
-			"created": "2023-08-28",
-			"modified": "2023-08-28",
-			"dateAccepted": "",
-			"issued": "",
-			"contributor": "Jane",
-			"requires": "Luna LMS 1.0.0",
-		}
+		Return a message in case of success.
 		"""
 
-		meta_data = {}
+		pool = self._pool(course)
 
-		if course.__class__ is not uuid.UUID:
+		if pool is None:
 
-			LOGGER.error("Only UUIDs are currently supported as a course identifier, received class is {}".format(course.__class__))
+			return ""
 
-			return meta_data
+		connection = pool.writer
 
-		if course not in self.connections.keys():
+		with pool.write_lock:
 
-			self.find_courses()
+			try:
+				connection.execute("BEGIN IMMEDIATE")
 
-			if course not in self.connections.keys():
+				result = connection.execute(queries.STEP_CONTENT, {"step": learning_content_id}).fetchone()
 
-				LOGGER.error("Course id {} not found in available courses".format(course))
+				variants = [identifier
+							for identifier, filename, directory, file_format
+							in connection.execute(queries.STEP_VARIANT_FILES, {"step": learning_content_id})
+							if variant_id in (identifier, directory)]
 
-				return meta_data
+				if result is None or not variants:
 
-		cursor = self.connections[course][0].cursor()
+					connection.rollback()
 
-		keys = ["title",
-				"description",
-				"relation",
-				"created",
-				"modified",
-				"dateAccepted",
-				"issued",
-				"contributor",
-				"requires"]
+					return ""
 
-		result = cursor.execute('SELECT {} FROM course;'.format(",".join(keys)))
+				for variant in variants:
 
-		result = list(result.fetchone())
+					connection.execute(queries.DELETE_MAPPING, {"content": result[0], "variant": variant})
 
-		for key in keys:
+					connection.execute(queries.DELETE_UNMAPPED_VARIANT, {"variant": variant})
 
-			meta_data[key] = result.pop(0)
+				connection.commit()
 
-		return meta_data
+			except sqlite3.Error as error:
 
-	def get_html(self, course, learning_content_id):
-		"""Return the content of the first HTML file found in the learning content, or an empty string.
+				connection.rollback()
+
+				LOGGER.error("Could not delete variant {} from {}: {}".format(variant_id, pool.path, error))
+
+				return ""
+
+		self.bump_revision(course)
+
+		return _("Variante {} gelöscht.").format(variant_id)
+
+	def write_variant(self, course, learning_content_id, content, filename):
+		"""Write a variant consisting of a single or multiple files into the learning content of a step.
+
+		content is a str of HTML, an upload with the attributes file and
+		content_type, or a list of uploads for a directory. filename is
+		the name of the file, or a list of the names of the uploaded
+		files, each prefixed by the directory name.
+
+		Uploads are streamed into the database in chunks of
+		UPLOAD_CHUNK_SIZE bytes, so they need not fit into memory. The
+		SHA-256 hex digest of each file is computed along the way, and
+		stored in the column hash. All files of a directory are written in
+		a single transaction.
+
+		Return the MIME type of the last file written, or an empty string
+		on failure.
 
 		course can be an identifier or the course title. An identifier is
 		recommended, since titles may not be unique.
 		"""
 
-		content = ""
+		pool = self._pool(course)
 
-		if course.__class__ is not uuid.UUID:
+		if pool is None:
 
-			LOGGER.error("Only UUIDs are currently supported as a course identifier, received class is {}".format(course.__class__))
+			return ""
 
-			return content
+		LOGGER.info("Creating variant with filename(s) '{}'".format(filename))
 
-		# Better check this before we pass unsafe input to a SQL query.
+		# A list of tuples (filename, isPartOf, format, source), where
+		# source is a str or a file object
 		#
-		if len(learning_content_id) != 6 or not learning_content_id.isalnum():
+		files = []
 
-			LOGGER.error("Malformed identifier: '{}'".format(learning_content_id))
+		if content.__class__ == str:
 
-			return content
+			# Verbatim HTML sent via form.
+			#
+			files.append((filename, None, "text/html", content))
 
-		if course not in self.connections.keys():
+		elif filename.__class__ == list:
 
-			self.find_courses()
+			# Uploaded multiple files in a directory. Filenames should be
+			# directory + filename .
+			#
+			directory = os.path.split(filename[0])[0]
 
-			if course not in self.connections.keys():
+			for upload in content:
 
-				LOGGER.error("Course id {} not found in available courses".format(course))
+				files.append((os.path.basename(upload.filename), directory, str(upload.content_type), upload.file))
 
-				return result
+		else:
+			files.append((filename, None, str(content.content_type), content.file))
 
-		cursor = self.connections[course][0].cursor()
+		connection = pool.writer
 
-		query = '''SELECT variants.data from
-						variants,
-						mapping,
-						steps
-			   		WHERE
-						steps.identifier = "{}"
-						and
-						steps.content_id = mapping.content_id
-						and
-						mapping.variant_id = variants.identifier
-						and
-						variants.format = "text/html"'''
+		file_format = ""
 
-		result = cursor.execute(query.format(learning_content_id))
+		with pool.write_lock:
 
-		result = result.fetchone()
+			try:
+				connection.execute("BEGIN IMMEDIATE")
 
-		if result:
+				result = connection.execute(queries.STEP_CONTENT, {"step": learning_content_id}).fetchone()
 
-			content = result[0]
+				if result is None or result[0] is None:
 
-		return content
+					LOGGER.error("Step {} not found in course {}, or it has no learning content".format(learning_content_id, course))
 
-	def get_learning_contents_ordered(self, course):
-		"""Return a nested OrderedDict of learning content identifiers and titles.
+					connection.rollback()
+
+					return ""
+
+				content_id = result[0]
+
+				if "hash" not in [row[0] for row in connection.execute(queries.VARIANT_COLUMNS)]:
+
+					LOGGER.info("Adding column 'hash' to the variants table in {}".format(pool.path))
+
+					connection.execute(queries.ADD_VARIANT_HASH)
+
+				for name, directory, file_format, source in files:
+
+					identifier = new_identifier(connection, queries.VARIANT_IDENTIFIER_EXISTS)
+
+					digest = hashlib.sha256()
+
+					if source.__class__ == str:
+
+						digest.update(bytes(source, encoding = "utf-8"))
+
+						connection.execute(queries.INSERT_VARIANT, {"identifier": identifier,
+																	"filename": name,
+																	"isPartOf": directory,
+																	"data": source,
+																	"format": file_format,
+																	"hash": digest.hexdigest()})
+
+					elif hasattr(connection, "blobopen"):
+
+						size = source.seek(0, os.SEEK_END)
+
+						source.seek(0)
+
+						cursor = connection.execute(queries.INSERT_VARIANT_ZEROBLOB, {"identifier": identifier,
+																						"filename": name,
+																						"isPartOf": directory,
+																						"size": size,
+																						"format": file_format})
+
+						write_blob(connection, cursor.lastrowid, source, size, digest)
+
+						connection.execute(queries.SET_VARIANT_HASH, {"key": cursor.lastrowid,
+																		"hash": digest.hexdigest()})
+
+					else:
+						# Without incremental blob I/O, the file is read
+						# as a whole.
+						#
+						data = source.read()
+
+						digest.update(data)
+
+						connection.execute(queries.INSERT_VARIANT, {"identifier": identifier,
+																	"filename": name,
+																	"isPartOf": directory,
+																	"data": data,
+																	"format": file_format,
+																	"hash": digest.hexdigest()})
+
+					connection.execute(queries.INSERT_MAPPING, {"content": content_id, "variant": identifier})
+
+					LOGGER.debug("Wrote variant {} '{}' ({}), SHA-256 {}".format(identifier, name, file_format, digest.hexdigest()))
+
+				connection.commit()
+
+			except (sqlite3.Error, OSError, ValueError) as error:
+
+				connection.rollback()
+
+				LOGGER.error("Could not write variant '{}' to {}: {}".format(filename, pool.path, error))
+
+				return ""
+
+		self.bump_revision(course)
+
+		LOGGER.info("File(s) written.")
+
+		return file_format
+
+	def get_cached_item(self, course, path):
+		"""Return an item from the course's cache as a dict.
 
 		course can be an identifier or the course title. An identifier is
 		recommended, since titles may not be unique.
+
+		Example:
+		
+		{
+			"path": "square.svg",
+			"data": bytes('<?xml version="1.0" encoding="UTF-8" standalone="no"?><svg width="512" height="512" viewBox="0 0 135.46666 135.46667" version="1.1" id="svg5" xmlns="http://www.w3.org/2000/svg" xmlns:svg="http://www.w3.org/2000/svg"><defs id="defs2" /><g id="layer1"><rect style="fill:#ba2bcd;fill-opacity:1;stroke:none;stroke-width:0.187088;stroke-linecap:square;stroke-linejoin:round" id="rect286" width="95.789398" height="95.789398" x="-47.894699" y="47.894699" transform="rotate(-45)" /></g></svg>', encoding = "utf-8"),
+			"format": "image/svg+xml",
+			"description": "A violet square, balancing on a corner."
+		}
 		"""
 
-		result = collections.OrderedDict()
+		item = {}
 
 		if course.__class__ is not uuid.UUID:
 
 			LOGGER.error("Only UUIDs are currently supported as a course identifier, received class is {}".format(course.__class__))
 
-			return result
+			return item
 
 		if course not in self.connections.keys():
 
-			self.find_courses()
+			self.check_courses_directory()
 
 			if course not in self.connections.keys():
 
 				LOGGER.error("Course id {} not found in available courses".format(course))
 
-				return result
-
-		cursor = self.connections[course][0].cursor()
+				return item
 
-		# Build a list of all steps that are groups,
-		# i.e. that are parent to other steps.
+		cursor = self.connections[course].read().cursor()
 
-		all_parents = []
+		result = cursor.execute(queries.CACHED_ITEM, {"path": path})
 
-		command = 'SELECT parent FROM steps WHERE parent is not NULL'
+		result = result.fetchone()
 
-		for row in cursor.execute(command):
+		if result:
 
-			if row not in all_parents:
+			item.update(zip(queries.CACHED_ITEM_KEYS, result))
 
-				all_parents.append(row[0])
+			# Make sure data always returns bytes
+			#
+			if item["data"].__class__ == str:
 
-		# At the start, there is no parent
-		#
-		current_parent = None
+				item["data"] = bytes(item["data"], encoding = "utf-8")
 
-		# Start level is 1
-		#
-		current_level = 1
+		return item
 
-		# Consider all steps of the current group.
-		# This will recurse into subgroups as necessary.
-		#
-		result.update(self.parse_group(current_level,
-								current_parent,
-								cursor,
-								all_parents))
+	def get_cached_item_metadata(self, course, path):
+		"""Return the metadata of an item in the course's cache as a dict, without reading its data.
 
-		LOGGER.debug("All elements processed")
+		The dict has the keys "path", "format", "description", "size",
+		the size of the data in bytes, "hash", "modified" and
+		"encodings", like the dict returned by get_cached_item_stream() .
+		It is empty if there is no such item.
 
-		return result
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
 
-	def parse_group(self, current_level, current_parent, cursor, all_parents):
-		"""Scan the current group of learning contents, build output, and recurse into subgroups.
+		Example:
 
-		This method is meant to be called from build_steps().
+		{
+			"path": "square.svg",
+			"format": "image/svg+xml",
+			"description": "A violet square, balancing on a corner.",
+			"size": 485,
+			"hash": "d5d7bc148e05c84e2ad6a5ea63eb19bb8a5d9b7dc96125d5395c570b6bf97c0b",
+			"modified": 1792264334,
+			"encodings": {"gzip": 315}
+		}
 		"""
 
-		msg = "parse_group(current_level = {}, current_parent = {}, cursor = {}, all_parents = {})"
+		item = {}
 
-		LOGGER.debug(msg.format(current_level,
-								current_parent,
-								cursor.__class__,
-								all_parents))
+		pool = self._pool(course)
 
-		result = collections.OrderedDict()
+		if pool is None:
 
-		matching_elements = {}
+			return item
 
-		condition = 'is NULL'
+		query = queries.CACHED_ITEM_METADATA
 
-		if current_parent is not None:
+		if course not in self.cache_validators:
 
-			condition = '= "{}"'.format(current_parent)
+			query = queries.CACHED_ITEM_METADATA_WITHOUT_VALIDATORS
 
-		command = 'SELECT identifier,title,successor FROM steps WHERE parent ' + condition
+		result = pool.read().execute(query, {"path": path}).fetchone()
 
-		for row in cursor.execute(command):
+		if not result:
 
-			matching_elements[row[0]] = {"title": row[1],
-											"successor": row[2],
-											"group": row[0] in all_parents}
+			return item
 
-		LOGGER.debug("Found {} matching elements at level {}".format(len(matching_elements), current_level))
+		item["path"], item["format"], item["description"], size, item["hash"], item["modified"], gzip_size = result
 
-		# Find the element in the current group that is not a successor of any other
-		# element, and use it as first element
+		item["size"] = size or 0
 
-		successors = [value["successor"]
-						for value in matching_elements.values()
-						if value["successor"] is not None]
+		item["encodings"] = {}
 
-		first_element = None
+		if gzip_size is not None:
 
-		for identifier in matching_elements.keys():
+			item["encodings"]["gzip"] = gzip_size
 
-			if identifier not in successors:
+		return item
 
-					first_element = identifier
+	def get_cached_item_stream(self, course, path, chunk_size = ASSET_CHUNK_SIZE, start = 0, stop = None, encoding = None):
+		"""Return an item from the course's cache as a dict, with the data as an iterator over chunks of bytes.
 
-		if first_element:
+		The dict is like the one returned by get_cached_item(), but "data"
+		is replaced by "size", the size of the data in bytes, and
+		"chunks", an iterator yielding the data in chunks of at most
+		chunk_size bytes. Blob data is read incrementally from the
+		database as the iterator is consumed, so memory use does not
+		depend on the size of the item, and nothing is read if the
+		iterator is never started.
 
-			msg = "Element {} is not successor of any other element, using as start"
+		"hash" is the SHA-256 hex digest of the data, and "modified" the
+		time of its last change in seconds since the epoch. Both are None
+		if not known.
 
-			LOGGER.debug(msg.format(first_element))
+		If start or stop are given, "chunks" only yields the bytes
+		data[start:stop], and only these are read from the database.
+		"size" is always the size of the whole data.
 
-		else:
+		"encodings" is a dict mapping the content codings the item is
+		available in besides the identity, currently at most "gzip", to
+		the size of the data in that coding. If encoding is one of them,
+		"chunks" and "size" refer to the data in that coding instead,
+		start and stop are ignored, and "encoding" is set to it.
+		Otherwise "encoding" is None.
 
-			raise Exception("No starting element found at level {}".format(current_level))
+		The iterator must be consumed in the calling thread.
 
-		# Build a ordered list of successors
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
 
-		identifiers_ordered = []
+		item = {}
 
-		current_identifier = first_element
+		pool = self._pool(course)
 
-		current_successor = "dummy"
+		if pool is None:
 
-		while current_successor is not None:
+			return item
 
-			current_successor = matching_elements[current_identifier]["successor"]
+		connection = pool.read()
 
-			identifiers_ordered.append(current_identifier)
+		query = queries.CACHED_ITEM_INFO
 
-			current_identifier = matching_elements[current_identifier]["successor"]
+		if course not in self.cache_validators:
 
-		count = 1
+			query = queries.CACHED_ITEM_INFO_WITHOUT_VALIDATORS
 
-		# For each element of the ordered list of successors:
-		#
-		for identifier in identifiers_ordered:
+		result = connection.execute(query, {"path": path}).fetchone()
 
-			msg = "Adding element {} (group == {}) to result"
+		if not result:
 
-			LOGGER.debug(msg.format(identifier, matching_elements[identifier]["group"]))
+			return item
 
-			# Add the element to the result
-			#
-			key = IdTitle(identifier, matching_elements[identifier]["title"])
+		key, item["path"], item["format"], item["description"], storage_class, size, item["hash"], item["modified"], gzip_size = result
 
-			result[key] = collections.OrderedDict()
+		item["encodings"] = {}
 
-			# If the element is a group:
-			#
-			if matching_elements[identifier]["group"]:
+		item["encoding"] = None
 
-				LOGGER.debug("Element {} is a group, starting recursion".format(identifier))
+		if gzip_size is not None:
 
-				# Increase heirarchy depth
-				#
-				current_level += 1
+			item["encodings"]["gzip"] = gzip_size
 
-				old_parent = current_parent
+		if encoding == "gzip" and gzip_size is not None:
 
-				# Set the current parent group to the current element
-				#
-				current_parent = identifier
+			item["encoding"] = "gzip"
 
-				# Recurse
-				#
-				result[key].update(self.parse_group(current_level,
-										current_parent,
-										cursor,
-										all_parents))
+			item["size"] = gzip_size
 
-				# Restore the former parent
-				#
-				current_parent = old_parent
+			if hasattr(connection, "blobopen"):
 
-				# Decrease heirarchy depth to former depth
-				#
-				current_level -= 1
+				item["chunks"] = read_blob(connection, key, chunk_size, 0, gzip_size, column = "gzip")
 
-				msg = "Recursion done, returning to parent {} at level {}"
+			else:
+				item["chunks"] = iter([connection.execute(queries.CACHED_ITEM_GZIP, {"key": key}).fetchone()[0]])
 
-				LOGGER.debug(msg.format(current_parent, current_level))
+		elif storage_class == "blob" and hasattr(connection, "blobopen"):
 
-			count += 1
+			item["size"] = size
 
-		LOGGER.debug("Returning:\n{}".format(result).replace("), ", "),\n"))
+			item["chunks"] = read_blob(connection, key, chunk_size, start, min(size, stop or size))
 
-		return result
+		elif storage_class == "blob":
 
-	def write_course(self, title):
-		"""Create a new SQLite database representing the course.
-		Return a message indicating success or failure.
-		"""
-		# !!!
+			item["size"] = size
 
-		message = ""
+			item["chunks"] = read_blob_ranges(connection, key, chunk_size, start, min(size, stop or size))
 
-		if not os.path.isdir("Kurse"):
+		else:
 
-			LOGGER.warning("Directory 'Kurse' does not exist, creating")
+			# Text is stored as characters, not bytes, so it can not be
+			# read in byte ranges. It is read and encoded as a whole.
+			#
+			data = connection.execute(queries.CACHED_ITEM_DATA, {"key": key}).fetchone()[0] or b""
 
-			os.mkdir("Kurse")
+			if data.__class__ == str:
 
-			LOGGER.info("Copying static CSS to directory 'Kurse'")
+				data = bytes(data, encoding = "utf-8")
 
-			shutil.copyfile("w3.css", os.path.join("Kurse", "w3.css"))
+			item["size"] = len(data)
 
-		if os.path.isdir(os.path.join("Kurse", title)):
+			item["chunks"] = iter([data[start:stop]])
 
-			LOGGER.warning("course already exists.")
-			message = _("Diesen Kurs gibt es schon.")
+		return item
 
-		else:
-			LOGGER.info("Creating directory structure and files for course '{}'".format(title))
+	def get_cached_paths(self, course):
+		"""Return a list of the paths of all items in the course's cache.
 
-			os.mkdir(os.path.join("Kurse", title))
-			os.mkdir(os.path.join("Kurse", title, "Lern-Inhalte"))
-			os.mkdir(os.path.join("Kurse", title, "Lern-Pfade"))
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
 
-			# Note that this is still not thread or multi process safe, as
-			# it ignores the current state of the file on disk or in
-			# parallel threads / processes.
-			#
-			with WRITE_LOCK:
-
-				with open(os.path.join("Kurse", title, title + ".json"),
-							mode="wt",
-							encoding="utf8") as f:
-
-					# Note that {{ and }} are escapes for
-					# literal { and } in format strings.
-					#
-					# TODO: This only checks for duplicate names, but not for duplicate UUIDs, as the other functions do
-					#
-					f.write("""{{
-"identifier": "{}",
-"type": "Kurs",
-"title": "{}",
-"Lern-Inhalte": []
-}}
-""".format(str(uuid.uuid4()), title))
-
-			LOGGER.info("Directory structure created.")
-			message = _("Kurs angelegt.")
-		
-		return message
+		paths = []
 
-	def get_cached_item(self, course, path):
-		"""Return an item from the course's cache as a dict.
+		pool = self._pool(course)
+
+		if pool is None:
+
+			return paths
+
+		cursor = pool.read().cursor()
+
+		for row in cursor.execute(queries.CACHED_PATHS):
+
+			paths.append(row[0])
+
+		return paths
+
+	def get_cached_hashes(self, course):
+		"""Return a dict mapping the paths of the items in the course's cache to the SHA-256 hex digests of their data.
+
+		Items without a known hash are left out.
 
 		course can be an identifier or the course title. An identifier is
 		recommended, since titles may not be unique.
+		"""
 
-		Example:
-		
-		{
-			"path": "square.svg",
-			"data": bytes('<?xml version="1.0" encoding="UTF-8" standalone="no"?><svg width="512" height="512" viewBox="0 0 135.46666 135.46667" version="1.1" id="svg5" xmlns="http://www.w3.org/2000/svg" xmlns:svg="http://www.w3.org/2000/svg"><defs id="defs2" /><g id="layer1"><rect style="fill:#ba2bcd;fill-opacity:1;stroke:none;stroke-width:0.187088;stroke-linecap:square;stroke-linejoin:round" id="rect286" width="95.789398" height="95.789398" x="-47.894699" y="47.894699" transform="rotate(-45)" /></g></svg>', encoding = "utf-8"),
-			"format": "image/svg+xml",
-			"description": "A violet square, balancing on a corner."
-		}
+		hashes = {}
+
+		pool = self._pool(course)
+
+		if pool is None:
+
+			return hashes
+
+		if course not in self.cache_validators:
+
+			return hashes
+
+		cursor = pool.read().cursor()
+
+		hashes.update(cursor.execute(queries.CACHED_HASHES))
+
+		return hashes
+
+	def get_step_fingerprints(self, course):
+		"""Return a tuple (structure, steps) of hashes describing the stored state of a course.
+
+		structure is a hex digest that changes whenever the course title or
+		the order, nesting or titles of its steps change. steps is a dict
+		mapping step identifiers to a hex digest of the step and its
+		variants. The digests use the stored hashes of the variants, and
+		only variants without one are read.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
 		"""
 
-		item = {}
+		steps = {}
 
-		if course.__class__ is not uuid.UUID:
+		pool = self._pool(course)
 
-			LOGGER.error("Only UUIDs are currently supported as a course identifier, received class is {}".format(course.__class__))
+		if pool is None:
 
-			return item
+			return ("", steps)
 
-		if course not in self.connections.keys():
+		cursor = pool.read().cursor()
 
-			self.find_courses()
+		structure = hashlib.sha256()
 
-			if course not in self.connections.keys():
+		structure.update(repr(cursor.execute(queries.COURSE_TITLE).fetchone()).encode("utf-8"))
 
-				LOGGER.error("Course id {} not found in available courses".format(course))
+		for row in cursor.execute(queries.STEPS_BY_IDENTIFIER):
 
-				return meta_data
+			structure.update(repr(row).encode("utf-8"))
 
-		cursor = self.connections[course][0].cursor()
+		hashes = {}
 
-		keys = ["path",
-				"data",
-				"format",
-				"description"]
+		query = queries.STEP_VARIANTS
 
-		result = cursor.execute('SELECT {} FROM cache WHERE path = "{}";'.format(",".join(keys), path))
+		if "hash" not in [row[0] for row in cursor.execute(queries.VARIANT_COLUMNS)]:
 
-		result = result.fetchone()
+			query = queries.STEP_VARIANTS_WITHOUT_HASH
 
-		if result:
+		for row in cursor.execute(query).fetchall():
 
-			result = list(result)
+			if row[0] not in hashes:
 
-			for key in keys:
+				hashes[row[0]] = hashlib.sha256()
 
-				item[key] = result.pop(0)
+			digest = row[-1]
 
-			# Make sure data always returns bytes
+			# Variants written before the column hash existed
 			#
-			if item["data"].__class__ == str:
+			if digest is None and row[2] is not None:
 
-				item["data"] = bytes(item["data"], encoding = "utf-8")
+				data = cursor.execute(queries.VARIANT_DATA, {"identifier": row[2]}).fetchone()[0] or b""
 
-		return item
+				if data.__class__ == str:
 
-	def close_sqlite_connections(self):
-		"""Close all connections present in SQLiteStorage.connections .
+					data = bytes(data, encoding = "utf-8")
+
+				digest = hashlib.sha256(data).hexdigest()
+
+			hashes[row[0]].update(repr(row[:-1] + (digest,)).encode("utf-8"))
+
+		for identifier, digest in hashes.items():
+
+			steps[identifier] = digest.hexdigest()
+
+		return (structure.hexdigest(), steps)
+
+	def get_diagnostics(self):
+		"""Return a dict describing the sqlite configuration, and the settings in effect for each course database.
 		"""
 
-		# Make a copy to be able to change the dict in the loop
-		#
-		identifiers = list(self.connections.keys())
+		courses = {}
 
-		for identifier in identifiers:
+		for identifier, pool in list(self.connections.items()):
 
-			LOGGER.debug("Acquiring Lock for {}".format(identifier))
+			courses[str(identifier)] = pool.diagnostics()
 
-			self.connections[identifier][1].acquire()
-			
-			LOGGER.info("Committing, closing and removing sqlite connection for {}".format(identifier))
+			courses[str(identifier)]["title"] = self.courses.get(identifier, "")
 
-			# close() does not implicitly commit, so we commit
-			# just to be sure.
-			#
-			self.connections[identifier][0].commit()
+		return {"storage": self.__class__.__name__,
+				"sqlite_version": sqlite3.sqlite_version,
+				"profile": self.profile,
+				"pragmas": SQLITE_PROFILES[self.profile],
+				"courses": courses}
+
+	def _close_connection(self, identifier):
+		"""Close and remove the connection pool for the course identified by identifier.
+		"""
+
+		LOGGER.info("Committing, closing and removing sqlite connections for {}".format(identifier))
+
+		self.connections.pop(identifier).close()
+
+		return
+
+	def close_sqlite_connections(self):
+		"""Close all connections present in SQLiteStorage.connections, and exit the CherryPy engine.
 
-			self.connections[identifier][0].close()
+		This is the signal handler installed by start().
+		"""
 
-			del self.connections[identifier]
+		self.stop()
 
 		# The handler replaces the original exit routine, so we have to
 		# exit manually.
@@ -21,11 +21,28 @@
 
 
 from luna_lms import LOGGER
+from luna_lms.storage.navigation_index import NavigationIndex
 
 class Storage:
 	"""Prototype class to handle all storage. Should be subclassed by implementations.
 	"""
 
+	def start(self):
+		"""Acquire the resources of the storage, like files, connections and watchers.
+
+		Creating a storage instance has no side effects, so this must be
+		called before use. Classes that need no resources do not need to
+		override this.
+		"""
+
+		return
+
+	def stop(self):
+		"""Release the resources acquired by start() .
+		"""
+
+		return
+
 	def find_courses(self):
 		"""Search for courses, and return a dict mapping their titles to their IDs, and IDs to titles.
 		"""
@@ -34,6 +51,18 @@ class Storage:
 
 		return {}
 
+	def get_course_catalog(self):
+		"""Return a list of summaries of all available courses, sorted by title.
+
+		Each summary is a dict with the keys "identifier", "title",
+		"description", "relation" and "alt", the path and the description
+		of the cover image.
+		"""
+
+		LOGGER.warning("Method is not implemented in this class, no action taken")
+
+		return []
+
 	def get_course_metadata(self, course):
 		"""Return the metadata of the course as a dict.
 
@@ -95,7 +124,7 @@ class Storage:
 
 		return ("", "")
 
-	def get_course_titles():
+	def get_course_titles(self):
 		"""Return a list of titles of existing courses.
 		"""
 
@@ -125,6 +154,54 @@ class Storage:
 
 		return []
 
+	def get_navigation_index(self, course):
+		"""Return a NavigationIndex for the ordered learning contents of a course.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		LOGGER.warning("Method is not implemented in this class, no action taken")
+
+		return NavigationIndex()
+
+	def get_revision(self, course):
+		"""Return the revision of the course, an integer that changes whenever the course data changes.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		LOGGER.warning("Method is not implemented in this class, no action taken")
+
+		return 0
+
+	def get_validator(self, course):
+		"""Return a tuple (validator, modified) describing the stored state of the course, with the same values in all processes.
+
+		validator is a string that changes whenever the course data
+		changes, and modified the time of the last change in seconds since
+		the epoch, or None if it is not known.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		LOGGER.warning("Method is not implemented in this class, no action taken")
+
+		return ("", None)
+
+	def get_revision_time(self, course):
+		"""Return the time of the last revision of the course in seconds since the epoch, or None if it is not known.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		LOGGER.warning("Method is not implemented in this class, no action taken")
+
+		return None
+
 	def get_learning_contents_titles(self, course):
 		"""Return a dictionary mapping learning contents identifiers to their titles.
 
@@ -250,6 +327,19 @@ class Storage:
 
 		return ""
 
+	def move_learning_content(self, course, learning_content_id, successor_id = ""):
+		"""Move a learning content directly before the learning content successor_id, or to the end if successor_id is empty.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+
+		Return a message indicating success or failure.
+		"""
+
+		LOGGER.warning("Method is not implemented in this class, no action taken")
+
+		return ""
+
 	def write_variant(self, course, learning_content_id, content, filename):
 		"""Write a variant consisting of a single or multiple files, and create the according meta files.
 
@@ -282,3 +372,90 @@ class Storage:
 		LOGGER.warning("Method is not implemented in this class, no action taken")
 
 		return {}
+
+	def get_cached_item_metadata(self, course, path):
+		"""Return the metadata of an item in the course's cache as a dict, without reading its data.
+
+		The dict has the keys "path", "format", "description", "size",
+		"hash", "modified" and "encodings", see get_cached_item_stream() .
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		LOGGER.warning("Method is not implemented in this class, no action taken")
+
+		return {}
+
+	def get_cached_item_stream(self, course, path, chunk_size = 65536, start = 0, stop = None, encoding = None):
+		"""Return an item from the course's cache as a dict, with the data as an iterator over chunks of bytes.
+
+		The dict is like the one returned by get_cached_item(), but "data"
+		is replaced by "size", the size of the data in bytes, and
+		"chunks", an iterator yielding the data in chunks of at most
+		chunk_size bytes. If start or stop are given, "chunks" only
+		yields the bytes data[start:stop]. "hash" is the SHA-256 hex
+		digest of the data, and "modified" the time of its last change in
+		seconds since the epoch. Both are None if not known.
+
+		"encodings" maps the content codings the item is stored in
+		besides the identity, like "gzip", to the size of the data in
+		that coding. If encoding is one of them,
+		"chunks" and "size" refer to the data in that coding, and
+		"encoding" is set to it.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		LOGGER.warning("Method is not implemented in this class, no action taken")
+
+		return {}
+
+	def get_cached_hashes(self, course):
+		"""Return a dict mapping the paths of the items in the course's cache to the SHA-256 hex digests of their data.
+
+		Items without a known hash are left out.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		LOGGER.warning("Method is not implemented in this class, no action taken")
+
+		return {}
+
+	def get_cached_paths(self, course):
+		"""Return a list of the paths of all items in the course's cache.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		LOGGER.warning("Method is not implemented in this class, no action taken")
+
+		return []
+
+	def get_step_fingerprints(self, course):
+		"""Return a tuple (structure, steps) of hashes describing the stored state of a course.
+
+		structure is a hex digest that changes whenever the course title or
+		the order, nesting or titles of its steps change. steps is a dict
+		mapping step identifiers to a hex digest of the step and its
+		variants.
+
+		course can be an identifier or the course title. An identifier is
+		recommended, since titles may not be unique.
+		"""
+
+		LOGGER.warning("Method is not implemented in this class, no action taken")
+
+		return ("", {})
+
+	def get_diagnostics(self):
+		"""Return a dict describing the configuration and state of the storage, for diagnostics.
+		"""
+
+		LOGGER.warning("Method is not implemented in this class, no action taken")
+
+		return {}
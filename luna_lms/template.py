@@ -0,0 +1,162 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import string
+
+
+class Template:
+	"""A page layout, compiled once into a list of constant chunks and named slots.
+
+	The source uses the syntax of str.format() with named fields only,
+	for example '<h1>{heading}</h1>'. {{ and }} are escapes for literal
+	{ and }. Format specifications and conversions are not supported.
+
+	Rendering fills the slots and joins all chunks once, instead of
+	building the page by repeated string concatenation.
+
+	Template.chunks
+		A list of strings. Slots are represented by None.
+
+	Template.slots
+		A list of tuples (position, name) for every slot in
+		Template.chunks .
+
+	Template.encoded
+		Template.chunks, with the constant chunks encoded as UTF-8 bytes
+		for streaming.
+	"""
+
+	def __init__(self, source):
+		"""Compile the template source.
+		"""
+
+		self.chunks = []
+
+		self.slots = []
+
+		for literal, name, format_spec, conversion in string.Formatter().parse(source):
+
+			if literal:
+
+				# Merge adjacent constant text into one chunk
+				#
+				if self.chunks and self.chunks[-1] is not None:
+
+					self.chunks[-1] += literal
+
+				else:
+					self.chunks.append(literal)
+
+			if name is not None:
+
+				if not name.isidentifier() or format_spec or conversion:
+
+					raise ValueError("Unsupported template field '{}'".format(name))
+
+				self.slots.append((len(self.chunks), name))
+
+				self.chunks.append(None)
+
+		self.encoded = [chunk.encode("utf-8") if chunk is not None else None for chunk in self.chunks]
+
+		return
+
+	def fill(self, values):
+		"""Return a list of all chunks, with the slots filled from the dict values.
+
+		A value may be a string, or a list of strings which is spliced
+		into the result, so that fragments need not be joined first.
+		"""
+
+		chunks = list(self.chunks)
+
+		for position, name in self.slots:
+
+			chunks[position] = values[name]
+
+		result = []
+
+		for chunk in chunks:
+
+			if chunk.__class__ == list:
+
+				result.extend(chunk)
+
+			else:
+				result.append(chunk)
+
+		return result
+
+	def render(self, **values):
+		"""Return the template as a string, with the slots filled from the keyword arguments.
+		"""
+
+		return "".join(self.fill(values))
+
+	def stream(self, values):
+		"""Yield the template as UTF-8 encoded bytes.
+
+		Slots are filled from the dict values. A value may also be a
+		callable without arguments, returning a string or a list of
+		strings. It is called only when its slot is reached, and all
+		text before it is yielded first, so that it can be sent while
+		the value is computed. Text between callables is yielded as one
+		chunk.
+		"""
+
+		slots = iter(self.slots)
+
+		pending = []
+
+		for chunk in self.encoded:
+
+			if chunk is not None:
+
+				pending.append(chunk)
+
+				continue
+
+			position, name = next(slots)
+
+			value = values[name]
+
+			if callable(value):
+
+				if pending:
+
+					yield b"".join(pending)
+
+					pending = []
+
+				value = value()
+
+			if value.__class__ == list:
+
+				value = "".join(value)
+
+			pending.append(value.encode("utf-8"))
+
+		if pending:
+
+			yield b"".join(pending)
+
+		return
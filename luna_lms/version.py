@@ -0,0 +1,97 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from luna_lms import VERSION
+import os.path
+import subprocess
+
+
+VERSION_STAMP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "version_stamp.txt")
+"""The file holding the version stamped at build time, see write_version_stamp().
+"""
+
+def fossil_version():
+	"""Return VERSION with the tag and checkout of the fossil repository in the working directory appended, or VERSION if fossil is not available.
+
+	This runs fossil in a subprocess, so it is meant for build time only.
+	"""
+
+	try:
+		fossil_status = subprocess.run(["fossil", "info"], capture_output = True, text = True, timeout = 10)
+
+		items = dict([line.split(":", maxsplit = 1)
+						for line in fossil_status.stdout.splitlines()
+						if line.find(":") > -1])
+
+		return VERSION + "+{}.{}".format(items["tags"].strip()[:3], items["checkout"].strip()[:6])
+
+	except (OSError, subprocess.SubprocessError, KeyError):
+
+		return VERSION
+
+def build_version():
+	"""Return the version stamped at build time, or VERSION if there is no stamp.
+
+	Only the stamp file is read, so this is cheap enough to be called at
+	import time.
+	"""
+
+	try:
+		with open(VERSION_STAMP, mode = "rt", encoding = "utf-8") as f:
+
+			version = f.read().strip()
+
+	except OSError:
+
+		return VERSION
+
+	# A stamp left over from an older release is ignored
+	#
+	if version.split("+")[0] != VERSION:
+
+		return VERSION
+
+	return version
+
+def write_version_stamp():
+	"""Determine the version with fossil_version(), and store it in VERSION_STAMP .
+	"""
+
+	version = fossil_version()
+
+	with open(VERSION_STAMP, mode = "wt", encoding = "utf-8") as f:
+
+		f.write(version + "\n")
+
+	return version
+
+def main():
+	"""Main function, for IDE convenience.
+	"""
+
+	print(write_version_stamp())
+
+	return
+
+if __name__ == "__main__":
+
+	main()
@@ -22,22 +22,33 @@ Florian Berger <florian.berger@posteo.de>
 
 from luna_lms import LOGGER
 from luna_lms import ADDITIONAL_CONFIG
-from luna_lms import VERSION
 from luna_lms import MODI
+from luna_lms import LANGUAGE
+from luna_lms import IMAGE_TYPES
+from luna_lms import check_title
 from luna_lms.storage import SQLiteStorage
+from luna_lms.page_cache import PageCache
+from luna_lms.page_sources import PageSources
+from luna_lms.version import build_version
+from luna_lms.template import Template
+from luna_lms.assets import AssetManifest, IMMUTABLE_CACHE_CONTROL, asset_url, bundle_css
+from luna_lms.compression import gzip_compressor, gzip_stream, STREAM_GZIP_LEVEL
+from luna_lms.storage.sqlite_storage import SQLITE_PROFILES
+from luna_lms.workers import run_workers, use_reuse_port_server
 import cherrypy
-import subprocess
+import cherrypy.lib.httputil
+import cherrypy.lib.cptools
+import cherrypy.lib.static
+import argparse
+import json
+import mimetypes
 import os.path
 import uuid
+import zlib
 
-try:
-	fossil_status = subprocess.run(["fossil", "info"], capture_output=True, text=True)
-	items = dict([line.split(":", maxsplit=1)
-				  for line in fossil_status.stdout.splitlines()
-				  if line.find(":") > -1])
-	VERSION += "+{}.{}".format(items["tags"].strip()[:3], items["checkout"].strip()[:6])
-except:
-	pass
+VERSION = build_version()
+"""The version shown in the page footer, including the fossil checkout if it has been stamped at build time.
+"""
 
 # L is letter #12, U is #21 in the alphabet.
 #
@@ -55,6 +66,10 @@ AUTORELOAD = True
 Should be disabled for production use.
 """
 
+PAGE_CACHE_SIZE = 32 * 1024 * 1024
+"""The maximum size of rendered course pages kept in memory, in bytes.
+"""
+
 CSS = '''
 /* "Bunny Fonts is an open-source, privacy-first web font platform designed to
 	put privacy back into the internet."
@@ -710,16 +725,25 @@ only screen and (                min-resolution: 2dppx)
 }
 '''
 """Additional CSS for all luna_lms HTML pages.
+
+It is sent as the generated stylesheet /static/luna.css, see
+luna_lms.assets.AssetManifest.add_generated() .
 """
 
-# Escape for format()
-#
-CSS = CSS.replace("{", "{{").replace("}", "}}")
+STYLESHEETS = ("w3.css", "custom.css", "luna.css")
+"""The stylesheets linked from every page, in order.
+"""
+
+CSS_BUNDLE = "luna-bundle.css"
+"""The name of the generated stylesheet combining all STYLESHEETS.
+"""
+
+STYLESHEET_LINK = '\t<link rel="stylesheet" href="/static/{}">\n'
+"""The HTML element linking a stylesheet in 'static'.
+"""
 
-# TODO: Make lang an option
-#
 HTML_HEAD = '''<!DOCTYPE html>
-<html lang="de">
+<html lang="''' + LANGUAGE + '''">
 <head>
 	<meta charset="utf-8"/>
 	<meta http-equiv="content-type" content="text/html; charset=UTF-8">
@@ -731,14 +755,12 @@ HTML_HEAD = '''<!DOCTYPE html>
 	<link rel="icon" href="/static/favicon.svg" type="image/svg+xml">
 	<link rel="apple-touch-icon" href="/static/apple-touch-favicon.png"><!-- 180×180 -->
 	<link rel="manifest" href="/static/manifest.webmanifest">
-	<link rel="stylesheet" href="/static/w3.css">
-	<link rel="stylesheet" href="/static/custom.css">
-	<style type="text/css">''' + CSS + '''
-	</style>
-</head>
+{stylesheets}</head>
 <body>
 '''
 """The general HTML head for all luna_lms pages, including the opening <body> tag.
+
+Fields: title, stylesheets.
 """
 
 HTML_HEADER = '''	<div id="gridcheck" class="w3-row-padding" style="margin:0rem 2.5rem;">
@@ -865,15 +887,219 @@ HTML_FOOT = '''	<footer class="w3-row-padding">
 """The general HTML footer for all luna_lms pages, including the closing <body> tag.
 """
 
+CONTENT_PAGE = Template(HTML_HEAD
+						+ HTML_HEADER
+						+ '<div class="w3-row-padding" style="margin:0rem 2.5rem;"><div class="w3-col m12 spacer" style="height:2.5rem;"></div></div>'
+						+ '<main class="w3-row-padding">'
+						+ '<div class="w3-col m3 spacer"></div>'
+						+ '<div class="w3-col m7 half-col-pad">'
+						+ '{content}'
+						+ '</div>'
+						+ '<div class="w3-col m2 spacer"></div>'
+						+ '</main>'
+						+ HTML_FOOT)
+"""Page template for static pages and the start page.
+
+Slots: title, stylesheets, logo_file, heading, content.
+"""
+
+START_BUTTONS = ('<a class="button" href="/courses"><div class="image_spacer"><img src="/static/course_start.svg" alt=""></div>{}</a>'.format(_("Kurs beginnen"))
+					+ '<a class="button" href="/continue"><div class="image_spacer"><img src="/static/course_continue.svg" alt=""></div>{}</a>'.format(_("Kurs fortsetzen"))
+					+ '<br>'
+					+ '<a class="button_inactive"><div class="image_spacer"><img src="/static/account_add.svg" alt=""></div>{}</a>'.format(_("Konto anlegen")))
+"""The buttons below the welcome text on the start page.
+"""
+
+COURSES_PAGE = Template(HTML_HEAD
+						+ HTML_HEADER
+						+ '<div class="w3-row-padding" style="margin:0rem 2.5rem;"><div class="w3-col m12 spacer" style="height:2.5rem;"></div></div>'
+						+ '<main class="w3-row-padding">'
+						+ '<div class="w3-col m3 spacer"></div>'
+						+ '<div class="w3-col m6 half-col-pad">'
+						+ '<form class="search inactive">'
+						+ '<input name="terms" type="text" value="{0}" title="{0}" disabled>'.format(_("Suche nach Kurs-Titeln, Schlagworten und mehr..."))
+						+ '<button type="submit" disabled><img src="/static/search-inactive.svg" alt="{}"></button>'.format(_("Suchen"))
+						+ '</form>'
+						+ '<div>'
+						+ '''	<select name="sort" class="inactive" disabled>
+		<option value="sort">{}</option>
+	</select>
+'''.format(_("Sortieren"))
+						+ '''	<select name="filter" class="inactive" disabled>
+		<option value="filter">{}</option>
+	</select>
+'''.format(_("Alle Filter"))
+						+ '</div>'
+						+ '{courses}'
+						+ '<a href="/" class="browse"><div class="image_spacer"><img src="/static/back.svg" alt=""></div>{}</a>'.format(_("Zurück zur Start-Seite"))
+						+ '</div>'
+						+ '<div class="w3-col m3 spacer"></div>'
+						+ '</main>'
+						+ HTML_FOOT)
+"""Page template for the course listing.
+
+Slots: title, stylesheets, logo_file, heading, courses.
+"""
+
+COURSE_LISTING = ('<div class="course_hover">'
+					+ '<a href="/courses/view/{course_id}">'
+					+ '<div class="course_listing">'
+					+ '<h2>{title}</h2>'
+					+ '<div class="w3-cell-row">'
+					+ '<div class="w3-cell w3-mobile">'
+					+ '<img src="/courses/{course_id}/{relation}" alt="{alt}">'
+					+ '</div>'
+					+ '<div class="w3-cell w3-mobile w3-container">'
+					+ '<p>{description}</p>'
+					+ '</div>'
+					+ '</div>'
+					+ '</div>'
+					+ '</a>'
+					+ '</div>')
+"""Format string for a single course in the course listing.
+"""
+
+VIEW_PAGE = Template(HTML_HEAD
+						+ HTML_HEADER
+						+ '<div class="w3-row-padding" style="margin:0rem 2.5rem;">'
+						+ '	<div class="w3-col m10 spacer"></div>'
+						+ '	<div class="w3-col m2" style="height:4.45rem;text-align:right;">'
+						+ '		<a class="rounded_hover_border" style="padding: 0.1rem 0.2rem;position:relative;top: 0.5rem;" href="#">'
+						+ '			<img src="/static/modes.svg" style="height:1rem;" alt="{}">'.format(_("Modus-Menü-Symbol"))
+						+ '		</a>'
+						+ '	</div>'
+						+ '</div>'
+						+ '<main class="w3-row-padding">'
+						+ '	<div class="w3-col m3">'
+						+ '	<nav class="course_navigation">'
+						+ '		<p>{course_title}</p>'
+						+ '		<div class="bookmark">'
+						+ '			<div class="w3-cell bookmark_icon">'
+						+ '				<div>'
+						+ '					<img src="/static/bookmark.svg" alt="">'
+						+ '				</div>'
+						+ '			</div>'
+						+ '			<div class="w3-cell bookmark_text">'
+						+ '{}:<br><strong>{}</strong>'.format(_("Mein Lese-Zeichen"), "DreiWortCode")
+						+ '</div>'
+						+ '		</div>'
+						+ '		<div class="nav_line">'
+						+ '			<div class="nav_line_offset">'
+						+ '{navigation}'
+						+ '			</div>'
+						+ '		</div>'
+						+ '	</nav>'
+						+ '	</div>'
+						+ '<article class="w3-col m7 half-col-pad">'
+						+ '{headings}'
+						+ '{content}'
+						+ '<div>'
+						+ '{browse}'
+						+ '</div>'
+						+ '</article>'
+						+ '<div class="w3-col m1 spacer"></div>'
+						+ '<div class="w3-col m1 spacer"></div>'
+						+ '</main>'
+						+ HTML_FOOT)
+"""Page template for the view of a learning content.
+
+Slots: title, stylesheets, logo_file, heading, course_title, navigation,
+headings,
+content, browse.
+"""
+
+NAVIGATION_ITEM = '<li{}><a href="/courses/view/{}/{}"><span>{}</span></a></li>'
+"""Format string for a single step in the course navigation.
+"""
+
+BROWSE_BACK = ('<div class="w3-cell w3-mobile" style="width:8.1rem;">'
+				+ '<a href="/courses/view/{{}}/{{}}" class="browse"><div class="image_spacer"><img src="/static/back.svg" alt=""></div>{}</a>'.format(_("Zurück"))
+				+ '</div>'
+				+ '<div class="w3-cell w3-mobile" style="width:6.25rem;">'
+				+ '</div>')
+"""Format string for the link to the previous learning content.
+"""
+
+BROWSE_FORWARD = ('<div class="w3-cell w3-mobile" style="width:8.1rem;">'
+					+ '<a href="/courses/view/{{}}/{{}}" class="browse" style=""><div class="image_spacer"><img src="/static/forward.svg" alt=""></div>{}</a>'.format(_("Weiter"))
+					+ '</div>')
+"""Format string for the link to the next learning content.
+"""
+
+REDAKTION_PAGE = Template(HTML_HEAD
+							+ '<div class="redaktionssystem">'
+							+ '<header class="w3-content">'
+							+ '<h1 class="w3-padding w3-khaki">{heading}</h1>'
+							+ '<nav class="w3-padding">'
+							+ '{navigation}'
+							+ '</nav>'
+							+ '</header>'
+							+ '<main class="w3-content">'
+							+ '{message}'
+							+ '{content}'
+							+ '<!-- Ende redaktionssystem --></div>'
+							+ '</main>'
+							+ HTML_FOOT)
+"""Page template for the content management frontend.
+
+Slots: title, stylesheets, heading, navigation, message, content.
+"""
+
+REDAKTION_MOVE_FORM = '''<form action="/redaktion/{}/{}"
+	method="post"
+	style="padding: 0px;background: none;border-radius: 0px;display:inline;">
+		<input type="hidden" name="_method" value="PUT">
+		<input type="hidden" name="successor" value="{}">
+		<input type="submit" value="{}">
+</form>'''
+"""Format string for a button in the content management frontend which moves a learning content directly before another one.
+
+Fields: course identifier, identifier of the learning content to move, identifier of its new successor, button label.
+"""
+
 class WebApp:
 	"""Web application main class, suitable as cherrypy root.
 	"""
 
-	def __init__(self):
+	def __init__(self, sqlite_profile = None, asset_urls = True, css_bundle = False):
 		"""Initialise WebApp.
+
+		sqlite_profile is the name of a tuning profile for the course
+		databases, see luna_lms.storage.sqlite_storage.SQLITE_PROFILES .
+
+		If asset_urls is True, pages refer to files in 'static' and to
+		cached items by content-addressed URLs, see
+		luna_lms.assets.AssetManifest .
+
+		If css_bundle is True, pages link a single minified stylesheet
+		made from all STYLESHEETS, instead of each of them.
+
+		Courses, assets and pages are read by start().
 		"""
 
-		self.storage = SQLiteStorage()
+		self.storage = SQLiteStorage(profile = sqlite_profile)
+
+		self.assets = AssetManifest(self.storage, enabled = asset_urls)
+
+		self.assets.add_generated("luna.css", "text/css", lambda: CSS)
+
+		stylesheets = STYLESHEETS
+
+		if css_bundle:
+
+			self.assets.add_generated(CSS_BUNDLE, "text/css", self._css_bundle)
+
+			stylesheets = (CSS_BUNDLE,)
+
+		self.stylesheets = "".join([STYLESHEET_LINK.format(name) for name in stylesheets])
+
+		self.page_cache = PageCache(PAGE_CACHE_SIZE)
+
+		# ETags of pages are built from values all processes share, so a
+		# validator sent by one worker is accepted by every other. This
+		# token covers the settings fixed at startup.
+		#
+		self.instance = "{}-{}-{:08x}".format(VERSION, LANGUAGE, zlib.crc32(self.stylesheets.encode("utf-8")))
 
 		if not os.path.isdir("pages"):
 
@@ -881,6 +1107,8 @@ class WebApp:
 
 			os.mkdir("pages")
 
+		self.pages = PageSources()
+
 		if not os.path.isdir("static"):
 
 			LOGGER.warning("Directory 'static' does not exist, creating")
@@ -925,6 +1153,35 @@ class WebApp:
 
 		return
 
+	def start(self, watch = True):
+		"""Open the courses, hash the files in 'static' and read the pages, and watch all of them for changes if watch is True.
+
+		The watchers are plugins of cherrypy.engine . Tools and
+		benchmarks that do not run the engine may pass False.
+		"""
+
+		self.storage.start(watch = watch)
+
+		self.assets.start(watch = watch)
+
+		self.pages.start(watch = watch)
+
+		return
+
+	def stop(self):
+		"""Stop watching for changes, and close all courses.
+
+		The application can be started again with start().
+		"""
+
+		self.pages.stop()
+
+		self.assets.stop()
+
+		self.storage.stop()
+
+		return
+
 	def _cp_dispatch(self, vpath):
 		"""Custom dispatch for static pages in the 'pages' directory.
 		"""
@@ -939,15 +1196,16 @@ class WebApp:
 
 			if vpath[0].isalnum():
 
-				if os.path.exists(os.path.join("pages",
-												vpath[0] + ".html")):
+				# Unknown pages are left to static_page(), which answers
+				# with 404 Not Found.
+				#
+				page = self.pages.find(vpath[0])
 
-					cherrypy.request.params["page"] = vpath.pop()
+				if page is not None:
 
-				elif os.path.exists(os.path.join("pages",
-													vpath[0] + ".default.html")):
+					vpath.pop()
 
-					cherrypy.request.params["page"] = vpath.pop()  + ".default"
+					cherrypy.request.params["page"] = page
 
 				return self.static_page
 
@@ -977,159 +1235,371 @@ class WebApp:
 			raise cherrypy.HTTPRedirect("/{}".format(path.split("static_page/")[-1]),
 										301)
 
-		return_str = HTML_HEAD.format(title = "Luna LMS: {}".format(page))
+		source = self.pages.get(page)
+
+		if source is None:
+
+			LOGGER.info("Page '{}' does not exist".format(page))
+			raise cherrypy.NotFound()
+
+		heading, content = source
+
+		return self.assets.rewrite(CONTENT_PAGE.render(title = "Luna LMS: {}".format(page),
+														stylesheets = self.stylesheets,
+														logo_file = self._logo_file(),
+														heading = heading or "",
+														content = content))
+
+	def cached_item(self, course_id, path, item, cache_control = "no-cache"):
+		"""Stream a cached item in the response.
 
-		heading = ""
-		content = ""
+		item is a dict as returned by Storage.get_cached_item_metadata() .
+		The item is sent with a strong ETag derived from its hash, and
+		conditional requests are answered with 304 Not Modified before
+		any data is read. So are HEAD requests. A single byte range
+		requested with a Range header is answered with 206 Partial
+		Content, reading only that range. If the item has a compressed
+		variant the client accepts, that is sent with a Content-Encoding
+		header, see _cached_item_encoding() .
+
+		cache_control is the value of the Cache-Control header.
+
+		This method is meant to be called from _cp_dispatch() only.
+		It will redirect when called directly.
+		"""
+
+		LOGGER.debug("cached_item(course_id = {}, path = {})".format(course_id, path))
 
-		# _cp_dispatch() has already checked that the page exists.
+		request_path = cherrypy.request.path_info
+
+		if request_path.find("cached_item") > -1:
+
+			# This is not meant to be called directly
+			#
+			raise cherrypy.HTTPRedirect("/courses/{}/{}".format(course_id, path),
+										301)
+
+		# Adapted from https://stackoverflow.com/a/41581093/1132250
 		#
-		with open(os.path.join("pages", page + ".html"), "rt") as f:
+		cherrypy.response.headers["Content-Type"] = item["format"]
 
-			for line in f.readlines():
+		cherrypy.response.headers["Content-Disposition"] = 'inline;filename="{}"'.format(path.split("/")[-1])
 
-				if line.strip().startswith('<h1'):
+		encoding = None
 
-					# NOTE: Yes, one should always use a full-blown SGML parser.
-					# We play dirty here for that single line.
-					# This will fail in a lot of valid cases, but do the
-					# right thing in most.
-					#
-					heading = line.split('>')[1].split('</')[0]
+		if item["encodings"]:
 
-				else:
-					content += line
+			cherrypy.response.headers["Vary"] = "Accept-Encoding"
+
+			requested = self._cached_item_encoding()
 
-		return_str += self._format_header(heading)
+			if requested in item["encodings"]:
 
-		return_str += '<div class="w3-row-padding" style="margin:0rem 2.5rem;"><div class="w3-col m12 spacer" style="height:2.5rem;"></div></div>'
+				encoding = requested
 
-		return_str += '<main class="w3-row-padding">'
+		etag = None
 
-		return_str += '<div class="w3-col m3 spacer"></div>'
+		# Each encoding is a different representation, with its own ETag
+		#
+		if item["hash"] and encoding:
 
-		return_str += '<div class="w3-col m7 half-col-pad">'
+			etag = '"{}-{}"'.format(item["hash"], encoding)
 
-		return_str += content
+		elif item["hash"]:
 
-		return_str += '</div>'
+			etag = '"{}"'.format(item["hash"])
 
-		return_str += '<div class="w3-col m2 spacer"></div>'
+		self._check_conditions(etag, item["modified"], cache_control)
 
-		return_str += '</main>'
+		size = item["size"]
 
-		return_str += HTML_FOOT
+		start = 0
 
-		return return_str
+		stop = None
 
-	def cached_item(self, course_id, path, file_format, data):
-		"""Return a cached item in the response.
+		if encoding:
 
-		This method is meant to be called from _cp_dispatch() only.
-		It will redirect when called directly.
-		"""
+			cherrypy.response.headers["Content-Encoding"] = encoding
 
-		LOGGER.debug("cached_item(course_id = {}, path = {})".format(course_id, path))
+			size = item["encodings"][encoding]
 
-		request_path = cherrypy.request.path_info
+		# HTTP/1.0 has no byte ranges. Adapted from cherrypy.lib.static .
+		# Ranges always refer to the identity encoding, which is what is
+		# requested along with a Range header.
+		#
+		elif cherrypy.request.protocol >= (1, 1):
 
-		if request_path.find("cached_item") > -1:
+			cherrypy.response.headers["Accept-Ranges"] = "bytes"
 
-			# This is not meant to be called directly
+			ranges = None
+
+			# If-Range makes the range conditional on an unchanged item,
+			# otherwise the whole item is sent. Only exact matches of the
+			# validators count.
 			#
-			raise cherrypy.HTTPRedirect("/courses/{}/{}".format(course_id, path),
-										301)
+			if_range = cherrypy.request.headers.get("If-Range")
 
-		# Adapted from https://stackoverflow.com/a/41581093/1132250
+			if if_range is None or if_range in (cherrypy.response.headers.get("ETag"), cherrypy.response.headers.get("Last-Modified")):
+
+				ranges = cherrypy.lib.httputil.get_ranges(cherrypy.request.headers.get("Range"), size)
+
+			if ranges == []:
+
+				cherrypy.response.headers["Content-Range"] = "bytes */{}".format(size)
+
+				raise cherrypy.HTTPError(416, "Requested range not satisfiable")
+
+			if ranges and len(ranges) == 1:
+
+				start, stop = ranges[0]
+
+				stop = min(stop, size)
+
+				LOGGER.debug("Sending bytes {} to {} of {}".format(start, stop - 1, size))
+
+				cherrypy.response.status = 206
+
+				cherrypy.response.headers["Content-Range"] = "bytes {}-{}/{}".format(start, stop - 1, size)
+
+				size = stop - start
+
+			elif ranges:
+
+				# Browsers seeking in media request a single range.
+				# Multiple ranges may be ignored, see RFC 9110, 14.2 .
+				#
+				LOGGER.debug("{} ranges requested, sending the whole item".format(len(ranges)))
+
+		# With a known Content-Length, CherryPy sends the chunks as they
+		# come, without chunked transfer encoding.
 		#
-		cherrypy.response.headers["Content-Type"] = file_format
+		cherrypy.response.headers["Content-Length"] = str(size)
 
-		cherrypy.response.headers["Content-Disposition"] = 'inline;filename="{}"'.format(path.split("/")[-1])
+		# CherryPy drops the body of a HEAD response, so there is no
+		# need to read it.
+		#
+		if cherrypy.request.method == "HEAD":
+
+			return b""
+
+		stream = self.storage.get_cached_item_stream(course_id, path, start = start, stop = stop, encoding = encoding)
+
+		# The item may have changed since its metadata was read. Sending
+		# it with the old headers would mismatch the Content-Length.
+		#
+		if not stream or stream["hash"] != item["hash"] or stream["size"] != item["encodings"].get(encoding, item["size"]):
+
+			LOGGER.info("Cached item '{}' of course {} changed while sending".format(path, course_id))
+			raise cherrypy.HTTPError(503, "Cached item changed, please retry")
+
+		cherrypy.response.stream = True
+
+		return stream["chunks"]
 
-		return data
+	def _check_conditions(self, etag, modified, cache_control = "no-cache"):
+		"""Set the ETag, Last-Modified and Cache-Control headers of the response, and answer with 304 Not Modified if the client's copy is current.
 
-	def _format_header(self, heading = '<!-- no heading provided -->'):
-		"""Compute format string replacements forthe HTML_HEADER template, apply them, and return it.
+		etag is a quoted entity tag, and modified a time in seconds since
+		the epoch. Either may be None. By default, clients must
+		revalidate on every use, which costs a 304 response for a current
+		copy.
 		"""
 
-		result = ""
+		cherrypy.response.headers["Cache-Control"] = cache_control
 
-		if os.path.exists(os.path.join("static", "logo.svg")):
+		if etag:
 
-			result = HTML_HEADER.format(logo_file = "logo.svg", heading = heading)
+			cherrypy.response.headers["ETag"] = etag
 
-		else:
-			result = HTML_HEADER.format(logo_file = "logo.default.svg", heading = heading)
+		if modified:
 
-		return result
+			cherrypy.response.headers["Last-Modified"] = cherrypy.lib.httputil.HTTPDate(modified)
 
+		cherrypy.lib.cptools.validate_etags()
 
-	def __call__(self):
-		"""Called by cherrypy for the / root page.
+		# If-Modified-Since is ignored when If-None-Match is present,
+		# see RFC 9110, 13.1.3 .
+		#
+		if "If-None-Match" not in cherrypy.request.headers:
+
+			cherrypy.lib.cptools.validate_since()
+
+		return
+
+	def _css_bundle(self):
+		"""Return all STYLESHEETS as a single minified stylesheet. Missing files in 'static' are skipped.
 		"""
 
-		return_str = HTML_HEAD.format(title = _("Luna LMS: Start"))
+		stylesheets = []
 
-		heading = _("Willkommen!")
-		welcome = ""
+		for name in STYLESHEETS:
 
-		path = ""
+			if name == "luna.css":
 
-		if os.path.exists(os.path.join("pages", "welcome.html")):
+				stylesheets.append(CSS)
 
-			path = os.path.join("pages", "welcome.html")
+			elif os.path.exists(os.path.join("static", name)):
 
-		elif os.path.exists(os.path.join("pages", "welcome.default.html")):
+				with open(os.path.join("static", name), mode = "rt", encoding = "utf-8-sig") as f:
 
-			path = os.path.join("pages", "welcome.default.html")
+					stylesheets.append(f.read())
 
-		if path:
+		return bundle_css(stylesheets)
 
-			with open(path, "rt") as f:
+	def _cached_item_encoding(self):
+		"""Return the encoding the current request accepts for cached items, "gzip" or None.
 
-				for line in f.readlines():
+		Range requests get the identity encoding, so that byte ranges
+		refer to the original data.
+		"""
 
-					if line.strip().startswith('<h1'):
+		if "Range" not in cherrypy.request.headers and self._accepts_gzip():
 
-						# NOTE: Yes, one should always use a full-blown SGML parser.
-						# We play dirty here for that single line.
-						# This will fail in a lot of valid cases, but do the
-						# right thing in most.
-						#
-						heading = line.split('>')[1].split('</')[0]
+			return "gzip"
 
-					else:
-						welcome += line
+		return None
 
-		return_str += self._format_header(heading)
+	def _accepts_gzip(self):
+		"""Return True if the client accepts gzip content encoding.
+		"""
 
-		return_str += '<div class="w3-row-padding" style="margin:0rem 2.5rem;"><div class="w3-col m12 spacer" style="height:2.5rem;"></div></div>'
+		qvalues = dict([(element.value.lower(), element.qvalue) for element in cherrypy.request.headers.elements("Accept-Encoding")])
 
-		return_str += '<main class="w3-row-padding">'
+		# An explicit gzip;q=0 overrides *
+		#
+		for coding in ("gzip", "x-gzip", "*"):
 
-		return_str += '<div class="w3-col m3 spacer"></div>'
+			if coding in qvalues:
 
-		return_str += '<div class="w3-col m7 half-col-pad">'
+				return qvalues[coding] > 0
 
-		return_str += welcome
+		return False
 
-		return_str += '<a class="button" href="/courses"><div class="image_spacer"><img src="/static/course_start.svg" alt=""></div>{}</a>'.format(_("Kurs beginnen"))
+	def generated_asset(self, asset, cache_control = "no-cache"):
+		"""Send a generated asset from AssetManifest.generated, compressed with gzip if the client accepts it.
 
-		return_str += '<a class="button" href="/continue"><div class="image_spacer"><img src="/static/course_continue.svg" alt=""></div>{}</a>'.format(_("Kurs fortsetzen"))
+		cache_control is the value of the Cache-Control header.
+		"""
 
-		return_str += '<br>'
+		cherrypy.response.headers["Content-Type"] = "{}; charset=utf-8".format(asset["format"])
 
-		return_str += '<a class="button_inactive"><div class="image_spacer"><img src="/static/account_add.svg" alt=""></div>{}</a>'.format(_("Konto anlegen"))
+		cherrypy.response.headers["Vary"] = "Accept-Encoding"
 
-		return_str += '</div>'
+		compressed = asset["gzip"] is not None and self._accepts_gzip()
 
-		return_str += '<div class="w3-col m2 spacer"></div>'
+		# Each encoding is a different representation, with its own ETag
+		#
+		etag = '"{}"'.format(asset["hash"])
 
-		return_str += '</main>'
+		if compressed:
 
-		return_str += HTML_FOOT
+			etag = '"{}-gzip"'.format(asset["hash"])
 
-		return return_str
+		self._check_conditions(etag, asset["modified"], cache_control)
+
+		if compressed:
+
+			cherrypy.response.headers["Content-Encoding"] = "gzip"
+
+			return asset["gzip"]
+
+		return asset["data"]
+
+	@cherrypy.expose
+	def static(self, *args):
+		"""Send generated assets which are not files in the directory 'static'.
+
+		Existing files are sent by the CherryPy staticdir tool before this
+		method is reached. Pages that are not rewritten to
+		content-addressed URLs, like the editor pages, refer to generated
+		assets here.
+		"""
+
+		asset = self.assets.generated.get("/".join(args))
+
+		if asset is None:
+
+			raise cherrypy.NotFound()
+
+		return self.generated_asset(asset)
+
+	def _logo_file(self):
+		"""Return the file name of the logo in the directory 'static', preferring a custom logo.svg .
+		"""
+
+		return self.pages.logo_file
+
+	def _format_message(self, message):
+		"""Return message as a paragraph for the content management frontend, or an empty string if there is none.
+		"""
+
+		if message:
+
+			return '<p><strong>{}</strong></p>'.format(message)
+
+		return ""
+
+	def _redaktion_course(self, course_id):
+		"""Return the UUID of the course course_id given in a request path of the content management frontend, or raise NotFound if there is no such course.
+		"""
+
+		try:
+			course = uuid.UUID(course_id)
+
+		except ValueError:
+
+			LOGGER.error("Path component is not an UUID: '{}'".format(course_id))
+			raise cherrypy.NotFound()
+
+		if course not in self.storage.find_courses().keys():
+
+			LOGGER.error("course {} requested, but does not exist".format(course_id))
+			raise cherrypy.NotFound()
+
+		return course
+
+
+	def __call__(self):
+		"""Called by cherrypy for the / root page.
+		"""
+
+		heading = _("Willkommen!")
+		welcome = []
+
+		page = self.pages.find("welcome")
+
+		if page is not None:
+
+			page_heading, content = self.pages.get(page)
+
+			heading = page_heading or heading
+
+			welcome.extend(content)
+
+		welcome.append(START_BUTTONS)
+
+		return self.assets.rewrite(CONTENT_PAGE.render(title = _("Luna LMS: Start"),
+														stylesheets = self.stylesheets,
+														logo_file = self._logo_file(),
+														heading = heading,
+														content = welcome))
+
+	@cherrypy.expose
+	def diagnostics(self):
+		"""Return the configuration of the storage and the page cache as JSON.
+		"""
+
+		result = self.storage.get_diagnostics()
+
+		result["page_cache"] = {"max_size": self.page_cache.max_size,
+								"size": self.page_cache.size,
+								"entries": len(self.page_cache.entries),
+								"hits": self.page_cache.hits,
+								"misses": self.page_cache.misses}
+
+		cherrypy.response.headers["Content-Type"] = "application/json"
+
+		return json.dumps(result, indent = "\t").encode("utf-8")
 
 	@cherrypy.expose
 	def courses(self, *args, **kwargs):
@@ -1157,11 +1627,11 @@ class WebApp:
 			try:
 				course_id = uuid.UUID(args[0])
 
-				item = self.storage.get_cached_item(course_id, path)
+				item = self.storage.get_cached_item_metadata(course_id, path)
 
 				if item:
 
-					return self.cached_item(course_id, path, item["format"], item["data"])
+					return self.cached_item(course_id, path, item)
 
 			except ValueError:
 
@@ -1170,98 +1640,108 @@ class WebApp:
 
 			LOGGER.error("Path '{}' is not cached in course {}, and does not point to a valid resource".format(course_id, path))
 			raise cherrypy.NotFound()
-		
-		return_str = HTML_HEAD.format(title = _("Luna LMS: Kurs-Übersicht"))
 
-		return_str += self._format_header(_("Kurs-Übersicht"))
+		# Send the page head while the course metadata is read.
+		#
+		cherrypy.response.stream = True
 
-		return_str += '<div class="w3-row-padding" style="margin:0rem 2.5rem;"><div class="w3-col m12 spacer" style="height:2.5rem;"></div></div>'
+		chunks = self.assets.rewrite_chunks(COURSES_PAGE.stream({"title": _("Luna LMS: Kurs-Übersicht"),
+																	"stylesheets": self.stylesheets,
+																	"logo_file": self._logo_file(),
+																	"heading": _("Kurs-Übersicht"),
+																	"courses": self._course_listings}))
 
-		return_str += '<main class="w3-row-padding">'
+		cherrypy.response.headers["Vary"] = "Accept-Encoding"
 
-		return_str += '<div class="w3-col m3 spacer"></div>'
+		if self._accepts_gzip():
 
-		return_str += '<div class="w3-col m6 half-col-pad">'
+			cherrypy.response.headers["Content-Encoding"] = "gzip"
 
-		return_str += '<form class="search inactive">'
-		desc = _("Suche nach Kurs-Titeln, Schlagworten und mehr...")
-		return_str += '<input name="terms" type="text" value="{0}" title="{0}" disabled>'.format(desc)
-		return_str += '<button type="submit" disabled><img src="/static/search-inactive.svg" alt="{}"></button>'.format(_("Suchen"))
-		return_str += '</form>'
+			return gzip_stream(chunks)
 
-		return_str += '<div>'
+		return chunks
 
-		return_str += '''	<select name="sort" class="inactive" disabled>
-		<option value="sort">{}</option>
-	</select>
-'''.format(_("Sortieren"))
+	@cherrypy.expose
+	def a(self, digest, *args):
+		"""The entry point for content-addressed assets below /a, see luna_lms.assets.AssetManifest .
 
-		return_str += '''	<select name="filter" class="inactive" disabled>
-		<option value="filter">{}</option>
-	</select>
-'''.format(_("Alle Filter"))
+		Outdated and unknown URLs are not found. Found assets never change
+		under their URL, so they may be cached for good.
+		"""
 
-		return_str += '</div>'
+		LOGGER.debug("a(digest = {}, args = {})".format(digest, args))
 
-		courses = self.storage.find_courses()
+		url = asset_url(digest, "/".join(args))
 
-		# Create a list to be able to sort
-		#
-		titles = [key for key in courses.keys() if key.__class__ == str]
+		asset = self.assets.find_generated(url)
 
-		titles.sort()
+		if asset is not None:
 
-		for title in titles:
+			return self.generated_asset(asset, IMMUTABLE_CACHE_CONTROL)
 
-			course_id = courses[title]
+		source = self.assets.lookup(url)
 
-			meta_data = self.storage.get_course_metadata(course_id)
+		if source is None:
 
-			alt = self.storage.get_cached_item(course_id, meta_data["relation"])["description"]
+			LOGGER.info("Asset '{}' is unknown or outdated".format(url))
+			raise cherrypy.NotFound()
 
-			return_str += '<div class="course_hover">'
+		course_id, path = source
 
-			return_str += '<a href="/courses/view/{}">'.format(course_id)
+		if course_id is None:
 
-			return_str += '<div class="course_listing">'
+			return self.static_asset(path)
 
-			return_str += '<h2>{}</h2>'.format(meta_data["title"])
+		item = self.storage.get_cached_item_metadata(course_id, path)
 
-			return_str += '<div class="w3-cell-row">'
+		# The item may have changed since the manifest was built
+		#
+		if not item or not item["hash"] or not item["hash"].startswith(digest):
 
-			return_str += '<div class="w3-cell w3-mobile">'
+			LOGGER.info("Cached item '{}' of course {} has changed".format(path, course_id))
+			raise cherrypy.NotFound()
 
-			return_str += '<img src="/courses/{}/{}" alt="{}">'.format(course_id,
-																		meta_data["relation"],
-																		alt)
+		return self.cached_item(course_id, path, item, IMMUTABLE_CACHE_CONTROL)
 
-			return_str += '</div>'
+	def static_asset(self, path):
+		"""Send the file path in the directory 'static' for its content-addressed URL, using the compressed variant from the asset manifest if the client accepts it.
+		"""
 
-			return_str += '<div class="w3-cell w3-mobile w3-container">'
+		cherrypy.response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
 
-			return_str += '<p>{}</p>'.format(meta_data["description"])
+		entry = self.assets.static.get(path)
 
-			return_str += '</div>'
+		if entry is not None and entry[4] is not None:
 
-			return_str += '</div>'
+			cherrypy.response.headers["Vary"] = "Accept-Encoding"
 
-			return_str += '</div>'
+		if entry is None or entry[4] is None or "Range" in cherrypy.request.headers or not self._accepts_gzip():
 
-			return_str += '</a>'
+			return cherrypy.lib.static.serve_file(os.path.join(os.getcwd(), "static", *path.split("/")))
 
-			return_str += '</div>'
+		cherrypy.response.headers["Content-Type"] = mimetypes.guess_type(path)[0]
 
-		return_str += '<a href="/" class="browse"><div class="image_spacer"><img src="/static/back.svg" alt=""></div>{}</a>'.format(_("Zurück zur Start-Seite"))
+		self._check_conditions('"{}-gzip"'.format(entry[3]), entry[2] / 1e9, IMMUTABLE_CACHE_CONTROL)
 
-		return_str += '</div>'
+		cherrypy.response.headers["Content-Encoding"] = "gzip"
 
-		return_str += '<div class="w3-col m3 spacer"></div>'
+		return entry[4]
 
-		return_str += '</main>'
+	def _course_listings(self):
+		"""Return a list of HTML fragments, one for each course, sorted by title.
+		"""
 
-		return_str += HTML_FOOT
+		listings = []
 
-		return return_str
+		for summary in self.storage.get_course_catalog():
+
+			listings.append(COURSE_LISTING.format(course_id = summary["identifier"],
+													title = summary["title"],
+													relation = summary["relation"],
+													alt = summary["alt"],
+													description = summary["description"]))
+
+		return listings
 
 	@cherrypy.expose
 	def view(self, course_id, learning_content_id = "", modus = ""):
@@ -1281,283 +1761,337 @@ class WebApp:
 			LOGGER.info("course_id '{}' is not a valid UUID".format(course_id))
 			raise cherrypy.NotFound()
 
+		if course_id not in self.storage.find_courses().keys():
+
+			LOGGER.info("course {} requested, but does not exist".format(course_id))
+			raise cherrypy.NotFound()
+
 		# If called with a raw course_id, redirect to the first learning content.
 
-		if course_id and not learning_content_id:
+		if not learning_content_id:
 
-			# Getting the first item via iter()'s __next__() seems more
-			# efficient than building a list just to get the first element.
-			#
-			first_learning_content_id = iter(self.storage.get_learning_contents_ordered(course_id)).__next__().identifier
+			first_id = self.storage.get_navigation_index(course_id).first()
+
+			if first_id is None:
+
+				LOGGER.info("course {} has no learning contents".format(course_id))
+				raise cherrypy.NotFound()
 
 			raise cherrypy.HTTPRedirect("/courses/view/{}/{}".format(course_id,
-																		first_learning_content_id),
+																		first_id),
 																		301)
 
-		# Generate page content
+		# Unknown modes display the fallback, so they share a cache entry.
+		#
+		if modus not in (MODI.TEXT_ZUSATZ, MODI.BILD, MODI.TEXT_BILD):
 
-		course_title = self.storage.find_courses()[course_id]
+			modus = MODI.TEXT
 
-		learning_contents = self.storage.get_learning_contents_ordered(course_id)
+		# The revision is kept in memory, so neither a conditional
+		# request nor a cache hit touches the course database.
+		#
+		key = (course_id, learning_content_id, modus, LANGUAGE)
 
-		def get_identifiers(d):
-			result = {}
-			for key in d.keys():
-				result[key.identifier] = key.title
-				if d[key]:
-					result.update(get_identifiers(d[key]))
-			return result
-		
-		# TODO: This should be returned alongside the OrderedDict by
-		# get_learning_contents_ordered()
+		# Pages refer to the files in 'static' by their current URLs, so
+		# they also depend on the revision of the asset manifest.
 		#
-		ids_identifiers_flat = get_identifiers(learning_contents)
+		revision = (self.storage.get_revision(course_id), self.assets.revision)
 
-		ids_flat = list(ids_identifiers_flat.keys())
+		# The page cache holds the plain and the compressed page under
+		# separate keys.
+		#
+		encoding = "identity"
 
-		if learning_content_id not in ids_flat:
+		if self._accepts_gzip():
 
-			LOGGER.error("learning content '{}' is not listed for course '{}'".format(learning_content_id, course_title))
-			raise cherrypy.NotFound()
+			encoding = "gzip"
 
-		# If there is no variant for the current step, skip to the next step.
-		# TODO: Actually check for missing variant/content
+		cherrypy.response.headers["Vary"] = "Accept-Encoding"
+
+		# Unknown steps are left to stream_view().
+		#
+		# The revision above is counted per process, so conditional
+		# requests use the validator stored in the course database and
+		# the digest of 'static' instead.
 		#
-		if not self.storage.get_html(course_id, learning_content_id) and len(ids_flat) > ids_flat.index(learning_content_id) + 1:
+		if learning_content_id in self.storage.get_navigation_index(course_id):
 
-			next_id = ids_flat[ids_flat.index(learning_content_id) + 1]
+			validator, modified = self.storage.get_validator(course_id)
 
-			raise cherrypy.HTTPRedirect("/courses/view/{}/{}".format(course_id,
-																		next_id),
-																		302)
+			self._check_conditions('W/"{}-{}-{}-{}-{}-{}-{}"'.format(self.instance, validator, self.assets.digest[:16], self._logo_file(), learning_content_id, modus, encoding),
+									max(modified or 0, self.assets.modified))
 
-		return_str = HTML_HEAD.format(title = "Luna LMS: {}".format(course_title))
+		page = self.page_cache.get(key + (encoding,), revision)
 
-		# Precompute Headings
+		if page is not None:
 
-		def get_hierarchy(d, identifier, results = []):
-			if identifier in [key.identifier for key in d.keys()]:
-				results.append(ids_identifiers_flat[identifier])
-				return results
-			else:
-				for key in d.keys():
-					if d[key] and identifier in get_identifiers(d[key]).keys():
-						results.append(key.title)
-						get_hierarchy(d[key], identifier, results)
-			return results
-		
-		# TODO: This should be returned alongside the OrderedDict by
-		# get_learning_contents_ordered()
+			if encoding == "gzip":
+
+				cherrypy.response.headers["Content-Encoding"] = "gzip"
+
+			return page
+
+		# stream_view() raises redirects and errors before anything is
+		# sent, so the page can be streamed from here on.
 		#
-		heading_hierarchy = get_hierarchy(learning_contents, learning_content_id)
+		chunks = self.stream_view(course_id, learning_content_id, modus)
 
-		first_heading = ""
-		other_headings = ""
+		cherrypy.response.stream = True
 
-		level = 1
+		if encoding == "gzip":
 
-		for heading in heading_hierarchy:
+			cherrypy.response.headers["Content-Encoding"] = "gzip"
 
-			if level == 1:
+		return self._cache_while_streaming(chunks, key, revision, encoding == "gzip")
 
-				first_heading = heading
+	def _cache_while_streaming(self, chunks, key, revision, compressed = False):
+		"""Yield the chunks, and store the complete page in the page cache once all have been sent.
 
-			else: 
-				other_headings += '<h{0}>{1}</h{0}>'.format(level, heading)
+		If compressed is True, the chunks are compressed with gzip on the
+		way, and both the plain and the compressed page are cached, so
+		that cache hits are sent without compressing again.
+		"""
 
-			level += 1
+		sent = []
 
-		return_str += self._format_header(first_heading)
+		compressor = None
 
-		return_str += '<div class="w3-row-padding" style="margin:0rem 2.5rem;">'
-		return_str += '	<div class="w3-col m10 spacer"></div>'
-		return_str += '	<div class="w3-col m2" style="height:4.45rem;text-align:right;">'
-		return_str += '		<a class="rounded_hover_border" style="padding: 0.1rem 0.2rem;position:relative;top: 0.5rem;" href="#">'
-		return_str += '			<img src="/static/modes.svg" style="height:1rem;" alt="{}">'.format(_("Modus-Menü-Symbol"))
-		return_str += '		</a>'
-		return_str += '	</div>'
-		return_str += '</div>'
+		if compressed:
 
-		return_str += '<main class="w3-row-padding">'
+			compressor = gzip_compressor(STREAM_GZIP_LEVEL)
 
-		return_str += '	<div class="w3-col m3">'
-		return_str += '	<nav class="course_navigation">'
+		encoded = []
 
-		return_str += '		<p>{}</p>'.format(course_title)
-		
-		return_str += '		<div class="bookmark">'
-		return_str += '			<div class="w3-cell bookmark_icon">'
-		return_str += '				<div>'
-		return_str += '					<img src="/static/bookmark.svg" alt="">'
-		return_str += '				</div>'
-		return_str += '			</div>'
-		return_str += '			<div class="w3-cell bookmark_text">'
-		return_str += '{}:<br><strong>{}</strong>'.format(_("Mein Lese-Zeichen"), "DreiWortCode")
-		return_str += '</div>'
-		return_str += '		</div>'
-
-		return_str += '		<div class="nav_line">'
-		return_str += '			<div class="nav_line_offset">'
-
-		def display_steps(d, level = 0):
-			list_type = "ol"
-			if level > 0:
-				list_type = "ul"
-			result = "<{}>".format(list_type)
-			for key in d.keys():
-				title = key.title
-				if level == 0 and len(key.title) > 33:
-					title = "{}...".format(title[:30])
-				style = ""
-				if key.identifier == learning_content_id:
-					style=' class="current"'
-				result += '<li{}><a href="/courses/view/{}/{}"><span>{}</span></a></li>'.format(style, course_id, key.identifier, title)
-				# Only display a sub-level if the current step is part of it, at any level
-				if d[key] and learning_content_id in get_identifiers(d[key]).keys():
-					result += display_steps(d[key], level + 1)
-			result += "</{}>".format(list_type)
-			return result
-
-		return_str += display_steps(learning_contents)
-
-		return_str += '			</div>'
-		
-		return_str += '		</div>'
-		
-		return_str += '	</nav>'
+		for chunk in chunks:
 
-		return_str += '	</div>'
+			sent.append(chunk)
 
-		return_str += '<article class="w3-col m7 half-col-pad">'
+			if compressor is None:
 
-		return_str += other_headings
+				yield chunk
 
-		# Display content according to mode.
-		# text is the fallback mode.
+				continue
 
-		content_str = ""
+			# Flushing sends each chunk as soon as it is rendered
+			#
+			data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
 
-		if modus == MODI.TEXT_ZUSATZ:
+			encoded.append(data)
 
-			# Use the first directory we find, with the first HTML file we
-			# find in there.
+			yield data
 
-			(directory_name, html) = self.storage.get_directory(course_id, learning_content_id)
+		if compressor is not None:
 
-			if directory_name:
+			data = compressor.flush()
 
-				replacement_path = "/static/{}/Lern-Inhalte/{}/{}/".format(course_title,
-																learning_content_id,
-																directory_name)
+			encoded.append(data)
 
-				# Correct local path for img tags
-				#
-				html = html.replace('src="', 'src="{}'.format(replacement_path))
+			yield data
 
-				# Correct local path for CSS images
-				#
-				html = html.replace("url('","url('{}".format(replacement_path))
+		# Not reached if the client disconnects, so that incomplete pages
+		# are never cached.
+		#
+		self.page_cache.put(key + ("identity",), revision, b"".join(sent))
 
-				content_str = html
+		if compressor is not None:
 
-		if modus == MODI.BILD:
+			self.page_cache.put(key + ("gzip",), revision, b"".join(encoded))
 
-			# Embed the first image file we find.
+		return
 
-			image_path = self.storage.get_image(course_id, learning_content_id)
+	def render_view(self, course_id, learning_content_id, modus):
+		"""Render the view of a learning content in a course, and return it as UTF-8 encoded bytes.
 
-			if image_path:
+		See stream_view() for the arguments and exceptions.
+		"""
 
-				content_str = '<p><img style="max-width:100%;" src="{}" alt=""></p>'.format(image_path)
+		return b"".join(self.stream_view(course_id, learning_content_id, modus))
 
-		if modus == MODI.TEXT_BILD:
+	def stream_view(self, course_id, learning_content_id, modus):
+		"""Return an iterator over the view of a learning content in a course, as UTF-8 encoded bytes.
 
-			# Combine first HTML and image file
+		course_id must be an UUID. Raises cherrypy.NotFound for unknown
+		learning contents, and cherrypy.HTTPRedirect for learning contents
+		without a variant, before the iterator is returned.
 
-			html = self.storage.get_html(course_id, learning_content_id)
+		The head and header are yielded before the navigation, the
+		content and the links to neighbouring learning contents are
+		computed.
+		"""
 
-			if html:
+		course_title = self.storage.find_courses().get(course_id)
 
-				content_str = '<div style="float:left;">' +  html + '</div>'
+		if course_title is None:
 
-			image_path = self.storage.get_image(course_id, learning_content_id)
+			LOGGER.error("course {} requested, but does not exist".format(course_id))
+			raise cherrypy.NotFound()
 
-			if image_path:
+		navigation = self.storage.get_navigation_index(course_id)
 
-				content_str += '<div style="float:left;"><img style="max-width:100%;" src="{}" alt=""></div>'.format(image_path)
+		# Generate page content
 
-			content_str += '<div style="clear:both;"></div>'
+		if learning_content_id not in navigation:
 
-		if not content_str:
+			LOGGER.error("learning content '{}' is not listed for course '{}'".format(learning_content_id, course_title))
+			raise cherrypy.NotFound()
 
-			# Fallback: Embed the first HTML file we find.
+		# If there is no variant for the current step, skip to the next step.
+		# This must be decided before the response starts, so the HTML is
+		# read here, and reused for the content below.
+		# TODO: Actually check for missing variant/content
+		#
+		next_id = navigation.next(learning_content_id)
 
-			content_str = self.storage.get_html(course_id, learning_content_id)
+		html = self.storage.get_html(course_id, learning_content_id)
 
-		return_str += content_str
+		if next_id is not None and not html:
 
-		return_str += '<div>'
+			raise cherrypy.HTTPRedirect("/courses/view/{}/{}".format(course_id,
+																		next_id),
+																		302)
 
-		index = ids_flat.index(learning_content_id)
+		# Precompute Headings
 
-		if index > 0:
+		heading_hierarchy = navigation.hierarchy(learning_content_id)
 
-			previous_id = ids_flat[index - 1]
+		first_heading = heading_hierarchy[0]
 
-			# If there is no variant for the previous step, skip back two steps
-			# TODO: Actually check for missing variant/content
-			#
-			if index > 1 and not self.storage.get_html(course_id, previous_id):
+		other_headings = ['<h{0}>{1}</h{0}>'.format(level, heading) for level, heading in enumerate(heading_hierarchy[1:], 2)]
 
-				previous_id = ids_flat[index - 2]
+		# The following parts are computed while the head is being sent.
 
-			return_str += '<div class="w3-cell w3-mobile" style="width:8.1rem;">'
+		def navigation_html():
 
-			html = '<a href="/courses/view/{}/{}" class="browse"><div class="image_spacer"><img src="/static/back.svg" alt=""></div>{}</a>'
-			
-			return_str += html.format(course_id,
-										previous_id,
-										_("Zurück"))
+			navigation_parts = []
 
-			return_str += '</div>'
+			def display_steps(d, level = 0):
+				list_type = "ol"
+				if level > 0:
+					list_type = "ul"
+				navigation_parts.append("<{}>".format(list_type))
+				for key in d.keys():
+					title = key.title
+					if level == 0 and len(key.title) > 33:
+						title = "{}...".format(title[:30])
+					style = ""
+					if key.identifier == learning_content_id:
+						style=' class="current"'
+					navigation_parts.append(NAVIGATION_ITEM.format(style, course_id, key.identifier, title))
+					# Only display a sub-level if the current step is part of it, at any level
+					if d[key] and navigation.contains(key.identifier, learning_content_id):
+						display_steps(d[key], level + 1)
+				navigation_parts.append("</{}>".format(list_type))
+				return
 
-			return_str += '<div class="w3-cell w3-mobile" style="width:6.25rem;">'
-			return_str += '</div>'
+			display_steps(navigation.tree)
 
-		if index < len(ids_flat) - 1:
+			return navigation_parts
 
-			return_str += '<div class="w3-cell w3-mobile" style="width:8.1rem;">'
+		def content_html():
 
-			html = '<a href="/courses/view/{}/{}" class="browse" style=""><div class="image_spacer"><img src="/static/forward.svg" alt=""></div>{}</a>'
+			# Display content according to mode.
+			# text is the fallback mode.
 
-			return_str += html.format(course_id,
-										ids_flat[index + 1],
-										_("Weiter"))
+			content_str = ""
 
-			return_str += '</div>'
+			if modus == MODI.TEXT_ZUSATZ:
 
-		return_str += '</div>'
+				# Use the first directory we find, with the first HTML file we
+				# find in there.
 
-		return_str += '</article>'
+				(directory_name, directory_html) = self.storage.get_directory(course_id, learning_content_id)
 
-		return_str += '<div class="w3-col m1 spacer"></div>'
-		
-		return_str += '<div class="w3-col m1 spacer"></div>'
-		
-		return_str += '</main>'
+				if directory_name:
 
-		return_str += HTML_FOOT
+					replacement_path = "/static/{}/Lern-Inhalte/{}/{}/".format(course_title,
+																	learning_content_id,
+																	directory_name)
 
-		return return_str
+					# Correct local path for img tags
+					#
+					directory_html = directory_html.replace('src="', 'src="{}'.format(replacement_path))
+
+					# Correct local path for CSS images
+					#
+					directory_html = directory_html.replace("url('","url('{}".format(replacement_path))
+
+					content_str = directory_html
+
+			if modus == MODI.BILD:
+
+				# Embed the first image file we find.
+
+				image_path = self.storage.get_image(course_id, learning_content_id)
+
+				if image_path:
+
+					content_str = '<p><img style="max-width:100%;" src="{}" alt=""></p>'.format(image_path)
+
+			if modus == MODI.TEXT_BILD:
+
+				# Combine first HTML and image file
+
+				if html:
+
+					content_str = '<div style="float:left;">' +  html + '</div>'
+
+				image_path = self.storage.get_image(course_id, learning_content_id)
+
+				if image_path:
+
+					content_str += '<div style="float:left;"><img style="max-width:100%;" src="{}" alt=""></div>'.format(image_path)
+
+				content_str += '<div style="clear:both;"></div>'
+
+			if not content_str:
+
+				# Fallback: Embed the first HTML file we find.
+
+				content_str = html
+
+			return content_str
+
+		def browse_html():
+
+			browse = []
+
+			previous_id = navigation.previous(learning_content_id)
+
+			if previous_id is not None:
+
+				# If there is no variant for the previous step, skip back two steps
+				# TODO: Actually check for missing variant/content
+				#
+				if navigation.previous(learning_content_id, 2) is not None and not self.storage.get_html(course_id, previous_id):
+
+					previous_id = navigation.previous(learning_content_id, 2)
+
+				browse.append(BROWSE_BACK.format(course_id, previous_id))
+
+			if next_id is not None:
+
+				browse.append(BROWSE_FORWARD.format(course_id, next_id))
+
+			return browse
+
+		return self.assets.rewrite_chunks(VIEW_PAGE.stream({"title": "Luna LMS: {}".format(course_title),
+															"stylesheets": self.stylesheets,
+															"logo_file": self._logo_file(),
+															"heading": first_heading,
+															"course_title": course_title,
+															"navigation": navigation_html,
+															"headings": other_headings,
+															"content": content_html,
+															"browse": browse_html}))
 
 	@cherrypy.expose
-	def redaktion(self, *args, title = "", filename = "", content = "", _method = "", learning_contents = ""):
+	def redaktion(self, *args, title = "", filename = "", content = "", _method = "", learning_contents = "", successor = ""):
 		"""The content management frontend for Luna LMS, and a dispatcher for all subordinate endpoints.
 
 		This method will dispatch any requests to subordinate endpoints to appropriate handlers.
 		"""
 
-		LOGGER.debug("redaktion(args = {}, title = '{}', filename = '{}', content = {}, _method='{}', learning_contents='{}')".format(args, title, filename, content.__class__, _method, learning_contents))
+		LOGGER.debug("redaktion(args = {}, title = '{}', filename = '{}', content = {}, _method='{}', learning_contents='{}', successor='{}')".format(args, title, filename, content.__class__, _method, learning_contents, successor))
 
 		# This method does not follow the CherryPy idea very well, since it does
 		# its own dispatching. CherryPy normally expects Python objects that
@@ -1592,7 +2126,7 @@ class WebApp:
 
 				LOGGER.info("2 arguments, dispatching to lerninhalt_redaktion()")
 
-				return self.lerninhalt_redaktion(args[0], args[1], filename, content, _method)
+				return self.lerninhalt_redaktion(args[0], args[1], filename, content, _method, successor)
 
 			if len(args) == 3:
 
@@ -1610,11 +2144,11 @@ class WebApp:
 		#
 		if _method.upper() == "GET" or (cherrypy.serving.request.method == "GET" and _method.upper() in ("", "GET")):
 
-			return self.redaktion_get(args)
+			return self.redaktion_get()
 
 		elif _method.upper() == "POST" or (cherrypy.serving.request.method == "POST" and _method.upper() in ("", "POST")):
 
-			return self.redaktion_post(args, title)
+			return self.redaktion_post(title)
 
 		else:
 
@@ -1640,30 +2174,11 @@ class WebApp:
 		"""
 		# Handle the Redaktion
 
-		return_str = HTML_HEAD.format(title = _("Redaktionssystem"))
-
-		return_str += '<div class="redaktionssystem">'
-
-		return_str += '<header class="w3-content">'
-
-		return_str += '<h1 class="w3-padding w3-khaki">{}</h1>'.format(_("Redaktionssystem"))
-
-		return_str += '<nav class="w3-padding">'
-
-		return_str += '<p><a href="/" class="nav w3-light-blue w3-padding w3-round-xlarge">&lt;&nbsp;{}</a></p>'.format(_("Zur Startseite"))
-
-		return_str += '</nav>'
-
-		return_str += '</header>'
-
-		return_str += '<main class="w3-content">'
-
-		if message:
-			return_str += '<p><strong>{}</strong></p>'.format(message)
+		content = []
 
 		# List courses
 
-		return_str += '<h2 class="w3-padding w3-khaki">{}</h2>'.format(_("Kurse"))
+		content.append('<h2 class="w3-padding w3-khaki">{}</h2>'.format(_("Kurse")))
 
 		courses = self.storage.find_courses()
 
@@ -1675,7 +2190,7 @@ class WebApp:
 
 		for title in titles:
 
-			return_str += '''<form action="/redaktion/{0}"
+			content.append('''<form action="/redaktion/{0}"
 								method="post"
 								style="padding: 0px;background: none;border-radius: 0px;">
 	<p>
@@ -1683,33 +2198,32 @@ class WebApp:
 		<input type="hidden" name="_method" value="DELETE">
 		<input type="submit" value="{2}">
 	</p>
-</form>'''.format(courses[title], title, _("Löschen"))
+</form>'''.format(courses[title], title, _("Löschen")))
 
 		# Form to create a course
 
-		return_str += '<h2 class="w3-padding w3-khaki">{}</h2>'.format(_("Kurs anlegen"))
-
-		return_str += '<form action="/redaktion" method="post" class="w3-padding-large w3-light-grey">'
-
-		return_str += '<p><label for="title">{}</label>: '.format(_("Titel"))
+		content.append('<h2 class="w3-padding w3-khaki">{}</h2>'.format(_("Kurs anlegen")))
 
-		return_str += '<input type="text" name="title" id="title">'
+		content.append('<form action="/redaktion" method="post" class="w3-padding-large w3-light-grey">')
 
-		return_str += '<br>{}</p>'.format(_("Erlaubte Zeichen: Buchstaben, Zahlen, Leerzeichen, Bindestrich, Unterstrich"))
+		content.append('<p><label for="title">{}</label>: '.format(_("Titel")))
 
-		return_str += '<input type="submit" value="{}">'.format(_("Anlegen"))
-		return_str += '</form>'
+		content.append('<input type="text" name="title" id="title">')
 
-		return_str += '<!-- Ende redaktionssystem --></div>'
+		content.append('<br>{}</p>'.format(_("Erlaubte Zeichen: Buchstaben, Zahlen, Leerzeichen, Bindestrich, Unterstrich")))
 
-		return_str += '</main>'
-
-		return_str += HTML_FOOT
+		content.append('<input type="submit" value="{}">'.format(_("Anlegen")))
+		content.append('</form>')
 
-		return return_str
+		return REDAKTION_PAGE.render(title = _("Redaktionssystem"),
+										stylesheets = self.stylesheets,
+										heading = _("Redaktionssystem"),
+										navigation = '<p><a href="/" class="nav w3-light-blue w3-padding w3-round-xlarge">&lt;&nbsp;{}</a></p>'.format(_("Zur Startseite")),
+										message = self._format_message(message),
+										content = content)
 
 
-	def redaktion_post(self, args, title):
+	def redaktion_post(self, title):
 		"""Handler method to be called by redaktion().
 
 		POST: Create a new course using the title, and then display the content management frontend.
@@ -1726,7 +2240,7 @@ class WebApp:
 			# After processing POST, render the page as if GET was called,
 			# plus a message.
 			#
-			return self.redaktion_get(args, message)
+			return self.redaktion_get(message)
 
 		# Remove possible surrounding whitespace
 		#
@@ -1788,127 +2302,88 @@ class WebApp:
 		GET: Display the content management frontend.
 		"""
 
-		courses = self.storage.find_courses()
-
-		if uuid.UUID(course_id) not in courses.keys():
-
-			LOGGER.error("course {} requested, but does not exist".format(course_id))
-			raise cherrypy.NotFound()
-			LOGGER.error("course {} requested, but does not exist".format(course_id))
-			raise cherrypy.NotFound()
+		course = self._redaktion_course(course_id)
 
-		course_title = courses[uuid.UUID(course_id)]
+		course_title = self.storage.find_courses()[course]
 
 		# Build the page
 
-		return_str = HTML_HEAD.format(title = course_title)
+		content = []
 
-		return_str += '<div class="redaktionssystem">'
+		content.append('<h2 class="w3-padding w3-khaki">{}</h2>'.format(_("Lern-Inhalte")))
 
-		return_str += '<header class="w3-content">'
+		# List learning contents, nested by group. The buttons to move a
+		# learning content only name the step to move and its new
+		# successor, so the page grows linearly with the course.
 
-		return_str += '<h1 class="w3-padding w3-khaki">{1}: {0}</h1>'.format(course_title, _("Kurs"))
+		def list_steps(steps):
 
-		return_str += '<nav class="w3-padding">'
+			content.append('<ol class="w3-ul w3-section">')
 
-		return_str += '<p><a href="/redaktion" class="nav w3-light-blue w3-padding w3-round-xlarge">&lt;&nbsp;{}</a></p>'.format(_("Zur Kurs-Übersicht"))
+			siblings = list(steps.keys())
 
-		return_str += '</nav>'
+			for position, step in enumerate(siblings):
 
-		return_str += '</header>'
+				content.append('<li>')
 
-		return_str += '<main class="w3-content">'
-
-		if message:
-			return_str += '<p><strong>{}</strong></p>'.format(message)
-
-		return_str += '<h2 class="w3-padding w3-khaki">{}</h2>'.format(_("Lern-Inhalte"))
-
-		# List learning contents
-
-		learning_contents = self.storage.get_learning_contents_titles(course_title)
+				content.append('<a href="/redaktion/{0}/{1}">{2}&nbsp;&gt;</a>'.format(course_id, step.identifier, step.title))
 
-		return_str += '<ol class="w3-ul w3-section">'
-
-		position = 0
-
-		for existing_id in self.storage.get_learning_contents_ordered(course_id):
-
-			return_str += '<li>'
-
-			return_str += '<a href="/redaktion/{0}/{1}">{2}&nbsp;&gt;</a>'.format(course_id, existing_id, learning_contents[existing_id])
-
-			return_str += '''<form action="/redaktion/{0}/{1}"
+				content.append('''<form action="/redaktion/{0}/{1}"
 	method="post"
 	style="padding: 0px;background: none;border-radius: 0px;display:inline;">
 		<input type="hidden" name="_method" value="DELETE">
 		<input type="submit" value="{2}">
 </form>'''.format(course_id,
-				existing_id,
-				_("Löschen"))
-
-			if position > 0:
+				step.identifier,
+				_("Löschen")))
 
-				# Make a copy to be able to change the list
-				#
-				changed_list = list(self.storage.get_learning_contents_ordered(course_id))
+				if position > 0:
 
-				changed_list[position - 1], changed_list[position] = changed_list[position], changed_list[position - 1]
+					content.append(REDAKTION_MOVE_FORM.format(course_id,
+																step.identifier,
+																siblings[position - 1].identifier,
+																_("Nach oben")))
 
-				return_str += '''<form action="/redaktion/{0}/Lern-Inhalte"
-	method="post"
-	style="padding: 0px;background: none;border-radius: 0px;display:inline;">
-		<input type="hidden" name="_method" value="PUT">
-		<input type="hidden" name="learning_contents" value="{1}">
-		<input type="submit" value="{2}">
-</form>'''.format(course_id,
-				changed_list,
-				_("Nach oben"))
+				if position < len(siblings) - 1:
 
-			if position < len(learning_contents.keys()) - 1:
+					content.append(REDAKTION_MOVE_FORM.format(course_id,
+																siblings[position + 1].identifier,
+																step.identifier,
+																_("Nach unten")))
 
-				changed_list = list(self.storage.get_learning_contents_ordered(course_id))
+				if steps[step]:
 
-				changed_list[position], changed_list[position + 1] = changed_list[position + 1], changed_list[position]
+					list_steps(steps[step])
 
-				return_str += '''<form action="/redaktion/{0}/Lern-Inhalte"
-	method="post"
-	style="padding: 0px;background: none;border-radius: 0px;display:inline;">
-		<input type="hidden" name="_method" value="PUT">
-		<input type="hidden" name="learning_contents" value="{1}">
-		<input type="submit" value="{2}">
-</form>'''.format(course_id,
-				changed_list,
-				_("Nach unten"))
+				content.append('</li>')
 
-			return_str += '</li>'
+			content.append('</ol>')
 
-			position += 1
+			return
 
-		return_str += '</ol>'
+		list_steps(self.storage.get_learning_contents_ordered(course))
 
 		# Form to create a learning content
 
-		return_str += '<h2 class="w3-padding w3-khaki">{}</h2>'.format(_("Lern-Inhalt hinzufügen"))
+		content.append('<h2 class="w3-padding w3-khaki">{}</h2>'.format(_("Lern-Inhalt hinzufügen")))
 
-		return_str += '<form action="/redaktion/{}" method="post" class="w3-padding-large w3-light-grey">'.format(course_id)
+		content.append('<form action="/redaktion/{}" method="post" class="w3-padding-large w3-light-grey">'.format(course_id))
 
-		return_str += '<p><label for="title">{}</label>: '.format(_("Titel"))
+		content.append('<p><label for="title">{}</label>: '.format(_("Titel")))
 
-		return_str += '<input type="text" name="title" id="title">'
+		content.append('<input type="text" name="title" id="title">')
 
-		return_str += '<br>{}</p>'.format(_("Erlaubte Zeichen: Buchstaben, Zahlen, Leerzeichen, Bindestrich, Unterstrich"))
+		content.append('<br>{}</p>'.format(_("Erlaubte Zeichen: Buchstaben, Zahlen, Leerzeichen, Bindestrich, Unterstrich")))
 
-		return_str += '<input type="submit" value="{}">'.format(_("Anlegen"))
-		return_str += '</form>'
+		content.append('<input type="submit" value="{}">'.format(_("Anlegen")))
+		content.append('</form>')
 
-		return_str += '<!-- Ende redaktionssystem --></div>'
-
-		return_str += '</main>'
-
-		return_str += HTML_FOOT
-
-		return return_str
+		return REDAKTION_PAGE.render(title = course_title,
+										stylesheets = self.stylesheets,
+										heading = "{1}: {0}".format(course_title, _("Kurs")),
+										navigation = '<p><a href="/redaktion" class="nav w3-light-blue w3-padding w3-round-xlarge">&lt;&nbsp;{}</a></p>'.format(_("Zur Kurs-Übersicht")),
+										message = self._format_message(message),
+										content = content)
 
 
 	def kurs_redaktion_post(self, course_id, learning_content_title):
@@ -1934,9 +2409,9 @@ class WebApp:
 		#
 		learning_content_title = learning_content_title.strip()
 
-		course_title = self.storage.find_courses()[uuid.UUID(course_id)]
+		course = self._redaktion_course(course_id)
 
-		message = self.storage.write_learning_content(course_title, learning_content_title)
+		message = self.storage.write_learning_content(course, learning_content_title)
 
 		if message:
 			message = '{}: {}'.format(learning_content_title, message)
@@ -1955,39 +2430,17 @@ class WebApp:
 
 		# Start building the page
 
-		return_str = HTML_HEAD.format(title = _("Lern-Inhalt löschen"))
-
-		message = ""
-
-		courses = self.storage.find_courses()
-
-		course_title = ""
-
-		if uuid.UUID(course_id) in courses.keys():
+		return_str = HTML_HEAD.format(title = _("Lern-Inhalt löschen"), stylesheets = self.stylesheets)
 
-			course_title = courses[uuid.UUID(course_id)]
+		course = self._redaktion_course(course_id)
 
-		if not course_title or course_title not in self.storage.get_course_titles():
-
-			# This is an error, stop here.
-
-			message = _("Kurs {} nicht gefunden").format(course_id)
-
-			return_str += '<p><strong>{}</strong></p>'.format(message)
-
-			return_str += '<p><a href="/redaktion">Zurück zum Redaktions-System</a></p>'.format(course_id)
-
-			return_str += HTML_FOOT
-
-			return return_str
-
-		message = self.storage.delete_course(course_title)
+		message = self.storage.delete_course(course)
 
 		return_str += '<main class="w3-content">'
 
 		return_str += '<p><strong>{}</strong></p>'.format(message)
 
-		return_str += '<p><a href="/redaktion">{}</a></p>'.format(course_id, _("Zurück zum Redaktions-System"))
+		return_str += '<p><a href="/redaktion">{}</a></p>'.format(_("Zurück zum Redaktions-System"))
 
 		return_str += '</main>'
 
@@ -2023,11 +2476,11 @@ class WebApp:
 
 		# Start building the page
 
-		return_str = HTML_HEAD.format(title = _("Lern-Inhalte umsortieren"))
+		return_str = HTML_HEAD.format(title = _("Lern-Inhalte umsortieren"), stylesheets = self.stylesheets)
 
-		course_title = self.storage.find_courses()[uuid.UUID(course_id)]
+		course = self._redaktion_course(course_id)
 
-		message = self.storage.write_learning_contents_list(course_title, learning_contents)
+		message = self.storage.write_learning_contents_list(course, learning_contents)
 
 		return_str += '<main class="w3-content">'
 
@@ -2042,13 +2495,13 @@ class WebApp:
 		return return_str
 
 
-	def lerninhalt_redaktion(self, course_id, learning_content_id, filename = "", content = "", _method=""):
+	def lerninhalt_redaktion(self, course_id, learning_content_id, filename = "", content = "", _method="", successor = ""):
 		"""Content management of a learning content.
 
 		This method will dispatch the handling of the request by method.
 		"""
 
-		LOGGER.debug("lerninhalt_redaktion(course_id = '{}', learning_content_id = '{}', filename = '{}', content = {}, _method='{}')".format(course_id, learning_content_id, filename, content.__class__, _method))
+		LOGGER.debug("lerninhalt_redaktion(course_id = '{}', learning_content_id = '{}', filename = '{}', content = {}, _method='{}', successor = '{}')".format(course_id, learning_content_id, filename, content.__class__, _method, successor))
 
 		# Luna aims at being a REST application, so we explicitly check the HTTP
 		# method.
@@ -2061,6 +2514,10 @@ class WebApp:
 
 			return self.lerninhalt_redaktion_post(course_id, learning_content_id, filename, content)
 
+		elif _method.upper() == "PUT" or (cherrypy.serving.request.method == "PUT" and _method.upper() in ("", "PUT")):
+
+			return self.lerninhalt_redaktion_put(course_id, learning_content_id, successor)
+
 		elif _method.upper() == "DELETE" or (cherrypy.serving.request.method == "DELETE" and _method.upper() in ("", "DELETE")):
 
 			return self.lerninhalt_redaktion_delete(course_id, learning_content_id)
@@ -2088,46 +2545,31 @@ class WebApp:
 		GET: Display the content management frontend.
 		"""
 
-		course_title = self.storage.find_courses()[uuid.UUID(course_id)]
+		course = self._redaktion_course(course_id)
 
-		learning_content_title = self.storage.get_learning_contents_titles(course_title)[learning_content_id]
-
-		# Start building the page
+		course_title = self.storage.find_courses()[course]
 
-		return_str = HTML_HEAD.format(title = learning_content_title)
+		learning_content_title = self.storage.get_learning_contents_titles(course).get(learning_content_id)
 
-		return_str += '<div class="redaktionssystem">'
+		if learning_content_title is None:
 
-		return_str += '<header class="w3-content">'
-
-		return_str += '<h1 class="w3-padding w3-khaki">{1}: {0}</h1>'.format(learning_content_title,
-										_("Lern-Inhalt"))
-
-		return_str += '<nav class="w3-padding">'
-
-		return_str += '<p><a href="/redaktion/{0}" class="nav w3-light-blue w3-padding w3-round-xlarge">&lt;&nbsp;{1}: {2}</a></p>'.format(course_id,
-										_("Zum Kurs"),
-										course_title)
-
-		return_str += '</nav>'
-
-		return_str += '</header>'
+			LOGGER.error("learning content {} requested, but does not exist in course {}".format(learning_content_id, course_id))
+			raise cherrypy.NotFound()
 
-		return_str += '<main class="w3-content">'
+		# Start building the page
 
-		if message:
-			return_str += '<p><strong>{}</strong></p>'.format(message)
+		content = []
 
-		return_str += '<h2 class="w3-padding w3-khaki">{}</h2>'.format(_("Varianten"))
+		content.append('<h2 class="w3-padding w3-khaki">{}</h2>'.format(_("Varianten")))
 
 		# List variants
 
-		variantn = self.storage.get_variants(course_title, learning_content_id)
+		variantn = self.storage.get_variants(course, learning_content_id)
 
 		if not variantn:
 
-			return_str += '<p>{}</p>'.format(_("Noch keine Varianten vorhanden."))
-			return_str += '<p>{}</p>'.format(_("Lege mindestens einen Variante an, damit Luna den Lern-Inhalt darstellt."))
+			content.append('<p>{}</p>'.format(_("Noch keine Varianten vorhanden.")))
+			content.append('<p>{}</p>'.format(_("Lege mindestens einen Variante an, damit Luna den Lern-Inhalt darstellt.")))
 
 		else:
 
@@ -2135,7 +2577,7 @@ class WebApp:
 
 			variantn.sort()
 
-			return_str += '''<table style="width:100%;" class="w3-section">
+			content.append('''<table style="width:100%;" class="w3-section">
 	<thead>
 		<tr>
 			<th>{}</th>
@@ -2144,11 +2586,11 @@ class WebApp:
 			<th>{}</th>
 		</tr>
 	</thead>
-	<tbody>'''.format(_("Datei / Ordner"), _("Format"), _("Modus"), _("Löschen"))
+	<tbody>'''.format(_("Datei / Ordner"), _("Format"), _("Modus"), _("Löschen")))
 
 			for variant in variantn:
 
-				meta_data = self.storage.get_variant_metadata(course_title,
+				meta_data = self.storage.get_variant_metadata(course,
 																	learning_content_id,
 																	variant)
 
@@ -2178,7 +2620,7 @@ class WebApp:
 
 				# TODO: Tabelle anlegen, mit Vorschau
 
-				return_str += '''<tr>
+				content.append('''<tr>
 	<td>{}</td>
 	<td>{}</td>
 	<td>{}</td>
@@ -2196,73 +2638,74 @@ class WebApp:
 				course_id,
 				learning_content_id,
 				meta_data["identifier"],
-				_("Löschen"))
+				_("Löschen")))
 
-			return_str += '</tbody></table>'
+			content.append('</tbody></table>')
 
 			if modes_not_covered:
 
-				return_str += '<p>{}: {}</p>'.format(_("Diese Varianten fehlen noch"),
+				content.append('<p>{}: {}</p>'.format(_("Diese Varianten fehlen noch"),
 														", ".join([{MODI.TEXT: _("Text"),
 																	MODI.TEXT_ZUSATZ: _("Verschönerter Text"),
-																	MODI.BILD: _("Bild")}[current_mode] for current_mode in modes_not_covered]))
+																	MODI.BILD: _("Bild")}[current_mode] for current_mode in modes_not_covered])))
 
 		# Form to create a variant
 
-		return_str += '<h2 class="w3-padding w3-khaki">{}</h2>'.format(_("Variante anlegen"))
+		content.append('<h2 class="w3-padding w3-khaki">{}</h2>'.format(_("Variante anlegen")))
 
-		return_str += '<h3 class="w3-padding w3-khaki">{}</h3>'.format(_("HTML-Datei direkt anlegen"))
+		content.append('<h3 class="w3-padding w3-khaki">{}</h3>'.format(_("HTML-Datei direkt anlegen")))
 
-		return_str += '<form action="/redaktion/{}/{}" method="post" class="w3-padding-large w3-light-grey">'.format(course_id, learning_content_id)
+		content.append('<form action="/redaktion/{}/{}" method="post" class="w3-padding-large w3-light-grey">'.format(course_id, learning_content_id))
 
-		return_str += '<p><label for="filename">{}</label>: '.format(_("Dateiname"))
+		content.append('<p><label for="filename">{}</label>: '.format(_("Dateiname")))
 
-		return_str += '<input type="text" name="filename" id="filename" value=".html"><br>{}</p>'.format(_("Erlaubte Zeichen: Buchstaben, Zahlen, Leerzeichen, Bindestrich, Unterstrich, Punkt"))
+		content.append('<input type="text" name="filename" id="filename" value=".html"><br>{}</p>'.format(_("Erlaubte Zeichen: Buchstaben, Zahlen, Leerzeichen, Bindestrich, Unterstrich, Punkt")))
 
-		return_str += '<p><label for="content">{}</label>:<br>'.format(_("Inhalt"))
+		content.append('<p><label for="content">{}</label>:<br>'.format(_("Inhalt")))
 
-		return_str += '<textarea name="content" id="content" rows="10" cols="80"></textarea></p>'
+		content.append('<textarea name="content" id="content" rows="10" cols="80"></textarea></p>')
 
-		return_str += '<input type="submit" value="{}">'.format(_("Anlegen"))
-		return_str += '</form>'
+		content.append('<input type="submit" value="{}">'.format(_("Anlegen")))
+		content.append('</form>')
 
 		# Form to upload a file as variant
 
-		return_str += '<h3 class="w3-padding w3-khaki">{}</h3>'.format(_("Datei hochladen"))
+		content.append('<h3 class="w3-padding w3-khaki">{}</h3>'.format(_("Datei hochladen")))
 
-		return_str += '<form action="/redaktion/{}/{}" method="post" enctype="multipart/form-data" class="w3-padding-large w3-light-grey">'.format(course_id, learning_content_id)
+		content.append('<form action="/redaktion/{}/{}" method="post" enctype="multipart/form-data" class="w3-padding-large w3-light-grey">'.format(course_id, learning_content_id))
 
-		return_str += '<p><label for="file">{}</label>: '.format(_("Datei auswählen"))
+		content.append('<p><label for="file">{}</label>: '.format(_("Datei auswählen")))
 
-		return_str += '<input type="file" name="content" id="file"></p>'
+		content.append('<input type="file" name="content" id="file"></p>')
 
-		return_str += '<p>Dann diesen Knopf klicken:</p>'
+		content.append('<p>Dann diesen Knopf klicken:</p>')
 
-		return_str += '<input type="submit" value="{}">'.format(_("Jetzt hochladen"))
-		return_str += '</form>'
+		content.append('<input type="submit" value="{}">'.format(_("Jetzt hochladen")))
+		content.append('</form>')
 
 		# Form to upload a directory as variant
 
-		return_str += '<h3 class="w3-padding w3-khaki">{}</h3>'.format(_("Verzeichnis hochladen"))
-
-		return_str += '<form action="/redaktion/{}/{}" method="post" enctype="multipart/form-data" class="w3-padding-large w3-light-grey">'.format(course_id, learning_content_id)
+		content.append('<h3 class="w3-padding w3-khaki">{}</h3>'.format(_("Verzeichnis hochladen")))
 
-		return_str += '<p><label for="directory">{}</label>: '.format(_("Verzeichnis auswählen"))
+		content.append('<form action="/redaktion/{}/{}" method="post" enctype="multipart/form-data" class="w3-padding-large w3-light-grey">'.format(course_id, learning_content_id))
 
-		return_str += '<input type="file" name="content" id="directory" directory="" webkitdirectory=""></p>'
+		content.append('<p><label for="directory">{}</label>: '.format(_("Verzeichnis auswählen")))
 
-		return_str += '<p>Dann diesen Knopf klicken:</p>'
+		content.append('<input type="file" name="content" id="directory" directory="" webkitdirectory=""></p>')
 
-		return_str += '<input type="submit" value="{}">'.format(_("Jetzt hochladen"))
-		return_str += '</form>'
-
-		return_str += '<!-- Ende redaktionssystem --></div>'
-
-		return_str += '</main>'
+		content.append('<p>Dann diesen Knopf klicken:</p>')
 
-		return_str += HTML_FOOT
+		content.append('<input type="submit" value="{}">'.format(_("Jetzt hochladen")))
+		content.append('</form>')
 
-		return return_str
+		return REDAKTION_PAGE.render(title = learning_content_title,
+										stylesheets = self.stylesheets,
+										heading = "{1}: {0}".format(learning_content_title, _("Lern-Inhalt")),
+										navigation = '<p><a href="/redaktion/{0}" class="nav w3-light-blue w3-padding w3-round-xlarge">&lt;&nbsp;{1}: {2}</a></p>'.format(course_id,
+																																				_("Zum Kurs"),
+																																				course_title),
+										message = self._format_message(message),
+										content = content)
 
 
 	def lerninhalt_redaktion_post(self, course_id, learning_content_id, filename, content):
@@ -2338,7 +2781,7 @@ class WebApp:
 
 		# Next, write the file(s) to disk.
 
-		file_format = self.storage.write_variant(course_id, learning_content_id, content, filename)
+		file_format = self.storage.write_variant(self._redaktion_course(course_id), learning_content_id, content, filename)
 
 		# TODO: Could be beautified if filename is a list
 		#
@@ -2350,6 +2793,22 @@ class WebApp:
 		return self.lerninhalt_redaktion_get(course_id, learning_content_id, message)
 
 
+	def lerninhalt_redaktion_put(self, course_id, learning_content_id, successor):
+		"""Handler method to be called by lerninhalt_redaktion().
+
+		PUT: Move the learning content directly before the learning content successor, or to the end of its group if successor is empty, and then display the content management frontend of the course.
+		"""
+
+		LOGGER.debug('PUT lerninhalt_redaktion(course_id = "{}", learning_content_id = "{}", successor = "{}")'.format(course_id, learning_content_id, successor))
+
+		message = self.storage.move_learning_content(self._redaktion_course(course_id), learning_content_id, successor)
+
+		# After processing PUT, render the course page as if GET was
+		# called, plus a message.
+		#
+		return self.kurs_redaktion_get(course_id, message)
+
+
 	def lerninhalt_redaktion_delete(self, course_id, learning_content_id):
 		"""Handler method to be called by lerninhalt_redaktion().
 
@@ -2358,13 +2817,13 @@ class WebApp:
 
 		# Start building the page
 
-		return_str = HTML_HEAD.format(title = _("Lern-Inhalt löschen"))
+		return_str = HTML_HEAD.format(title = _("Lern-Inhalt löschen"), stylesheets = self.stylesheets)
 
 		message = ""
 
-		course_title = self.storage.find_courses()[uuid.UUID(course_id)]
+		course = self._redaktion_course(course_id)
 
-		if learning_content_id not in self.storage.get_learning_contents(course_title):
+		if learning_content_id not in self.storage.get_learning_contents(course):
 
 			# This is an error, stop here.
 
@@ -2378,7 +2837,7 @@ class WebApp:
 
 			return return_str
 
-		message = self.storage.delete_learning_content(course_title, learning_content_id)
+		message = self.storage.delete_learning_content(course, learning_content_id)
 
 		return_str += '<main class="w3-content">'
 
@@ -2433,13 +2892,13 @@ class WebApp:
 
 		# Start building the page
 
-		return_str = HTML_HEAD.format(title = _("Variante löschen"))
+		return_str = HTML_HEAD.format(title = _("Variante löschen"), stylesheets = self.stylesheets)
 
 		LOGGER.debug("variant_redaktion_delete(course_id = '{}', learning_content_id = '{}', variant_id = '{}')".format(course_id, learning_content_id, variant_id))
 
-		course_title = self.storage.find_courses()[uuid.UUID(course_id)]
+		course = self._redaktion_course(course_id)
 
-		message = self.storage.delete_variant(course_title, learning_content_id, variant_id)
+		message = self.storage.delete_variant(course, learning_content_id, variant_id)
 
 		if not message:
 
@@ -2463,7 +2922,58 @@ def main():
 	"""Main function, for IDE convenience.
 	"""
 
-	root = WebApp()
+	parser = argparse.ArgumentParser(prog = "python -m luna_lms.webapp",
+										description = "Den Luna-LMS-Server starten")
+
+	parser.add_argument("--sqlite-profile",
+						choices = list(SQLITE_PROFILES.keys()),
+						default = None,
+						help = "Einstellungen für die Kurs-Datenbanken (Standard: default)")
+
+	parser.add_argument("--css-bundle",
+						action = "store_true",
+						help = "alle Stylesheets zu einer verkleinerten Datei zusammenfassen")
+
+	parser.add_argument("--workers",
+						type = int,
+						default = 1,
+						help = "Anzahl der Server-Prozesse, die sich den Port teilen (Standard: 1)")
+
+	args = parser.parse_args()
+
+	if args.workers < 1:
+
+		parser.error("--workers muss mindestens 1 sein")
+
+	if args.workers > 1 and not hasattr(os, "fork"):
+
+		parser.error("--workers ist auf diesem System nicht verfügbar")
+
+	if args.workers == 1:
+
+		serve(args)
+
+		return
+
+	LOGGER.info("Starting {} worker processes on port {}".format(args.workers, PORT))
+
+	run_workers(args.workers, lambda: serve(args, reuse_port = True))
+
+	return
+
+def serve(args, reuse_port = False):
+	"""Create the WebApp from the parsed command line arguments args, and serve it until the engine exits.
+
+	If reuse_port is True, several processes may serve on the same port.
+	"""
+
+	if reuse_port:
+
+		use_reuse_port_server()
+
+	root = WebApp(sqlite_profile = args.sqlite_profile, css_bundle = args.css_bundle)
+
+	root.start()
 
 	config_dict = {"/" : {"tools.sessions.on" : True,
 							"tools.sessions.timeout" : 60},
@@ -2497,9 +3007,10 @@ def main():
 
 	LOGGER.info("Final CherryPy config: {}".format(config_dict))
 
-	# Conditionally turn off Autoreloader
+	# Conditionally turn off Autoreloader. Workers would restart as
+	# a whole new set of workers.
 	#
-	if not AUTORELOAD:
+	if not AUTORELOAD or reuse_port:
 
 		cherrypy.engine.autoreload.unsubscribe()
 
@@ -0,0 +1,164 @@
+"""luna_lms – Ein multimodales Lern-Management-System
+
+Copyright (c) 2022
+Florian Berger <florian.berger@posteo.de>
+"""
+
+# This file is part of luna_lms.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+from luna_lms import LOGGER
+import cherrypy
+import cherrypy._cpserver
+import os
+import signal
+import threading
+
+
+class ReusePortServer(cherrypy._cpserver.Server):
+	"""A CherryPy HTTP server that binds its port with SO_REUSEPORT.
+
+	Several worker processes can listen on the same port this way, and
+	the kernel distributes incoming connections among them. Install it
+	as cherrypy.server before the configuration is applied.
+	"""
+
+	def start(self):
+		"""Create the HTTP server with SO_REUSEPORT set, and start it.
+
+		ServerAdapter.start() waits for the port to be free before
+		binding, which never happens while another worker listens on it.
+		This skips that check, and is the same otherwise.
+		"""
+
+		if self.running:
+
+			self.bus.log("Already serving on {}".format(self.description))
+
+			return
+
+		if not self.httpserver:
+
+			self.httpserver, self.bind_addr = self.httpserver_from_self()
+
+		self.httpserver.reuse_port = True
+
+		self.interrupt = None
+
+		thread = threading.Thread(target = self._start_http_thread,
+									name = "HTTPServer {}".format(os.getpid()))
+
+		thread.start()
+
+		self.wait()
+
+		self.running = True
+
+		self.bus.log("Serving on {}".format(self.description))
+
+		return
+
+	# cherrypy.engine runs start() callbacks by priority
+	#
+	start.priority = 75
+
+def use_reuse_port_server():
+	"""Replace cherrypy.server by a ReusePortServer.
+	"""
+
+	cherrypy.server.unsubscribe()
+
+	cherrypy.server = ReusePortServer()
+
+	cherrypy.server.subscribe()
+
+	return
+
+def run_workers(count, serve):
+	"""Fork count worker processes which each call serve(), and wait until all of them have exited.
+
+	Nothing that starts threads or opens databases may run before, since
+	it would be shared by the workers. SIGTERM, SIGINT or SIGHUP to this
+	process terminate all workers.
+	"""
+
+	workers = []
+
+	for number in range(count):
+
+		pid = os.fork()
+
+		if pid == 0:
+
+			status = 1
+
+			try:
+				serve()
+
+				status = 0
+
+			except BaseException:
+
+				LOGGER.exception("Worker {} failed".format(os.getpid()))
+
+			finally:
+
+				# Never return into the parent's code
+				#
+				os._exit(status)
+
+		LOGGER.info("Started worker {}".format(pid))
+
+		workers.append(pid)
+
+	def terminate(signum, frame):
+		"""Forward a request to quit to all workers.
+		"""
+
+		LOGGER.info("Received signal {}, terminating workers".format(signum))
+
+		for pid in workers:
+
+			try:
+				os.kill(pid, signal.SIGTERM)
+
+			except ProcessLookupError:
+
+				pass
+
+		return
+
+	for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+
+		signal.signal(signum, terminate)
+
+	while workers:
+
+		try:
+			pid, status = os.wait()
+
+		except ChildProcessError:
+
+			break
+
+		if pid in workers:
+
+			workers.remove(pid)
+
+			LOGGER.info("Worker {} exited with status {}".format(pid, os.waitstatus_to_exitcode(status)))
+
+	return
@@ -64,6 +64,7 @@ LONG_DESCRIPTION = ""
 print("regenerating MANIFEST.in for Python 2.x")
 MANIFEST = open("MANIFEST.in", "wt")
 MANIFEST.write("include COPYING\n")
+MANIFEST.write("include luna_lms/version_stamp.txt\n")
 MANIFEST.close()
 
 # Warn about symlinks
@@ -106,7 +107,10 @@ setup(name=PACKAGE,
 	long_description=LONG_DESCRIPTION,
 	license="Affero GPL",
 	py_modules=[PACKAGE],
-	packages=[],
+	packages=[PACKAGE, PACKAGE + ".storage"],
+	# Written by `make version_stamp`, see luna_lms.version
+	#
+	package_data={PACKAGE: ["version_stamp.txt"]},
 	requires=[],
 	provides=[PACKAGE],
 	scripts=SCRIPTS,